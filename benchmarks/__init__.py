@@ -0,0 +1,18 @@
+"""
+Small, dependency-free benchmarks for django-cbv-inspect.
+
+Run them from the root of the repo, e.g. `python -m benchmarks.resolver_walks`.
+"""
+
+import os
+
+
+def setup_django() -> None:
+    """
+    Configure Django with the test settings so benchmarks can use the test views.
+    """
+
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+    django.setup()
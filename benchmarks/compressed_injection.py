@@ -0,0 +1,102 @@
+"""
+Measure the CPU cost of inserting the toolbar into plain and gzip compressed responses.
+
+Times `DjCbvInspectMiddleware.insert_toolbar` per MB of html, for responses and
+streaming responses (in 64 KB chunks), with and without gzip Content-Encoding.
+Compressing the page once is shown for comparison, as that's what `GZipMiddleware`
+costs either way.
+
+Usage:
+    python -m benchmarks.compressed_injection
+"""
+
+import time
+
+from benchmarks import setup_django
+
+PAGE_SIZES_MB = [1, 5]
+CHUNK_SIZE = 64 * 1024
+TOOLBAR = "<div id='djCbv'>" + "x" * 20_000 + "</div>"
+
+
+class Toolbar:
+    def get_content(self, response_size: int = 0) -> str:
+        return TOOLBAR
+
+
+def make_page(size: int) -> bytes:
+    row = b"<tr><td>1234</td><td>Some text in a table cell</td></tr>\n"
+    return b"<html><body><table>\n" + row * (size // len(row)) + b"</table></body></html>"
+
+
+def main() -> None:
+    setup_django()
+
+    from django.http import HttpResponse, StreamingHttpResponse
+    from django.test.utils import override_settings
+    from django.utils.text import compress_sequence, compress_string
+
+    from cbv_inspect.middleware import DjCbvInspectMiddleware
+
+    with override_settings(DEBUG=True):
+        middleware = DjCbvInspectMiddleware(lambda request: None)
+
+    def chunked(content: bytes):
+        return [content[i : i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)]
+
+    def response(page: bytes):
+        return HttpResponse(page)
+
+    def gzip_response(page: bytes):
+        return HttpResponse(compress_string(page), headers={"Content-Encoding": "gzip"})
+
+    def streaming_response(page: bytes):
+        return StreamingHttpResponse(chunked(page))
+
+    def gzip_streaming_response(page: bytes):
+        compressed = list(compress_sequence(chunked(page)))
+        return StreamingHttpResponse(compressed, headers={"Content-Encoding": "gzip"})
+
+    cases = {
+        "response": response,
+        "gzip response": gzip_response,
+        "streaming response": streaming_response,
+        "gzip streaming response": gzip_streaming_response,
+    }
+
+    def best_of(func, repeat: int = 5) -> float:
+        timings = []
+
+        for _ in range(repeat):
+            start = time.process_time()
+            func()
+            timings.append(time.process_time() - start)
+
+        return min(timings)
+
+    print(f"{'case':<25} {'page MB':>8} {'CPU ms/MB':>10}")
+
+    for size_mb in PAGE_SIZES_MB:
+        page = make_page(size_mb * 1024 * 1024)
+        seconds = best_of(lambda: compress_string(page))
+        print(f"{'compress only':<25} {size_mb:>8} {seconds * 1000 / size_mb:>10.1f}")
+
+        for name, make_response in cases.items():
+
+            def insert():
+                res = make_response(page)
+                middleware.insert_toolbar(Toolbar(), res)
+
+                # consume the stream, which is where streaming injection happens
+                if res.streaming:
+                    for _ in res.streaming_content:
+                        pass
+
+            # building the response is left out, it's there without the middleware too
+            build_seconds = best_of(lambda: make_response(page))
+            seconds = best_of(insert) - build_seconds
+            print(f"{name:<25} {size_mb:>8} {seconds * 1000 / size_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure the per request cost of the middleware when it doesn't inspect a request.
+
+Compares calling the next handler directly with going through the middleware when:
+    - it's disabled at startup (DEBUG is False): Django drops it from the chain
+    - the show toolbar callback returns False, before any URL resolution
+    - DEBUG is False with a zero default sample rate and a per view rate (URL resolved)
+
+Usage:
+    python -m benchmarks.disabled_overhead
+"""
+
+import timeit
+
+from benchmarks import setup_django
+
+NUMBER = 200_000
+
+
+def main() -> None:
+    setup_django()
+
+    from django.core.exceptions import MiddlewareNotUsed
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+
+    from cbv_inspect.middleware import DjCbvInspectMiddleware
+
+    response = HttpResponse()
+    request = RequestFactory().get("/simple_cbv_render")
+
+    def get_response(request):
+        return response
+
+    def fresh(request):
+        # the middleware caches the resolved URL on the request, which a real
+        # request never has yet, so drop it (the baseline pays for this too)
+        request.__dict__.pop("_djcbv_resolver_match", None)
+        return request
+
+    def per_request_ns(func) -> float:
+        return min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+    baseline_ns = per_request_ns(lambda: get_response(fresh(request)))
+
+    with override_settings(DEBUG=False):
+        try:
+            DjCbvInspectMiddleware(get_response)
+            disabled = "used"
+        except MiddlewareNotUsed:
+            disabled = "not used"
+
+    cases = {
+        "callback returns False": {"SHOW_TOOLBAR_CALLBACK": lambda request: False},
+        "per view sample rate of 0": {"SAMPLE_RATES": {"render_html_view": 0}},
+    }
+
+    print(f"{'case':<30} {'ns/request':>12} {'overhead ns':>12}")
+    print(f"{'no middleware':<30} {baseline_ns:>12.0f} {0:>12.0f}")
+    print(f"{f'DEBUG is False ({disabled})':<30} {baseline_ns:>12.0f} {0:>12.0f}")
+
+    for name, config in cases.items():
+        with override_settings(DEBUG=False, CBV_INSPECT_CONFIG=config):
+            middleware = DjCbvInspectMiddleware(get_response)
+            ns = per_request_ns(lambda: middleware(fresh(request)))
+
+        print(f"{name:<30} {ns:>12.0f} {ns - baseline_ns:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
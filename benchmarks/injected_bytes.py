@@ -0,0 +1,37 @@
+"""
+Measure how many bytes the middleware injects into each response.
+
+Usage:
+    python -m benchmarks.injected_bytes
+"""
+
+from benchmarks import setup_django
+
+PATHS = ["/simple_cbv_render", "/number_cbv/3", "/large_context_cbv"]
+
+
+def main() -> None:
+    setup_django()
+
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    print(f"{'path':<25} {'delivery':<10} {'bytes injected':>15}")
+
+    for delivery in ("inline", "endpoint"):
+        config = {"TOOLBAR_DELIVERY": delivery, "TRACE_STORE_OPTIONS": {"max_traces": 10}}
+
+        with override_settings(DEBUG=True, ALLOWED_HOSTS=["testserver"], CBV_INSPECT_CONFIG=config):
+            client = Client()
+
+            for path in PATHS:
+                with override_settings(MIDDLEWARE=[]):
+                    plain_length = len(Client().get(path).content)
+
+                response = client.get(path)
+                injected = len(response.content) - plain_length
+                print(f"{path:<25} {delivery:<10} {injected:>15}")
+
+
+if __name__ == "__main__":
+    main()
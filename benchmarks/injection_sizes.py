@@ -0,0 +1,84 @@
+"""
+Measure inserting the toolbar into html responses from 10 KB to 50 MB.
+
+Compares the previous approach (decode the content, `re.split` on `</body>`,
+join the parts and encode again) with the byte-level reverse search and splice
+of `cbv_inspect.injection`, by wall time and peak memory allocated.
+
+Usage:
+    python -m benchmarks.injection_sizes
+"""
+
+import re
+import time
+import tracemalloc
+
+from benchmarks import setup_django
+
+PAGE_SIZES = [10 * 1024, 100 * 1024, 1024**2, 10 * 1024**2, 50 * 1024**2]
+TOOLBAR = b"<div id='djCbv'>" + b"x" * 20_000 + b"</div>"
+
+
+def make_page(size: int) -> bytes:
+    row = b"<tr><td>1234</td><td>Some text in a table cell</td></tr>\n"
+    return b"<html><body><table>\n" + row * (size // len(row)) + b"</table></body></html>"
+
+
+def split_insert(content: bytes, toolbar: bytes) -> bytes:
+    text = content.decode("utf-8")
+    parts = re.split("</body>", text, flags=re.IGNORECASE)
+    parts[-2] += toolbar.decode("utf-8")
+    return "</body>".join(parts).encode("utf-8")
+
+
+def splice_insert(content: bytes, toolbar: bytes) -> bytes:
+    from cbv_inspect import injection
+
+    return injection.splice(content, injection.rfind_body_end(content), toolbar)
+
+
+def measure(func, page: bytes):
+    """
+    Return the best wall time in ms and the peak memory allocated in MB.
+    """
+
+    timings = []
+
+    for _ in range(5):
+        start = time.perf_counter()
+        func(page, TOOLBAR)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(page, TOOLBAR)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(timings) * 1000, peak / 1024**2
+
+
+def format_size(size: int) -> str:
+    return f"{size // 1024**2} MB" if size >= 1024**2 else f"{size // 1024} KB"
+
+
+def main() -> None:
+    setup_django()
+
+    print(f"{'page':>8} {'split ms':>10} {'splice ms':>10}", end="")
+    print(f" {'split peak MB':>14} {'splice peak MB':>15}")
+
+    for size in PAGE_SIZES:
+        page = make_page(size)
+        assert split_insert(page, TOOLBAR) == splice_insert(page, TOOLBAR)
+
+        split_ms, split_peak = measure(split_insert, page)
+        splice_ms, splice_peak = measure(splice_insert, page)
+
+        print(
+            f"{format_size(size):>8} {split_ms:>10.2f} {splice_ms:>10.2f}"
+            f" {split_peak:>14.1f} {splice_peak:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Count how many times the root URL resolver is walked for a single request.
+
+Usage:
+    python -m benchmarks.resolver_walks
+"""
+
+from benchmarks import setup_django
+
+PATHS = ["/simple_cbv_render", "/hello_cbv", "/djcbv_exclude_mixin", "/simple_fbv_render"]
+
+
+def main() -> None:
+    setup_django()
+
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    resolve = resolver.resolve
+    walks = 0
+
+    def counting_resolve(path):
+        nonlocal walks
+        walks += 1
+        return resolve(path)
+
+    resolver.resolve = counting_resolve
+
+    with override_settings(DEBUG=True, ALLOWED_HOSTS=["testserver"]):
+        client = Client()
+
+        print(f"{'path':<25} {'resolver walks':>15}")
+        for path in PATHS:
+            walks = 0
+            client.get(path)
+            print(f"{path:<25} {walks:>15}")
+
+
+if __name__ == "__main__":
+    main()
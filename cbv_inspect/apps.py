@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CBVInspectConfig(AppConfig):
     name = "cbv_inspect"
+
+    def ready(self) -> None:
+        from cbv_inspect.checks import (
+            check_compressing_middleware,
+            check_config,
+            check_trace_urls,
+        )
+        from cbv_inspect.warmup import run_configured_warm_up
+
+        checks.register(check_config)
+        checks.register(check_trace_urls, checks.Tags.urls)
+        checks.register(check_compressing_middleware)
+
+        run_configured_warm_up()
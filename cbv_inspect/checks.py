@@ -0,0 +1,130 @@
+from typing import Any, List
+
+from django.conf import settings
+from django.core.checks import Error, Warning
+from django.urls import NoReverseMatch, reverse
+
+from cbv_inspect.settings import SERIALIZE_MODES, TOOLBAR_DELIVERIES, get_config
+
+MIDDLEWARE_PATH = "cbv_inspect.middleware.DjCbvInspectMiddleware"
+
+# Middleware that compress responses, gzip (handled, at twice the CPU cost) or brotli (skipped)
+COMPRESSING_MIDDLEWARE = (
+    "django.middleware.gzip.GZipMiddleware",
+    "django_brotli.middleware.BrotliMiddleware",
+    "compression_middleware.middleware.CompressionMiddleware",
+)
+
+
+def check_config(app_configs: Any, **kwargs: Any) -> List[Error]:
+    """
+    Check that `CBV_INSPECT_CONFIG` values are valid.
+    """
+
+    errors: List[Error] = []
+    config = get_config()
+    mode = config["SERIALIZE_MODE"]
+
+    if mode not in SERIALIZE_MODES:
+        errors.append(
+            Error(
+                f"Invalid CBV_INSPECT_CONFIG['SERIALIZE_MODE']: {mode!r}.",
+                hint=f"Use one of: {', '.join(SERIALIZE_MODES)}.",
+                id="cbv_inspect.E001",
+            )
+        )
+
+    delivery = config["TOOLBAR_DELIVERY"]
+
+    if delivery not in TOOLBAR_DELIVERIES:
+        errors.append(
+            Error(
+                f"Invalid CBV_INSPECT_CONFIG['TOOLBAR_DELIVERY']: {delivery!r}.",
+                hint=f"Use one of: {', '.join(TOOLBAR_DELIVERIES)}.",
+                id="cbv_inspect.E003",
+            )
+        )
+
+    max_size = config["INLINE_MAX_RESPONSE_SIZE"]
+
+    if max_size is not None and (not isinstance(max_size, int) or max_size < 0):
+        errors.append(
+            Error(
+                f"Invalid CBV_INSPECT_CONFIG['INLINE_MAX_RESPONSE_SIZE']: {max_size!r}.",
+                hint="Use a number of bytes, or None.",
+                id="cbv_inspect.E004",
+            )
+        )
+
+    rates = {"['SAMPLE_RATE']": config["SAMPLE_RATE"]}
+    rates.update(
+        (f"['SAMPLE_RATES'][{key!r}]", rate) for key, rate in config["SAMPLE_RATES"].items()
+    )
+
+    for key, rate in rates.items():
+        if not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+            errors.append(
+                Error(
+                    f"Invalid CBV_INSPECT_CONFIG{key}: {rate!r}.",
+                    hint="Use a number between 0 and 1.",
+                    id="cbv_inspect.E002",
+                )
+            )
+
+    return errors
+
+
+def check_trace_urls(app_configs: Any, **kwargs: Any) -> List[Warning]:
+    """
+    Check that the trace endpoint is reachable when the toolbar is delivered through it.
+    """
+
+    if get_config()["TOOLBAR_DELIVERY"] != "endpoint":
+        return []
+
+    try:
+        reverse("cbv_inspect:trace", kwargs={"request_id": "0"})
+    except NoReverseMatch:
+        return [
+            Warning(
+                "TOOLBAR_DELIVERY is 'endpoint' but cbv_inspect.urls is not included.",
+                hint=(
+                    "Add path('__cbv_inspect__/', include('cbv_inspect.urls')) to your "
+                    "root URLconf. Until then, the toolbar is inserted inline."
+                ),
+                id="cbv_inspect.W002",
+            )
+        ]
+
+    return []
+
+
+def check_compressing_middleware(app_configs: Any, **kwargs: Any) -> List[Warning]:
+    """
+    Check that no compressing middleware is listed after DjCbvInspectMiddleware.
+
+    Middleware listed after it compress responses before the toolbar is inserted:
+    brotli responses are left without the toolbar, and gzip responses are decompressed
+    and compressed again.
+    """
+
+    middleware: List[str] = list(getattr(settings, "MIDDLEWARE", None) or [])
+
+    if MIDDLEWARE_PATH not in middleware:
+        return []
+
+    inner_middleware = middleware[middleware.index(MIDDLEWARE_PATH) + 1 :]
+
+    return [
+        Warning(
+            f"{path} is listed after {MIDDLEWARE_PATH} in MIDDLEWARE.",
+            hint=(
+                f"Move it before {MIDDLEWARE_PATH}, so responses are compressed after "
+                "the toolbar is inserted. Brotli responses don't get the toolbar, and gzip "
+                "responses are decompressed and compressed again."
+            ),
+            id="cbv_inspect.W003",
+        )
+        for path in inner_middleware
+        if path in COMPRESSING_MIDDLEWARE
+    ]
@@ -24,3 +24,21 @@ def djcbv_exclude(view_func: Callable) -> Callable:
         return view_func(*args, **kwargs)
 
     return _wrapped_view
+
+
+def djcbv_trace_memory(view_func: Callable) -> Callable:
+    """
+    Attach a `djcbv_trace_memory` attribute to the incoming view function,
+    so DjCbvInspectMiddleware traces the memory allocations of its methods.
+
+    See `djcbv_exclude` for how the attribute gets exposed to the middleware.
+    """
+
+    if not isinstance(view_func, partial):
+        setattr(view_func, "djcbv_trace_memory", True)
+
+    @wraps(view_func)
+    def _wrapped_view(*args, **kwargs):
+        return view_func(*args, **kwargs)
+
+    return _wrapped_view
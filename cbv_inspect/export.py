@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from cbv_inspect import queries, utils
+
+# Bumped on changes that aren't backwards compatible, i.e. removed or renamed keys
+SCHEMA_VERSION = 1
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    Return a value as is if JSON can represent it, else its string representation.
+
+    Used for URL arguments, which path converters can turn into any type (i.e. UUID),
+    and for serialized method arguments and return values.
+    """
+
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    return str(value)
+
+
+def class_or_method_info_to_dict(info: Any) -> Optional[Dict[str, Any]]:
+    """
+    Return a `DjCbvClassOrMethodInfo` as a dict, or None for a super call
+    that couldn't be resolved (an empty dict).
+    """
+
+    if not info:
+        return None
+
+    return {"name": info.name, "signature": info.signature, "ccbv_link": info.ccbv_link}
+
+
+def query_stats_to_dict(stats: utils.DjCbvQueryStats) -> Dict[str, Any]:
+    return {
+        "count": stats.count,
+        "duration_ns": stats.duration_ns,
+        "fingerprints": [
+            {
+                "sql": fingerprint,
+                "count": count,
+                "duration_ns": stats.fingerprint_durations_ns[fingerprint],
+            }
+            for fingerprint, count in stats.fingerprint_counts
+        ],
+    }
+
+
+def repeated_query_to_dict(query: queries.DjCbvRepeatedQuery) -> Dict[str, Any]:
+    return {
+        "sql": query.fingerprint,
+        "count": query.count,
+        "duration_ns": query.duration_ns,
+        # the order of the origin call, None for queries run outside of any call
+        "origin": query.origin.order if query.origin is not None else None,
+        "call_path": list(query.call_path),
+    }
+
+
+def log_to_dict(log: utils.DjCbvLog) -> Dict[str, Any]:
+    """
+    Return a log as a dict, without its children.
+    """
+
+    return {
+        "order": log.order,
+        "name": log.name,
+        "signature": log.signature,
+        "path": log.path,
+        "ccbv_link": log.ccbv_link,
+        "args": to_json_value(log.args),
+        "kwargs": to_json_value(log.kwargs),
+        "return_value": to_json_value(log.return_value),
+        "truncation_notes": log.truncation_notes,
+        "super_calls": [class_or_method_info_to_dict(info) for info in log.super_calls or []],
+        "wall_ns": log.wall_ns,
+        "cpu_ns": log.cpu_ns,
+        "self_wall_ns": log.self_wall_ns,
+        "self_cpu_ns": log.self_cpu_ns,
+        "is_hot": log.is_hot,
+        "queries": query_stats_to_dict(log.queries),
+        "total_queries": query_stats_to_dict(log.total_queries),
+        "has_repeated_queries": log.has_repeated_queries,
+        "memory_bytes": log.memory_bytes,
+        "memory_peak_bytes": log.memory_peak_bytes,
+        "memory_top_lines": list(log.memory_top_lines),
+        "children": [],
+    }
+
+
+def get_call_tree(logs: Dict[int, utils.DjCbvLog]) -> List[Dict[str, Any]]:
+    """
+    Return the logs as a tree of dicts, each with the calls it made as "children".
+
+    Logs are ordered by call, so the parent of a log is the closest preceding log
+    with a smaller indent (as in `utils.set_log_timings`).
+    """
+
+    roots: List[Dict[str, Any]] = []
+    parents: List[utils.DjCbvLog] = []
+    nodes: Dict[int, Dict[str, Any]] = {}
+
+    for log in logs.values():
+        node = nodes[log.order] = log_to_dict(log)
+
+        while parents and parents[-1].indent >= log.indent:
+            parents.pop()
+
+        siblings = nodes[parents[-1].order]["children"] if parents else roots
+        siblings.append(node)
+        parents.append(log)
+
+    return roots
+
+
+def metadata_to_dict(metadata: utils.DjCbvRequestMetadata) -> Dict[str, Any]:
+    """
+    Return the trace of a request as a dict that can be dumped to JSON.
+
+    Timings, query durations and memory are in nanoseconds and bytes.
+    Method arguments and return values are serialized, so they're strings.
+    """
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "request_id": metadata.request_id,
+        "started_at": metadata.started_at,
+        "sampled": metadata.sampled,
+        "request": {
+            "path": metadata.path,
+            "method": metadata.method,
+            "view_path": metadata.view_path,
+            "url_name": metadata.url_name,
+            "args": [to_json_value(arg) for arg in metadata.args],
+            "kwargs": {key: to_json_value(value) for key, value in metadata.kwargs.items()},
+        },
+        "base_classes": [
+            class_or_method_info_to_dict(info) for info in metadata.base_classes or []
+        ],
+        "mro": [class_or_method_info_to_dict(info) for info in metadata.mro or []],
+        "trace_memory": metadata.trace_memory,
+        "total_wall_ns": metadata.total_wall_ns,
+        "calls": get_call_tree(metadata.logs),
+        "unattributed_queries": query_stats_to_dict(metadata.unattributed_queries),
+        "repeated_queries": [repeated_query_to_dict(query) for query in metadata.repeated_queries],
+    }
+
+
+def class_or_method_info_from_dict(data: Optional[Dict[str, Any]]) -> Any:
+    if data is None:
+        return {}
+
+    return utils.DjCbvClassOrMethodInfo(**data)
+
+
+def query_stats_from_dict(data: Dict[str, Any]) -> utils.DjCbvQueryStats:
+    fingerprints = data["fingerprints"]
+
+    return utils.DjCbvQueryStats(
+        count=data["count"],
+        duration_ns=data["duration_ns"],
+        fingerprints=Counter({item["sql"]: item["count"] for item in fingerprints}),
+        fingerprint_durations_ns=Counter(
+            {item["sql"]: item["duration_ns"] for item in fingerprints}
+        ),
+    )
+
+
+def log_from_dict(data: Dict[str, Any], parents: List[utils.DjCbvLog]) -> utils.DjCbvLog:
+    """
+    Return a log from its dict, called by its running `parents`, outermost first.
+    """
+
+    return utils.DjCbvLog(
+        order=data["order"],
+        indent=len(parents),
+        parent_list=[f"cbvInspect_{parent.order}_{parent.indent}" for parent in parents],
+        name=data["name"],
+        args=data["args"],
+        kwargs=data["kwargs"],
+        return_value=data["return_value"],
+        signature=data["signature"],
+        path=data["path"],
+        super_calls=[class_or_method_info_from_dict(info) for info in data["super_calls"]],
+        ccbv_link=data["ccbv_link"],
+        loaded_truncation_notes=data["truncation_notes"],
+        wall_ns=data["wall_ns"],
+        cpu_ns=data["cpu_ns"],
+        self_wall_ns=data["self_wall_ns"],
+        self_cpu_ns=data["self_cpu_ns"],
+        is_hot=data["is_hot"],
+        queries=query_stats_from_dict(data["queries"]),
+        total_queries=query_stats_from_dict(data["total_queries"]),
+        has_repeated_queries=data["has_repeated_queries"],
+        memory_bytes=data["memory_bytes"],
+        memory_peak_bytes=data["memory_peak_bytes"],
+        memory_top_lines=data["memory_top_lines"],
+    )
+
+
+def get_logs(calls: List[Dict[str, Any]]) -> Dict[int, utils.DjCbvLog]:
+    """
+    Return the logs of a call tree dumped by `get_call_tree`, by order.
+
+    Indents and parents are derived from the depth of each call in the tree.
+    """
+
+    logs: Dict[int, utils.DjCbvLog] = {}
+    # (call, running parents) pairs, walked depth first in call order
+    pending: List[Tuple[Dict[str, Any], List[utils.DjCbvLog]]] = [
+        (call, []) for call in reversed(calls)
+    ]
+
+    while pending:
+        call, parents = pending.pop()
+        log = logs[call["order"]] = log_from_dict(call, parents)
+
+        if call["children"]:
+            log.is_parent = True
+            pending.extend((child, parents + [log]) for child in reversed(call["children"]))
+
+    return logs
+
+
+def metadata_from_dict(data: Dict[str, Any]) -> utils.DjCbvRequestMetadata:
+    """
+    Return the metadata of a trace dumped by `metadata_to_dict`, i.e. from a trace store.
+
+    Values that JSON can't represent, like URL arguments converted to a UUID,
+    come back as their string representation.
+    """
+
+    if data["schema_version"] != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported trace schema version {data['schema_version']!r}")
+
+    request = data["request"]
+    logs = get_logs(data["calls"])
+
+    return utils.DjCbvRequestMetadata(
+        path=request["path"],
+        method=request["method"],
+        view_path=request["view_path"],
+        url_name=request["url_name"],
+        args=tuple(request["args"]),
+        kwargs=request["kwargs"],
+        logs=logs,
+        base_classes=[class_or_method_info_from_dict(info) for info in data["base_classes"]],
+        mro=[class_or_method_info_from_dict(info) for info in data["mro"]],
+        unattributed_queries=query_stats_from_dict(data["unattributed_queries"]),
+        trace_memory=data["trace_memory"],
+        sampled=data["sampled"],
+        request_id=data["request_id"],
+        started_at=data["started_at"],
+        repeated_queries=[
+            queries.DjCbvRepeatedQuery(
+                fingerprint=query["sql"],
+                count=query["count"],
+                duration_ns=query["duration_ns"],
+                origin=logs.get(query["origin"]),
+                call_path=query["call_path"],
+            )
+            for query in data["repeated_queries"]
+        ],
+    )
+
+
+def get_call_spans(logs: Dict[int, utils.DjCbvLog]) -> List[Tuple[utils.DjCbvLog, int, int]]:
+    """
+    Return (log, start, end) spans in nanoseconds from the start of the request,
+    laid out from the call tree and wall times, in call order.
+
+    Only durations are recorded, so calls are laid out back to back: the first child
+    of a call starts with it, and each sibling starts when the previous one ends.
+    The self time of a call shows after its last child. Children are clipped to
+    their parent, since overhead adjustments can leave them a bit longer.
+    """
+
+    spans: List[Tuple[utils.DjCbvLog, int, int]] = []
+    # running calls, with the end of their last child
+    parents: List[List[Any]] = []
+    next_root_ns = 0
+
+    for log in logs.values():
+        while parents and parents[-1][0].indent >= log.indent:
+            parents.pop()
+
+        if parents:
+            parent = parents[-1]
+            parent_end_ns = parent[1]
+            start_ns = min(parent[2], parent_end_ns)
+            end_ns = min(start_ns + log.wall_ns, parent_end_ns)
+            parent[2] = end_ns
+        else:
+            start_ns = next_root_ns
+            end_ns = next_root_ns = start_ns + log.wall_ns
+
+        spans.append((log, start_ns, end_ns))
+        parents.append([log, end_ns, start_ns])
+
+    return spans
+
+
+def get_trace_name(metadata: utils.DjCbvRequestMetadata) -> str:
+    return f"{metadata.method} {metadata.path} ({metadata.view_path})"
+
+
+def metadata_to_chrome_trace(metadata: utils.DjCbvRequestMetadata) -> Dict[str, Any]:
+    """
+    Return the call tree of a request in the Chrome Trace Event Format,
+    for Perfetto or chrome://tracing.
+
+    Each call is a complete ("X") event, timed in microseconds from the start
+    of the request, see `get_call_spans`.
+    """
+
+    events: List[Dict[str, Any]] = [
+        {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": get_trace_name(metadata)}},
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "view"}},
+    ]
+
+    for log, start_ns, end_ns in get_call_spans(metadata.logs):
+        events.append(
+            {
+                "name": log.name,
+                "cat": "cbv",
+                "ph": "X",
+                "ts": start_ns / 1e3,
+                "dur": (end_ns - start_ns) / 1e3,
+                "pid": 1,
+                "tid": 1,
+                "args": {
+                    "order": log.order,
+                    "signature": log.signature,
+                    "path": log.path,
+                    "self_wall_ms": log.self_wall_ms,
+                    "cpu_ms": log.cpu_ns / 1e6 if log.cpu_ns is not None else None,
+                    "queries": log.queries.count,
+                    "total_queries": log.total_queries.count,
+                },
+            }
+        )
+
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"request_id": metadata.request_id, "started_at": metadata.started_at},
+    }
+
+
+def metadata_to_speedscope(metadata: utils.DjCbvRequestMetadata) -> Dict[str, Any]:
+    """
+    Return the call tree of a request as an evented speedscope profile,
+    with calls opened and closed in nanoseconds from the start of the request,
+    see `get_call_spans`.
+    """
+
+    frames: List[Dict[str, Any]] = []
+    frame_indexes: Dict[Tuple[str, Optional[str]], int] = {}
+    events: List[Dict[str, Any]] = []
+    # running calls, with their frame and end
+    stack: List[Tuple[utils.DjCbvLog, int, int]] = []
+
+    def close_calls(indent: int) -> None:
+        while stack and stack[-1][0].indent >= indent:
+            _, frame, end_ns = stack.pop()
+            events.append({"type": "C", "frame": frame, "at": end_ns})
+
+    for log, start_ns, end_ns in get_call_spans(metadata.logs):
+        key = (log.name, log.path)
+
+        if key not in frame_indexes:
+            frame_indexes[key] = len(frames)
+            frames.append({"name": log.name, "file": log.path} if log.path else {"name": log.name})
+
+        close_calls(log.indent)
+        events.append({"type": "O", "frame": frame_indexes[key], "at": start_ns})
+        stack.append((log, frame_indexes[key], end_ns))
+
+    close_calls(0)
+    name = get_trace_name(metadata)
+
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "django-cbv-inspect",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "evented",
+                "name": name,
+                "unit": "nanoseconds",
+                "startValue": 0,
+                "endValue": metadata.total_wall_ns,
+                "events": events,
+            }
+        ],
+    }
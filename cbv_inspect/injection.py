@@ -0,0 +1,197 @@
+import zlib
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Type
+
+BODY_END = b"</body>"
+# zlib window bits for the gzip format
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def rfind_body_end(content: bytes) -> int:
+    """
+    Return the index of the last case-insensitive closing body tag in html, or -1.
+
+    Searches back from the end for `</` and compares the tag name, so the content
+    is neither decoded nor lowercased (copied). Only the closing tags after the
+    closing body tag (usually just `</html>`) are compared.
+    """
+
+    end = len(content)
+
+    while True:
+        index = content.rfind(b"</", 0, end)
+
+        if index == -1 or content[index + 2 : index + len(BODY_END)].lower() == b"body>":
+            return index
+
+        end = index
+
+
+def splice(content: bytes, index: int, insert: bytes) -> bytes:
+    """
+    Return content with bytes inserted at an index, copying the content once.
+    """
+
+    view = memoryview(content)
+
+    return b"".join((view[:index], insert, view[index:]))
+
+
+class DjCbvStreamInjector:
+    """
+    Insert content before the last closing body tag of a stream of chunks,
+    like `rfind_body_end` does for buffered responses.
+
+    A closing body tag may turn out not to be the last one (i.e. in an inline script),
+    so the last one found is held back, with the bytes after it, until a later one is
+    found or the stream ends. That tail is normally tiny (`</html>`), but a page with
+    an early closing body tag is held back from there.
+
+    The closing body tag may be split across chunks, so the last `len(BODY_END) - 1`
+    bytes of each chunk are held back and scanned again with the next chunk.
+    Only new bytes are scanned, and everything before the held back bytes is passed
+    on as soon as it's scanned.
+    """
+
+    CARRY_SIZE = len(BODY_END) - 1
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        # the held back bytes, starting with the last closing body tag if one was found
+        self.held = b""
+        self.found = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        """
+        Scan a chunk and return the bytes that can be sent on.
+        """
+
+        buffer = self.held + chunk
+        # held back bytes were scanned already, except where a split closing body tag
+        # can start (a held back closing body tag is always before that)
+        start = max(len(self.held) - self.CARRY_SIZE, 0)
+        index = buffer[start:].lower().rfind(BODY_END)
+
+        if index != -1:
+            index += start
+            self.found = True
+            self.held = buffer[index:]
+            return buffer[:index]
+
+        if self.found:
+            self.held = buffer
+            return b""
+
+        split = max(len(buffer) - self.CARRY_SIZE, 0)
+        self.held = buffer[split:]
+
+        return buffer[:split]
+
+    def flush(self) -> bytes:
+        """
+        Return the bytes held back at the end of the stream, with the content inserted
+        before the last closing body tag.
+        """
+
+        held, self.held = self.held, b""
+
+        if self.found:
+            self.found = False
+            return self.content + held
+
+        return held
+
+
+class DjCbvGzipStreamInjector(DjCbvStreamInjector):
+    """
+    Insert content before the last closing body tag of a gzip compressed stream of chunks.
+
+    Chunks are decompressed, scanned and compressed again as a single gzip member,
+    flushing the compressor after each chunk so the stream stays incremental.
+    Every chunk is recompressed, even after the closing body tag, since the
+    compressed bytes of the rest of the stream change with the inserted content.
+    """
+
+    def __init__(self, content: bytes) -> None:
+        super().__init__(content)
+        self.decompressor = zlib.decompressobj(GZIP_WBITS)
+        self.compressor = zlib.compressobj(wbits=GZIP_WBITS)
+
+    def decompress(self, chunk: bytes) -> bytes:
+        """
+        Decompress a chunk, which can span several gzip members,
+        i.e. when each chunk of a stream was compressed on its own.
+        """
+
+        data = []
+
+        while chunk:
+            data.append(self.decompressor.decompress(chunk))
+
+            if not self.decompressor.eof:
+                break
+
+            chunk = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(GZIP_WBITS)
+
+        return b"".join(data)
+
+    def feed(self, chunk: bytes) -> bytes:
+        chunk = super().feed(self.decompress(chunk))
+
+        if not chunk:
+            return b""
+
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        return self.compressor.compress(super().flush()) + self.compressor.flush()
+
+
+# Injectors by the Content-Encoding of the responses they handle
+INJECTORS: Dict[str, Type[DjCbvStreamInjector]] = {
+    "": DjCbvStreamInjector,
+    "gzip": DjCbvGzipStreamInjector,
+}
+
+
+def inject_stream(
+    chunks: Iterable[bytes], content: bytes, content_encoding: str = ""
+) -> Iterator[bytes]:
+    """
+    Wrap the `streaming_content` of a response to insert content before its closing body tag.
+    """
+
+    injector = INJECTORS[content_encoding](content)
+
+    for chunk in chunks:
+        chunk = injector.feed(chunk)
+
+        # Don't send empty chunks, i.e. for a chunk shorter than the carry-over window
+        if chunk:
+            yield chunk
+
+    tail = injector.flush()
+
+    if tail:
+        yield tail
+
+
+async def ainject_stream(
+    chunks: AsyncIterable[bytes], content: bytes, content_encoding: str = ""
+) -> AsyncIterator[bytes]:
+    """
+    Async version of `inject_stream`, for responses streaming an async iterator.
+    """
+
+    injector = INJECTORS[content_encoding](content)
+
+    async for chunk in chunks:
+        chunk = injector.feed(chunk)
+
+        if chunk:
+            yield chunk
+
+    tail = injector.flush()
+
+    if tail:
+        yield tail
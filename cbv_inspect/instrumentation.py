@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Any, Callable, Dict, Optional, Type
+
+from django.http import HttpRequest
+
+from cbv_inspect.mixins import DjCbvInspectMixin
+
+_instrumented_classes: Dict[Type, Type] = {}
+# installing a setup hook reads then writes the view class
+_lock = threading.Lock()
+
+
+def get_instrumented_class(view_class: Type) -> Type:
+    """
+    Return a subclass of a view class with `DjCbvInspectMixin` as its first base.
+
+    The subclass is built once per view class and cached, so the `__bases__` and MRO of the
+    view class are never modified (the view class only gets a setup hook, see
+    `install_setup_hook`).
+    """
+
+    instrumented_class: Optional[Type] = _instrumented_classes.get(view_class)
+
+    if instrumented_class is None:
+        # setdefault keeps the first class built if concurrent requests race here
+        instrumented_class = _instrumented_classes.setdefault(
+            view_class,
+            type(
+                view_class.__name__,
+                (DjCbvInspectMixin, view_class),
+                {
+                    "__module__": view_class.__module__,
+                    "__qualname__": view_class.__qualname__,
+                    "__doc__": view_class.__doc__,
+                    "_djcbv_view_class": view_class,
+                    # skip the setup hook, which would otherwise be the inspected setup
+                    "setup": get_original_setup(view_class),
+                },
+            ),
+        )
+
+    return instrumented_class
+
+
+def get_original_setup(view_class: Type) -> Callable:
+    """
+    Return the `setup` method a view class had before a setup hook was installed.
+    """
+
+    setup = view_class.setup
+
+    return getattr(setup, "_djcbv_original_setup", setup)
+
+
+def install_setup_hook(view_class: Type) -> None:
+    """
+    Install a `setup` method on a view class that switches its instances to the
+    instrumented view class (see `get_instrumented_class`) for inspected requests.
+
+    The view function calls `setup` first, so the rest of the view runs instrumented,
+    while Django still calls the view function itself: decorators, `ATOMIC_REQUESTS`,
+    response checks and the `process_view` and `process_exception` hooks of all
+    middleware run as they would without inspection.
+
+    The hook is installed once per view class, and only switches instances of the view
+    class the middleware marked the request for, so other requests and views nested
+    in an inspected view run as is.
+
+    The hook is assigned to the view class itself and stays there for the life of the
+    process, so every later request to the view goes through it, inspected or not.
+    For requests that aren't inspected, it checks the request for the mark and calls
+    the original `setup`.
+    """
+
+    with _lock:
+        if hasattr(view_class.__dict__.get("setup"), "_djcbv_original_setup"):
+            return
+
+        original_setup = get_original_setup(view_class)
+
+        @functools.wraps(original_setup)
+        def setup(self: Any, request: HttpRequest, *args: Any, **kwargs: Any) -> None:
+            if getattr(request, "_djcbv_view_class", None) is type(self):
+                self.__class__ = get_instrumented_class(type(self))
+                # goes through `DjCbvInspectMixin.__getattribute__`, so setup is inspected
+                return self.setup(request, *args, **kwargs)
+
+            return original_setup(self, request, *args, **kwargs)
+
+        setup._djcbv_original_setup = original_setup
+        view_class.setup = setup
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.http import HttpRequest
+
+from cbv_inspect import utils
+from cbv_inspect.settings import get_config
+
+# query string parameter to trace the memory of a single request
+TRACE_MEMORY_PARAM = "djcbv-trace-memory"
+
+try:
+    from tracemalloc import reset_peak
+except ImportError:  # pragma: no cover (Python < 3.9)
+    reset_peak = None
+
+# allocations of tracemalloc and cbv_inspect itself aren't shown as top lines
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, os.path.join(os.path.dirname(__file__), "*")),
+)
+
+_tracing_requests = 0
+_started_tracing = False
+_lock = threading.Lock()
+
+
+def should_trace_memory(request: HttpRequest, view_func: Callable) -> bool:
+    """
+    Determine if the memory of the method calls of a request should be traced.
+
+    Memory is traced for every request with the `TRACE_MEMORY` config, for views
+    decorated with `djcbv_trace_memory`, and for requests with the `djcbv-trace-memory`
+    query string parameter that would show the toolbar (i.e. not sampled requests
+    from any client).
+    """
+
+    from cbv_inspect.middleware import DjCbvInspectMiddleware
+
+    if get_config()["TRACE_MEMORY"] or hasattr(view_func, "djcbv_trace_memory"):
+        return True
+
+    return TRACE_MEMORY_PARAM in request.GET and DjCbvInspectMiddleware.show_toolbar(request)
+
+
+@contextlib.contextmanager
+def tracing(enabled: bool) -> Iterator[None]:
+    """
+    Start tracing memory allocations, if enabled, for as long as any request needs it.
+
+    If tracemalloc was already started (i.e. with `PYTHONTRACEMALLOC`), it's left running.
+    """
+
+    global _tracing_requests, _started_tracing
+
+    if not enabled:
+        yield
+        return
+
+    with _lock:
+        if not _tracing_requests and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+
+        _tracing_requests += 1
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _tracing_requests -= 1
+
+            if not _tracing_requests and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+
+class DjCbvMemoryTracker:
+    """
+    Measure the memory allocated by a traced call with `tracemalloc`.
+
+    The net allocated bytes are the traced memory at exit minus at entry.
+    The peak is measured from the entry of the call, with `tracemalloc.reset_peak`, so a
+    call's peak is carried over to its parent. Trackers of running calls are kept on a
+    per-request stack, like the timers.
+
+    Snapshots are taken at entry and exit to find the source lines allocating the most,
+    and are discarded once compared.
+    """
+
+    __slots__ = ("log", "stack", "top_lines", "started_bytes", "peak_bytes", "snapshot")
+
+    def __init__(self, log: utils.DjCbvLog, stack: List, top_lines: int) -> None:
+        self.log = log
+        self.stack = stack
+        self.top_lines = top_lines
+        self.started_bytes = 0
+        self.peak_bytes = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def __enter__(self) -> "DjCbvMemoryTracker":
+        # take the snapshot first, so the snapshot itself isn't counted for the call
+        if self.top_lines:
+            self.snapshot = tracemalloc.take_snapshot()
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        if self.stack:
+            self.stack[-1].update_peak(peak)
+
+        if reset_peak is not None:
+            reset_peak()
+
+        self.started_bytes = self.peak_bytes = current
+        self.stack.append(self)
+
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        self.stack.pop()
+        self.update_peak(peak)
+
+        self.log.memory_bytes = current - self.started_bytes
+
+        if reset_peak is not None:
+            self.log.memory_peak_bytes = self.peak_bytes - self.started_bytes
+
+        if self.stack:
+            self.stack[-1].update_peak(self.peak_bytes)
+
+        if self.snapshot is not None:
+            self.log.memory_top_lines = get_top_lines(
+                tracemalloc.take_snapshot(), self.snapshot, self.top_lines
+            )
+            self.snapshot = None
+
+    def update_peak(self, peak_bytes: int) -> None:
+        self.peak_bytes = max(self.peak_bytes, peak_bytes)
+
+
+def get_top_lines(
+    snapshot: tracemalloc.Snapshot, old_snapshot: tracemalloc.Snapshot, limit: int
+) -> List[str]:
+    """
+    Return the source lines that allocated the most between two snapshots.
+    """
+
+    stats = snapshot.filter_traces(SNAPSHOT_FILTERS).compare_to(
+        old_snapshot.filter_traces(SNAPSHOT_FILTERS), "lineno"
+    )
+
+    return [str(stat) for stat in stats[:limit] if stat.size_diff > 0]
+
+
+def get_tracker(
+    log: utils.DjCbvLog, metadata: utils.DjCbvRequestMetadata
+) -> contextlib.AbstractContextManager:
+    """
+    Return a memory tracker for a traced call, or a no-op one if memory isn't traced.
+    """
+
+    if not metadata.trace_memory or not tracemalloc.is_tracing():
+        return contextlib.nullcontext()
+
+    return DjCbvMemoryTracker(log, metadata.memory_stack, get_config()["MEMORY_TOP_LINES"])
+
+
+def get_heaviest_log(logs: Dict[int, utils.DjCbvLog]) -> Optional[utils.DjCbvLog]:
+    """
+    Return the log of the call that allocated the most memory (net), if memory was traced.
+    """
+
+    traced_logs = [log for log in logs.values() if log.memory_bytes is not None]
+
+    if not traced_logs:
+        return None
+
+    return max(traced_logs, key=lambda log: log.memory_bytes)
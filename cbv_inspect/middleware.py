@@ -1,12 +1,29 @@
-import re
-from typing import Callable, Dict, Tuple
+import asyncio
+import functools
+import gzip
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from django.conf import settings
-from django.http import HttpRequest, HttpResponse
-from django.urls import ResolverMatch, resolve
-
-from cbv_inspect import utils, views
-from cbv_inspect.mixins import DjCbvInspectMixin
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.urls import ResolverMatch
+from django.utils.module_loading import import_string
+from django.utils.text import compress_string
+
+from asgiref.sync import sync_to_async
+
+from cbv_inspect import (
+    injection,
+    instrumentation,
+    memory,
+    plans,
+    queries,
+    sampling,
+    stats,
+    utils,
+    views,
+)
+from cbv_inspect.settings import get_config
 
 
 class DjCbvToolbar:
@@ -19,7 +36,8 @@ class DjCbvToolbar:
         Attach metadata to request object.
         """
 
-        match: ResolverMatch = resolve(self.request.path)
+        match: ResolverMatch = utils.get_resolver_match(self.request)
+        view_plan = plans.get_view_plan(match.func.view_class)
 
         metadata = utils.DjCbvRequestMetadata(
             path=self.request.path,
@@ -28,63 +46,112 @@ class DjCbvToolbar:
             url_name=match.view_name,
             args=match.args,
             kwargs=match.kwargs,
-            base_classes=utils.get_bases(match.func.view_class),
-            mro=utils.get_mro(match.func.view_class),
+            base_classes=view_plan.base_classes,
+            mro=view_plan.mro,
+            budget=utils.DjCbvSerializationBudget(get_config()["MAX_REQUEST_LENGTH"]),
+            trace_memory=memory.should_trace_memory(self.request, match.func),
+            sampled=getattr(self.request, "_djcbv_sampled", False),
         )
 
         self.request._djcbv_inspect_metadata = metadata
 
-    def get_content(self) -> str:
+    def store(self) -> None:
+        """
+        Save the trace of the request to the trace store.
+        """
+        views.store_trace(self.request)
+
+    def get_content(self, response_size: int = 0) -> str:
         """
         Render the djCbv toolbar and return stringified markup.
+
+        With the "endpoint" `TOOLBAR_DELIVERY`, or for responses larger than
+        `INLINE_MAX_RESPONSE_SIZE`, only a loader snippet is rendered,
+        and the toolbar is fetched from the trace endpoint when opened.
         """
+
+        config = get_config()
+        max_size: Optional[int] = config["INLINE_MAX_RESPONSE_SIZE"]
+
+        if config["TOOLBAR_DELIVERY"] == "endpoint":
+            return views.render_djcbv_loader(self.request)
+
+        if max_size is not None and response_size > max_size:
+            return views.render_djcbv_loader(self.request)
+
         return views.render_djcbv_panel(self.request)
 
 
+@functools.lru_cache(maxsize=None)
+def import_callback(path: str) -> Callable:
+    return import_string(path)
+
+
 class DjCbvInspectMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response: Callable) -> None:
+        # Take the middleware out of the chain when no request could ever be inspected
+        if not self.is_enabled():
+            raise MiddlewareNotUsed("DEBUG is False and no show toolbar callback or sampling")
+
         self.get_response = get_response
 
-    @staticmethod
-    def show_toolbar() -> bool:
-        return settings.DEBUG
+        # Checked once here, `asyncio.iscoroutinefunction` is slow for a per request check
+        self.async_mode = asyncio.iscoroutinefunction(self.get_response)
+
+        # Run natively under ASGI instead of being adapted with a thread hop per request
+        if self.async_mode:
+            utils.markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
 
     @staticmethod
-    def _is_response_insertable(response: HttpResponse) -> bool:
+    def is_enabled() -> bool:
         """
-        Determine if djCbv content can be inserted into a response.
+        Determine at startup if any request could be inspected.
         """
 
-        content_type = response.get("Content-Type", "").split(";")[0]
-        content_encoding = response.get("Content-Encoding", "")
-        has_content = hasattr(response, "content")
-        is_html_content_type = content_type == "text/html"
-        gzipped_encoded = "gzip" in content_encoding
-        streaming_response = response.streaming
+        if settings.DEBUG or get_config()["SHOW_TOOLBAR_CALLBACK"] is not None:
+            return True
 
-        return (
-            has_content and is_html_content_type and not gzipped_encoded and not streaming_response
-        )
+        return sampling.is_enabled()
 
     @staticmethod
-    def _remove_djcbv_mixin(request: HttpRequest) -> None:
+    def show_toolbar(request: Optional[HttpRequest] = None) -> bool:
         """
-        Remove mixin if its present in a request's CBV view class.
+        Determine if the toolbar should be shown for a request, before resolving its URL.
+
+        Calls the `SHOW_TOOLBAR_CALLBACK` config if set (i.e. to check a header, a cookie
+        or the user), otherwise shows the toolbar when DEBUG is True.
         """
 
-        view_func = resolve(request.path).func
+        callback = get_config()["SHOW_TOOLBAR_CALLBACK"]
 
-        view_func.view_class.__bases__ = tuple(
-            x for x in view_func.view_class.__bases__ if x is not DjCbvInspectMixin
-        )
+        if callback is None:
+            return settings.DEBUG
+
+        if isinstance(callback, str):
+            callback = import_callback(callback)
+
+        return callback(request)
 
     @staticmethod
-    def _add_djcbv_mixin(view_func: Callable) -> None:
+    def _is_response_insertable(response: HttpResponse) -> bool:
         """
-        Insert mixin in a CBV view class.
+        Determine if djCbv content can be inserted into a response.
         """
 
-        view_func.view_class.__bases__ = (DjCbvInspectMixin, *view_func.view_class.__bases__)
+        content_type = response.get("Content-Type", "").split(";")[0]
+        content_encoding = response.get("Content-Encoding", "")
+        has_content = response.streaming or hasattr(response, "content")
+        is_html_content_type = content_type == "text/html"
+        # i.e. gzip, but not brotli
+        is_supported_encoding = content_encoding in injection.INJECTORS
+        # i.e. an HTML file downloaded with `FileResponse(..., as_attachment=True)`
+        is_attachment = response.get("Content-Disposition", "").lower().startswith("attachment")
+
+        return has_content and is_html_content_type and is_supported_encoding and not is_attachment
 
     @staticmethod
     def is_view_excluded(request: HttpRequest) -> bool:
@@ -92,7 +159,7 @@ class DjCbvInspectMiddleware:
         Check for `djcbv_exclude` attribute on view function.
         """
 
-        view_func = resolve(request.path).func
+        view_func = utils.get_resolver_match(request).func
 
         if hasattr(view_func, "djcbv_exclude"):
             return True
@@ -104,15 +171,18 @@ class DjCbvInspectMiddleware:
         Determine if the middleware should process the request.
 
         Will process requests that meet the following criteria:
-            1. class-based views
-            2. show_toolbar is True
+            1. show_toolbar is True, or the request is sampled
+            2. class-based views
             3. view is not excluded
+
+        Sampling is decided first, so requests that aren't sampled return early,
+        without resolving their URL unless there are per view sample rates.
         """
 
-        if not utils.is_cbv_request(request):
+        if not self.show_toolbar(request) and not sampling.sample_request(request):
             return False
 
-        if not self.show_toolbar():
+        if not utils.is_cbv_request(request):
             return False
 
         if self.is_view_excluded(request):
@@ -127,40 +197,173 @@ class DjCbvInspectMiddleware:
         For incoming requests:
             1. check if request should be processed
             2. prep the request object by attaching metadata object to it
-            3. attach the mixin to cbv class before view gets called
+            3. mark the request to run its view instrumented (see `process_view`)
 
         For outgoing responses:
-            1. remove the mixin from cbv class
-            2. render the djCbv toolbar html and attach to response
+            1. render the djCbv toolbar html and attach to response
         """
 
+        if self.async_mode:
+            return self.__acall__(request)
+
         if not self.should_process_request(request):
             return self.get_response(request)
 
         toolbar = DjCbvToolbar(request)
 
-        response = self.get_response(request)
+        metadata = request._djcbv_inspect_metadata
+
+        # Also records the queries of rendering a template response
+        with memory.tracing(metadata.trace_memory), queries.record_queries(metadata):
+            response = self.get_response(request)
+
+        self.finish(request, toolbar, response)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """
+        Async version of `__call__`.
+        """
 
-        self._remove_djcbv_mixin(request)
+        if not await self.run_show_toolbar_safely(self.should_process_request, request):
+            return await self.get_response(request)
 
-        if self._is_response_insertable(response):
-            content = response.content.decode(response.charset)
-            INSERT_BEFORE = "</body>"
-            response_parts = re.split(INSERT_BEFORE, content, flags=re.IGNORECASE)
+        # deciding whether to trace memory can call the show toolbar callback too
+        toolbar = await self.run_show_toolbar_safely(DjCbvToolbar, request)
+        metadata = request._djcbv_inspect_metadata
 
-            # insert djCbv content before closing body tag
-            if len(response_parts) > 1:
-                djcbv_content = toolbar.get_content()
-                response_parts[-2] += djcbv_content
-                response.content = INSERT_BEFORE.join(response_parts)
+        # Database connections are per thread, so record queries in the thread
+        # Django runs sync views and template rendering in for this request
+        recorder = queries.record_queries(metadata)
+        await sync_to_async(recorder.__enter__, thread_sensitive=True)()
 
-                if "Content-Length" in response:
-                    response["Content-Length"] = len(response.content)
+        try:
+            with memory.tracing(metadata.trace_memory):
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__, thread_sensitive=True)(None, None, None)
+
+        # Serializing logs and rendering the toolbar can touch the database
+        await sync_to_async(self.finish, thread_sensitive=True)(request, toolbar, response)
 
         return response
 
+    @staticmethod
+    async def run_show_toolbar_safely(func: Callable, request: HttpRequest) -> Any:
+        """
+        Call a function that can call the `SHOW_TOOLBAR_CALLBACK` config from async code.
+
+        Callbacks can touch the database (i.e. through `request.user`), which can't be done
+        from the event loop, so they run in the thread Django runs sync code in for the
+        request. Without a callback, the function is called as is, saving a thread hop.
+        """
+
+        if get_config()["SHOW_TOOLBAR_CALLBACK"] is None:
+            return func(request)
+
+        return await sync_to_async(func, thread_sensitive=True)(request)
+
+    def finish(self, request: HttpRequest, toolbar: DjCbvToolbar, response: HttpResponse) -> None:
+        """
+        Finalize the trace of the request and add it to the aggregated stats,
+        then store it if the request was sampled, or insert the toolbar into the response.
+        """
+
+        metadata: utils.DjCbvRequestMetadata = request._djcbv_inspect_metadata
+        views.finalize_metadata(metadata)
+
+        if get_config()["AGGREGATE_STATS"]:
+            stats.aggregator.add(metadata)
+
+        if metadata.sampled:
+            toolbar.store()
+        else:
+            self.insert_toolbar(toolbar, response)
+
+    def insert_toolbar(self, toolbar: DjCbvToolbar, response: HttpResponse) -> None:
+        """
+        Insert the djCbv toolbar html before the closing body tag of a response.
+        """
+
+        if not self._is_response_insertable(response):
+            return
+
+        if response.streaming:
+            self.insert_toolbar_into_stream(toolbar, response)
+            return
+
+        # Compressed responses (i.e. by the `gzip_page` decorator) stay compressed
+        gzipped = response.get("Content-Encoding", "") == "gzip"
+        content = gzip.decompress(response.content) if gzipped else response.content
+        index = injection.rfind_body_end(content)
+
+        # insert djCbv content before closing body tag
+        if index != -1:
+            djcbv_content = toolbar.get_content(len(content)).encode(response.charset)
+            content = injection.splice(content, index, djcbv_content)
+            response.content = compress_string(content) if gzipped else content
+
+            if "Content-Length" in response:
+                response["Content-Length"] = len(response.content)
+
+    def insert_toolbar_into_stream(
+        self, toolbar: DjCbvToolbar, response: StreamingHttpResponse
+    ) -> None:
+        """
+        Insert the djCbv toolbar html before the closing body tag of a streaming response.
+
+        The stream is scanned chunk by chunk as it's sent instead of being buffered.
+        The toolbar is rendered up front, as the view is done by the time it streams.
+        """
+
+        # The size of the stream is only known from its Content-Length, i.e. for files
+        content_length = int(response.get("Content-Length") or 0)
+        content = toolbar.get_content(content_length).encode(response.charset)
+        content_encoding = response.get("Content-Encoding", "")
+
+        # Django 4.2+ streams async iterators under ASGI
+        if getattr(response, "is_async", False):
+            response.streaming_content = injection.ainject_stream(
+                response.streaming_content, content, content_encoding
+            )
+        else:
+            response.streaming_content = injection.inject_stream(
+                response.streaming_content, content, content_encoding
+            )
+
+        if "Content-Length" in response:
+            del response["Content-Length"]
+
     def process_view(
-        self, request: HttpResponse, view_func: Callable, view_args: Tuple, view_kwargs: Dict
+        self, request: HttpRequest, view_func: Callable, view_args: Tuple, view_kwargs: Dict
     ) -> None:
-        if self.should_process_request(request):
-            self._add_djcbv_mixin(view_func)
+        """
+        Mark an inspected request for its view class to run instrumented.
+
+        Django then calls the view function as usual, and the setup hook installed on
+        the view class switches the view instance to its instrumented class, a cached
+        subclass with `DjCbvInspectMixin` as its first base (see `instrumentation`).
+        The view class itself only gets the setup hook, once.
+        """
+
+        self.mark_request(request, view_func)
+
+    async def aprocess_view(
+        self, request: HttpRequest, view_func: Callable, view_args: Tuple, view_kwargs: Dict
+    ) -> None:
+        """
+        Async version of `process_view`, used when the middleware runs in async mode.
+        """
+
+        self.mark_request(request, view_func)
+
+    @staticmethod
+    def mark_request(request: HttpRequest, view_func: Callable) -> None:
+        # The request was already checked in `__call__`, and only requests that
+        # passed have metadata attached, so there is no need to check it again.
+        if not hasattr(request, "_djcbv_inspect_metadata"):
+            return
+
+        instrumentation.install_setup_hook(view_func.view_class)
+        request._djcbv_view_class = view_func.view_class
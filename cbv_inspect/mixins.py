@@ -1,12 +1,16 @@
+from __future__ import annotations
+
+import asyncio
 import functools
-import inspect
 import logging
-from typing import Any, List
+import time
+from typing import Any, Coroutine, Dict, FrozenSet, List, Tuple, Type
 
+from django.http import HttpRequest
 from django.utils.decorators import method_decorator
 from django.utils.functional import cached_property
 
-from cbv_inspect import decorators, utils
+from cbv_inspect import decorators, memory, plans, utils
 
 logger = logging.getLogger("cbv_inspect.mixins")
 
@@ -16,71 +20,236 @@ class DjCbvInspectMixin:
     order = 1
 
     @cached_property
-    def allowed_callables(self) -> List:
+    def allowed_callables(self) -> FrozenSet[str]:
         """
-        Return list of all allowed methods.
+        Return names of all allowed methods.
         """
-        cbv_funcs = list(
-            filter(
-                lambda x: not x[0].startswith("__"),
-                inspect.getmembers(self.__class__, inspect.isfunction),
-            )
-        )
-        return [func[0] for func in cbv_funcs]
+        return plans.get_view_plan(get_view_class(self)).allowed_callables
 
     def __getattribute__(self, name: str) -> Any:
         attr = super().__getattribute__(name)
 
         if callable(attr) and name != "__class__" and name in self.allowed_callables:
             tab = "\t"
-            log = utils.DjCbvLog()
 
             @functools.wraps(attr)
             def wrapper(*args, **kwargs):
+                entered_ns = time.perf_counter_ns()
+                cpu_entered_ns = time.thread_time_ns()
                 logger.debug("%s (%s) %s", tab * self.indent, self.order, attr.__qualname__)
 
-                log.order = self.order
-                log.indent = self.indent
-
                 request = utils.get_request(self, attr, *args)
                 # if request not found, return attr lookup result
                 if request is None:
                     return attr(*args, **kwargs)
 
-                request._djcbv_inspect_metadata.logs[log.order] = log
-                utils.set_log_parents(self.order, request)
+                # A new log for every call, since the wrapper can be called more than once
+                plan = plans.get_method_plan(get_view_class(self), name, attr)
+                log = utils.DjCbvLog(
+                    order=self.order,
+                    indent=self.indent,
+                    name=plan.name,
+                    signature=plan.signature,
+                    path=plan.path,
+                    super_calls=plan.super_calls,
+                    ccbv_link=plan.ccbv_link,
+                )
+
+                metadata = request._djcbv_inspect_metadata
+                metadata.logs[log.order] = log
+                utils.set_log_parents(log.order, request)
+                timer = DjCbvCallTimer(log, metadata.call_stack, entered_ns, cpu_entered_ns)
+                # outside of the timer, so tracing memory counts as overhead
+                memory_tracker = memory.get_tracker(log, metadata)
 
                 # Prep for next call
                 self.indent += 1
                 self.order += 1
 
-                ret = attr(*args, **kwargs)
-
-                log.name = attr.__qualname__
-                log.args = utils.serialize_params(args)
-                log.kwargs = utils.serialize_params(kwargs)
-                log.return_value = utils.serialize_params(ret)
-                log.signature = utils.get_signature(attr)
-                log.path = utils.get_path(attr)
-                log.super_calls = utils.get_super_calls(attr)
-                log.ccbv_link = utils.get_ccbv_link(attr)
+                try:
+                    with memory_tracker, timer:
+                        ret = attr(*args, **kwargs)
+                except BaseException:
+                    timer.finish()
+                    raise
+                finally:
+                    # restore the indent even if the method raises
+                    self.indent = log.indent
 
-                self.indent -= 1
+                if asyncio.iscoroutine(ret):
+                    # Async handlers (and sync methods returning their coroutine, like
+                    # `View.dispatch`) only run once awaited, so trace them until then.
+                    return trace_coroutine(self, ret, timer, request, args, kwargs)
 
-                logger.debug(
-                    "%s (%s) result: %s",
-                    tab * self.indent,
-                    log.order,
-                    log.return_value.replace("\n", ""),
-                )
+                complete_log(log, request, args, kwargs, ret)
+                timer.finish()
 
                 return ret
 
+            if asyncio.iscoroutinefunction(attr):
+                wrapper = utils.markcoroutinefunction(wrapper)
+
             return wrapper
         return attr
 
 
+class DjCbvCallTimer:
+    """
+    Time a traced call with `perf_counter_ns` (wall time) and `thread_time_ns` (CPU time).
+
+    The time spent in the tracing wrapper itself (before and after the call) is the
+    overhead of the call, measured on both clocks. A call's overhead, plus the overhead
+    of all its traced children, is subtracted from its timings, and added to the overhead
+    of its parent.
+
+    Timers of running calls are kept on a per-request stack, so a call knows its parent.
+    """
+
+    __slots__ = (
+        "log",
+        "stack",
+        "entered_ns",
+        "cpu_entered_ns",
+        "started_ns",
+        "cpu_started_ns",
+        "stopped_ns",
+        "cpu_stopped_ns",
+    )
+
+    def __init__(
+        self, log: utils.DjCbvLog, stack: List, entered_ns: int, cpu_entered_ns: int
+    ) -> None:
+        self.log = log
+        self.stack = stack
+        self.entered_ns = entered_ns
+        self.cpu_entered_ns = cpu_entered_ns
+        self.started_ns = 0
+        self.cpu_started_ns = 0
+        self.stopped_ns = 0
+        self.cpu_stopped_ns = 0
+
+    def __enter__(self) -> "DjCbvCallTimer":
+        self.stack.append(self)
+
+        if not self.started_ns:
+            self.log.cpu_overhead_ns += time.thread_time_ns() - self.cpu_entered_ns
+            self.log.overhead_ns += time.perf_counter_ns() - self.entered_ns
+
+        self.cpu_started_ns = time.thread_time_ns()
+        self.started_ns = time.perf_counter_ns()
+
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stopped_ns = time.perf_counter_ns()
+        self.cpu_stopped_ns = time.thread_time_ns()
+        self.stack.pop()
+
+        self.log.wall_ns += self.stopped_ns - self.started_ns
+
+        if self.log.cpu_ns is not None:
+            self.log.cpu_ns += self.cpu_stopped_ns - self.cpu_started_ns
+
+    def add_child_overhead(self, overhead_ns: int, cpu_overhead_ns: int) -> None:
+        # the overhead of a child is within the parent's timings, so they can't go negative
+        self.log.overhead_ns += overhead_ns
+        self.log.wall_ns -= overhead_ns
+        self.log.cpu_overhead_ns += cpu_overhead_ns
+
+        if self.log.cpu_ns is not None:
+            self.log.cpu_ns -= cpu_overhead_ns
+
+    def finish(self) -> None:
+        """
+        Account for the overhead after the call, once its log is complete.
+        """
+
+        self.log.cpu_overhead_ns += time.thread_time_ns() - self.cpu_stopped_ns
+        self.log.overhead_ns += time.perf_counter_ns() - self.stopped_ns
+
+        if self.stack:
+            self.stack[-1].add_child_overhead(self.log.overhead_ns, self.log.cpu_overhead_ns)
+
+
+async def trace_coroutine(
+    instance: DjCbvInspectMixin,
+    coro: Coroutine,
+    timer: DjCbvCallTimer,
+    request: HttpRequest,
+    args: Tuple,
+    kwargs: Dict,
+) -> Any:
+    """
+    Await a coroutine returned by a traced method and complete its log.
+
+    Methods called while the coroutine runs are nested under the traced method.
+    """
+
+    log = timer.log
+    log.cpu_ns = None
+    # other tasks allocate while the coroutine is awaited
+    log.memory_bytes = log.memory_peak_bytes = None
+    log.memory_top_lines = []
+    instance.indent = log.indent + 1
+
+    try:
+        with timer:
+            ret = await coro
+    except BaseException:
+        timer.finish()
+        raise
+    finally:
+        instance.indent = log.indent
+
+    complete_log(log, request, args, kwargs, ret)
+    timer.finish()
+
+    return ret
+
+
+def complete_log(
+    log: utils.DjCbvLog, request: HttpRequest, args: Tuple, kwargs: Dict, ret: Any
+) -> None:
+    """
+    Capture the arguments and return value of a traced method call onto its log.
+    """
+
+    budget = request._djcbv_inspect_metadata.budget
+
+    log.args = utils.capture_params(args, budget)
+    log.kwargs = utils.capture_params(kwargs, budget)
+    log.return_value = utils.capture_params(ret, budget)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%s (%s) result: %s",
+            "\t" * log.indent,
+            log.order,
+            str(log.return_value).replace("\n", ""),
+        )
+
+
+def get_view_class(instance: DjCbvInspectMixin) -> Type:
+    """
+    Return the inspected view class of a view instance.
+
+    Instrumented view classes are subclasses built by the middleware, so return
+    the view class they were built from.
+
+    Note: `type()` is used so that this doesn't go through `__getattribute__`.
+    """
+
+    view_class = type(instance)
+    return getattr(view_class, "_djcbv_view_class", view_class)
+
+
 class DjCbvExcludeMixin:
     @method_decorator(decorators.djcbv_exclude)
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
+
+
+class DjCbvTraceMemoryMixin:
+    @method_decorator(decorators.djcbv_trace_memory)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Type
+
+from cbv_inspect import utils
+from cbv_inspect.settings import get_config
+
+
+@dataclass
+class DjCbvMethodPlan:
+    """
+    Dataclass to store the static metadata of a view method.
+    """
+
+    name: str
+    signature: str
+    path: str
+    super_calls: Optional[List[utils.DjCbvClassOrMethodInfo]]
+    ccbv_link: Optional[str]
+
+
+@dataclass
+class DjCbvViewPlan:
+    """
+    Dataclass to store the static metadata of a view class.
+
+    None of this metadata changes between requests, so it's computed the first time
+    a view class (or one of its methods) is inspected and reused after that.
+    Only the dynamic parts of a log (arguments, return value, ordering) are collected
+    on every request.
+
+    Method plans are keyed by attribute name, which is unique for a given view class.
+    """
+
+    base_classes: List[utils.DjCbvClassOrMethodInfo] = field(default_factory=list)
+    mro: List[utils.DjCbvClassOrMethodInfo] = field(default_factory=list)
+    allowed_callables: FrozenSet[str] = frozenset()
+    methods: Dict[str, DjCbvMethodPlan] = field(default_factory=dict)
+
+
+class DjCbvPlanCache:
+    """
+    A thread-safe LRU cache with weakly referenced keys.
+
+    Keys are view classes, so a plan never keeps a view class alive.
+    Plans don't reference their view class either (only names and strings).
+    """
+
+    def __init__(self) -> None:
+        self._data: OrderedDict[weakref.ref, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Type) -> Optional[Any]:
+        ref = weakref.ref(key)
+
+        with self._lock:
+            value = self._data.get(ref)
+
+            if value is not None:
+                self._data.move_to_end(ref)
+
+            return value
+
+    def set(self, key: Type, value: Any) -> None:
+        ref = weakref.ref(key)
+        maxsize: int = get_config()["PLAN_CACHE_SIZE"]
+
+        with self._lock:
+            self._data[ref] = value
+            self._data.move_to_end(ref)
+
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+plan_cache = DjCbvPlanCache()
+
+
+def get_view_plan(view_class: Type) -> DjCbvViewPlan:
+    """
+    Return the inspection plan of a view class, building it on first use.
+    """
+
+    plan: Optional[DjCbvViewPlan] = plan_cache.get(view_class)
+
+    if plan is None:
+        plan = DjCbvViewPlan(
+            base_classes=utils.get_bases(view_class),
+            mro=utils.get_mro(view_class),
+            allowed_callables=utils.get_allowed_callables(view_class),
+        )
+        plan_cache.set(view_class, plan)
+
+    return plan
+
+
+def get_method_plan(view_class: Type, name: str, method: Callable) -> DjCbvMethodPlan:
+    """
+    Return the inspection plan of a bound view method, building it on first use.
+    """
+
+    view_plan = get_view_plan(view_class)
+    plan: Optional[DjCbvMethodPlan] = view_plan.methods.get(name)
+
+    if plan is None:
+        plan = DjCbvMethodPlan(
+            name=method.__qualname__,
+            signature=utils.get_signature(method),
+            path=utils.get_path(method),
+            super_calls=utils.get_super_calls(method, view_class),
+            ccbv_link=utils.get_ccbv_link(method),
+        )
+        view_plan.methods[name] = plan
+
+    return plan
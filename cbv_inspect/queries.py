@@ -0,0 +1,177 @@
+import contextlib
+import functools
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from django.db import connections
+
+from cbv_inspect import utils
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDERS_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """
+    Return a SQL query with its values replaced by `?`, so queries that only differ
+    in their values (and in the number of values in a list) group together.
+    """
+
+    sql = WHITESPACE_RE.sub(" ", sql.strip())
+    sql = STRING_LITERAL_RE.sub("?", sql)
+    sql = NUMBER_LITERAL_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+
+    return PLACEHOLDERS_RE.sub("(...)", sql)
+
+
+class DjCbvQueryRecorder:
+    """
+    A database execute wrapper that attributes each query to the traced method running it.
+
+    A query counts for the innermost running call (`DjCbvLog.queries`), and for
+    every call on the call stack (`DjCbvLog.total_queries`).
+    """
+
+    def __init__(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        self.metadata = metadata
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+        started_ns = time.perf_counter_ns()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter_ns() - started_ns)
+
+    def record(self, sql: str, duration_ns: int) -> None:
+        key = fingerprint(sql)
+        call_stack = self.metadata.call_stack
+
+        if not call_stack:
+            self.metadata.unattributed_queries.add(key, duration_ns)
+            return
+
+        call_stack[-1].log.queries.add(key, duration_ns)
+
+        for timer in call_stack:
+            timer.log.total_queries.add(key, duration_ns)
+
+
+@contextlib.contextmanager
+def record_queries(metadata: utils.DjCbvRequestMetadata) -> Iterator[DjCbvQueryRecorder]:
+    """
+    Record the queries run on every database connection of the current thread.
+    """
+
+    recorder = DjCbvQueryRecorder(metadata)
+
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+        yield recorder
+
+
+@dataclass
+class DjCbvRepeatedQuery:
+    """
+    Dataclass to store a query fingerprint that ran repeatedly, i.e. an N+1 query.
+
+    The origin is the innermost method call that ran the fingerprint at least
+    `REPEATED_QUERY_THRESHOLD` times, including its children, or None for queries
+    run outside of any traced call. The call path lists the origin's callers.
+    """
+
+    fingerprint: str
+    count: int
+    duration_ns: int
+    origin: Optional[utils.DjCbvLog] = None
+    call_path: List[str] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1e6
+
+    @property
+    def wasted_ms(self) -> float:
+        """
+        Return the time of all but one average query, which a single query could save.
+        """
+
+        return self.duration_ns * (self.count - 1) / self.count / 1e6
+
+
+def get_repeated_queries(
+    metadata: utils.DjCbvRequestMetadata, threshold: int
+) -> List[DjCbvRepeatedQuery]:
+    """
+    Return the fingerprints that ran at least `threshold` times within a method call,
+    the most wasted time first, and mark their origin logs.
+
+    A call ranks as an origin when its total count for a fingerprint reaches the threshold,
+    but none of its children's does. Logs are ordered by call, so the ancestors of a log
+    are the preceding logs with a smaller indent (as in `utils.set_log_timings`).
+    """
+
+    candidates: Dict[int, Set[str]] = {}
+    covered: Dict[int, Set[str]] = {}
+    call_paths: Dict[int, List[str]] = {}
+    ancestors: List[utils.DjCbvLog] = []
+
+    for log in metadata.logs.values():
+        log.has_repeated_queries = False
+
+        while ancestors and ancestors[-1].indent >= log.indent:
+            ancestors.pop()
+
+        fingerprints = {
+            key for key, count in log.total_queries.fingerprints.items() if count >= threshold
+        }
+
+        if fingerprints:
+            candidates[log.order] = fingerprints
+            call_paths[log.order] = [ancestor.name for ancestor in ancestors]
+
+            for ancestor in ancestors:
+                covered.setdefault(ancestor.order, set()).update(fingerprints)
+
+        ancestors.append(log)
+
+    repeated_queries = []
+
+    for order, fingerprints in candidates.items():
+        log = metadata.logs[order]
+
+        for key in fingerprints - covered.get(order, set()):
+            log.has_repeated_queries = True
+            repeated_queries.append(
+                DjCbvRepeatedQuery(
+                    fingerprint=key,
+                    count=log.total_queries.fingerprints[key],
+                    duration_ns=log.total_queries.fingerprint_durations_ns[key],
+                    origin=log,
+                    call_path=call_paths[order],
+                )
+            )
+
+    unattributed = metadata.unattributed_queries
+
+    for key, count in unattributed.fingerprints.items():
+        if count >= threshold:
+            repeated_queries.append(
+                DjCbvRepeatedQuery(
+                    fingerprint=key,
+                    count=count,
+                    duration_ns=unattributed.fingerprint_durations_ns[key],
+                )
+            )
+
+    repeated_queries.sort(key=lambda query: query.wasted_ms, reverse=True)
+
+    return repeated_queries
@@ -0,0 +1,56 @@
+import random
+
+from django.http import HttpRequest
+
+from cbv_inspect import utils
+from cbv_inspect.settings import get_config
+
+
+def is_enabled() -> bool:
+    """
+    Determine if any request could be sampled.
+    """
+
+    config = get_config()
+
+    return bool(config["SAMPLE_RATES"]) or config["SAMPLE_RATE"] > 0
+
+
+def get_sample_rate(request: HttpRequest) -> float:
+    """
+    Return the sample rate of a request.
+
+    `SAMPLE_RATES` is keyed by URL name (with namespaces, i.e. "books:list") or
+    by dotted view path (i.e. "books.views.BookListView"), and falls back to `SAMPLE_RATE`.
+    The URL is only resolved when there are per view rates.
+    """
+
+    config = get_config()
+    rates = config["SAMPLE_RATES"]
+
+    if not rates:
+        return config["SAMPLE_RATE"]
+
+    match = utils.get_resolver_match(request)
+
+    if match.view_name in rates:
+        return rates[match.view_name]
+
+    return rates.get(match._func_path, config["SAMPLE_RATE"])
+
+
+def sample_request(request: HttpRequest) -> bool:
+    """
+    Decide whether to trace a request when the toolbar isn't shown, and mark it if so.
+
+    Sampled requests are traced to the trace store (see `stores.get_store`)
+    instead of getting a toolbar.
+    """
+
+    rate = get_sample_rate(request)
+
+    if rate <= 0 or random.random() >= rate:
+        return False
+
+    request._djcbv_sampled = True
+    return True
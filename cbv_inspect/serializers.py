@@ -0,0 +1,265 @@
+import itertools
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Set, Type
+
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Page, Paginator
+from django.db.models import Model, QuerySet
+from django.forms import BaseForm
+from django.http import HttpRequest
+
+from cbv_inspect.settings import get_config
+
+Serializer = Callable[[Any], str]
+
+_registry: Dict[Type, Serializer] = {}
+_lookup_cache: Dict[Type, Optional[Serializer]] = {}
+_lock = threading.Lock()
+
+CONTAINER_TYPES = (dict, list, set, frozenset, tuple)
+# reprlib style placeholders for containers nested deeper than `MAX_DEPTH`
+TRUNCATED_CONTAINERS = {
+    dict: "{...}",
+    list: "[...]",
+    set: "{...}",
+    frozenset: "frozenset({...})",
+    tuple: "(...)",
+}
+
+
+class DjCbvRepr:
+    """
+    Wrap a serialized value so `pformat` outputs it as is.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def __repr__(self) -> str:
+        return self.text
+
+
+def register(*types: Type) -> Callable[[Serializer], Serializer]:
+    """
+    Register a function to serialize objects of the given types for the toolbar.
+
+    The function takes the object and returns its string representation. Subclasses
+    of a registered type use the same function, unless they have one of their own.
+    Registering a type again replaces its function, so built-in serializers can be
+    overridden, i.e. in an `AppConfig.ready()` method:
+
+        @serializers.register(Book)
+        def serialize_book(book):
+            return f"<Book: {book.isbn}>"
+    """
+
+    def decorator(func: Serializer) -> Serializer:
+        with _lock:
+            for type_ in types:
+                _registry[type_] = func
+
+            _lookup_cache.clear()
+
+        return func
+
+    return decorator
+
+
+def get_serializer(obj_type: Type) -> Optional[Serializer]:
+    """
+    Return the serializer registered for the closest class in a type's MRO, if any.
+    """
+
+    try:
+        return _lookup_cache[obj_type]
+    except KeyError:
+        pass
+
+    serializer: Optional[Serializer] = None
+
+    for cls in obj_type.__mro__:
+        if cls in _registry:
+            serializer = _registry[cls]
+            break
+
+    _lookup_cache[obj_type] = serializer
+
+    return serializer
+
+
+class DjCbvTruncated(DjCbvRepr):
+    """
+    Marker for items cut off from a container, which `pformat` sorts last.
+    """
+
+    __slots__ = ()
+
+    def __lt__(self, other: Any) -> bool:
+        return False
+
+    def __gt__(self, other: Any) -> bool:
+        return True
+
+
+class DjCbvPreparer:
+    """
+    Prepare an object for `pformat` within the `MAX_DEPTH`, `MAX_ITEMS`
+    and `MAX_STRING_LENGTH` limits.
+
+    Every cut is counted in `notes`, keyed by the name of the limit.
+    """
+
+    def __init__(self, notes: Optional[Counter] = None) -> None:
+        config = get_config()
+        self.max_depth: int = config["MAX_DEPTH"]
+        self.max_items: int = config["MAX_ITEMS"]
+        self.max_string_length: int = config["MAX_STRING_LENGTH"]
+        self.notes: Counter = notes if notes is not None else Counter()
+        self.seen: Set[int] = set()
+
+    def prepare(self, obj: Any, depth: int = 1) -> Any:
+        """
+        Return a copy of an object where objects with a registered serializer are replaced
+        by their serialized value, and anything over the limits is cut off.
+
+        Builtin containers are walked and rebuilt. Containers that reference themselves
+        are returned as is, and `pformat` marks the recursion.
+        """
+
+        obj_type = type(obj)
+        serializer = get_serializer(obj_type)
+
+        if serializer is not None:
+            return DjCbvRepr(serializer(obj))
+
+        if obj_type is str and len(obj) > self.max_string_length:
+            self.notes["MAX_STRING_LENGTH"] += 1
+            return DjCbvRepr(f"{obj[:self.max_string_length]!r}...")
+
+        if obj_type not in CONTAINER_TYPES or not obj or id(obj) in self.seen:
+            return obj
+
+        if depth > self.max_depth:
+            self.notes["MAX_DEPTH"] += 1
+            return DjCbvRepr(TRUNCATED_CONTAINERS[obj_type])
+
+        self.seen.add(id(obj))
+
+        try:
+            return self.prepare_items(obj, depth)
+        finally:
+            self.seen.discard(id(obj))
+
+    def prepare_items(self, obj: Any, depth: int) -> Any:
+        obj_type = type(obj)
+        items = list(itertools.islice(obj.items() if obj_type is dict else obj, self.max_items))
+        cut = len(obj) - len(items)
+
+        if cut:
+            self.notes["MAX_ITEMS"] += cut
+
+        if obj_type is dict:
+            prepared = {key: self.prepare(value, depth + 1) for key, value in items}
+
+            if cut:
+                prepared[DjCbvTruncated("...")] = DjCbvRepr(f"<+{cut} more>")
+
+            return prepared
+
+        prepared_items = [self.prepare(item, depth + 1) for item in items]
+
+        if cut:
+            prepared_items.append(DjCbvTruncated(f"...<+{cut} more>"))
+
+        return obj_type(prepared_items)
+
+
+def prepare(obj: Any, notes: Optional[Counter] = None) -> Any:
+    """
+    Return a copy of an object for `pformat`, see `DjCbvPreparer.prepare`.
+    """
+
+    return DjCbvPreparer(notes).prepare(obj)
+
+
+@register(QuerySet)
+def serialize_queryset(queryset: QuerySet) -> str:
+    """
+    Serialize a QuerySet with its model and SQL, without evaluating it.
+
+    `QuerySet.__repr__` runs a query, which would add database load and change
+    the query counts of the inspected view.
+    """
+
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        sql = "EMPTY"
+
+    evaluated = ""
+
+    if queryset._result_cache is not None:
+        evaluated = f" ({len(queryset._result_cache)} results)"
+
+    return f"<<queryset {queryset.model._meta.label}{evaluated}: {sql}>>"
+
+
+@register(HttpRequest)
+def serialize_request(request: HttpRequest) -> str:
+    return "<<request>>"
+
+
+@register(BaseForm)
+def serialize_form(form: BaseForm) -> str:
+    """
+    Serialize a form without validating it.
+    """
+
+    if form._errors is None:
+        valid = "unknown"
+    else:
+        valid = form.is_bound and not form._errors
+
+    name = form.__class__.__name__
+    fields = ", ".join(form.fields)
+
+    return f"<<form {name}: bound={form.is_bound}, valid={valid}, fields=({fields})>>"
+
+
+@register(Paginator)
+def serialize_paginator(paginator: Paginator) -> str:
+    """
+    Serialize a Paginator without counting its objects, unless they were already counted.
+    """
+
+    per_page = paginator.per_page
+    count = paginator.__dict__.get("count", "unknown")
+    object_list = repr(prepare(paginator.object_list))
+
+    return f"<<paginator: per_page={per_page}, count={count}, object_list={object_list}>>"
+
+
+@register(Page)
+def serialize_page(page: Page) -> str:
+    """
+    Serialize a Page without counting the paginator's objects, unless already counted.
+    """
+
+    if "num_pages" in page.paginator.__dict__:
+        return f"<<page {page.number} of {page.paginator.num_pages}>>"
+
+    return f"<<page {page.number}>>"
+
+
+@register(Model)
+def serialize_model(instance: Model) -> str:
+    """
+    Serialize a model instance by its primary key.
+
+    `Model.__repr__` calls `__str__`, which could run queries for related objects.
+    """
+
+    return f"<{instance._meta.label}: pk={instance.pk!r}>"
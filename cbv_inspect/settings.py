@@ -0,0 +1,88 @@
+from functools import lru_cache
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+CONFIG_DEFAULTS: Dict[str, Any] = {
+    # Max number of view classes to keep inspection plans for
+    "PLAN_CACHE_SIZE": 512,
+    # When to serialize method arguments and return values:
+    #   "eager": right after each call
+    #   "snapshot": when the toolbar is rendered, from shallow copies taken after each call
+    #   "reference": when the toolbar is rendered, from the objects themselves
+    "SERIALIZE_MODE": "snapshot",
+    # How many levels of nested dicts, lists, sets and tuples a snapshot copies
+    "SNAPSHOT_DEPTH": 2,
+    # Per value serialization limits: nested container levels, items per container,
+    # characters per string and characters of the whole serialized value
+    "MAX_DEPTH": 5,
+    "MAX_ITEMS": 100,
+    "MAX_STRING_LENGTH": 1_000,
+    "MAX_VALUE_LENGTH": 20_000,
+    # Per request serialization limit: characters of all serialized values together
+    "MAX_REQUEST_LENGTH": 500_000,
+    # Inspect every class-based view in the root URLconf on startup,
+    # in a background thread unless WARMUP_BACKGROUND is False
+    "WARMUP": False,
+    "WARMUP_BACKGROUND": True,
+    # Number of methods with the most self time to highlight in the toolbar
+    "HOT_METHODS": 3,
+    # Number of times a query fingerprint runs within a method call to flag it as repeated
+    "REPEATED_QUERY_THRESHOLD": 3,
+    # Trace memory allocations of every inspected request with tracemalloc (slow),
+    # and the number of top allocating source lines to show for the heaviest method call
+    "TRACE_MEMORY": False,
+    "MEMORY_TOP_LINES": 10,
+    # Share of requests to trace when the toolbar isn't shown (DEBUG is False), between
+    # 0 and 1, and per URL name or dotted view path rates overriding it
+    "SAMPLE_RATE": 0.0,
+    "SAMPLE_RATES": {},
+    # Where sampled traces are stored, and the keyword arguments of the store class
+    "TRACE_STORE": "cbv_inspect.stores.DjCbvMemoryTraceStore",
+    "TRACE_STORE_OPTIONS": {},
+    # Function (or its dotted path) that takes a request and returns whether to show
+    # the toolbar, instead of showing it when DEBUG is True
+    "SHOW_TOOLBAR_CALLBACK": None,
+    # How the toolbar gets to the page:
+    #   "inline": inserted into the response
+    #   "endpoint": the trace is stored, and a small loader snippet inserted into the
+    #       response fetches the toolbar from the trace endpoint (see `cbv_inspect.urls`)
+    "TOOLBAR_DELIVERY": "inline",
+    # Size in bytes of responses above which the toolbar is delivered through the trace
+    # endpoint even when inline, or None to always insert it inline
+    "INLINE_MAX_RESPONSE_SIZE": 10 * 1024 * 1024,
+    # Link inline toolbars to downloads of their trace as JSON, a Chrome trace and a
+    # speedscope profile, which stores every trace shown (toolbars fetched from the
+    # trace endpoint always link to them)
+    "INLINE_EXPORT_LINKS": False,
+    # Aggregate the timings and queries of every traced request per view and method,
+    # for the stats dashboard, and the number of methods it ranks
+    "AGGREGATE_STATS": True,
+    "DASHBOARD_METHODS": 50,
+}
+
+SERIALIZE_MODES = ("eager", "snapshot", "reference")
+TOOLBAR_DELIVERIES = ("inline", "endpoint")
+
+
+@lru_cache(maxsize=None)
+def get_config() -> Dict[str, Any]:
+    """
+    Return the djCbv config, i.e. the defaults updated with `settings.CBV_INSPECT_CONFIG`.
+    """
+
+    config = CONFIG_DEFAULTS.copy()
+    config.update(getattr(settings, "CBV_INSPECT_CONFIG", {}))
+    return config
+
+
+@receiver(setting_changed)
+def reset_config(*, setting: str, **kwargs: Any) -> None:
+    """
+    Clear the cached config when `CBV_INSPECT_CONFIG` changes, i.e. with `override_settings`.
+    """
+
+    if setting == "CBV_INSPECT_CONFIG":
+        get_config.cache_clear()
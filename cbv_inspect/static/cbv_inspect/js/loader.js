@@ -0,0 +1,28 @@
+(function () {
+  const loader = document.getElementById('djCbvLoader');
+
+  loader.addEventListener('click', function () {
+    fetch(loader.dataset.url, {credentials: 'same-origin'})
+      .then(response => response.ok ? response.text() : Promise.reject(response.status))
+      .then(html => {
+        const container = document.createElement('div');
+        container.innerHTML = html;
+
+        // scripts inserted with innerHTML don't run, so recreate them
+        const loaded = Array.from(container.querySelectorAll('script')).map(oldScript => {
+          const script = document.createElement('script');
+          const done = new Promise(resolve => { script.onload = resolve; });
+          script.src = oldScript.src;
+          oldScript.replaceWith(script);
+          return done;
+        });
+
+        loader.replaceWith(container);
+        return Promise.all(loaded);
+      })
+      .then(() => {
+        document.querySelector('#djCbv #djCbvHandle').click();
+      })
+      .catch(status => { loader.title = `CBV inspect trace unavailable (${status})`; });
+  }, {once: true});
+})();
@@ -0,0 +1,78 @@
+const toolbarHandler = document.querySelector('#djCbv #djCbvHandle');
+const logContainer = document.querySelector("#djCbv .djcbv-panel");
+const djCbvExitPanelBtn = document.querySelector("#djCbv #djCbvExitPanel");
+const columnCollapseButtons = document.querySelectorAll('.cbvColCollapse');
+const parentToggleButtons = document.querySelectorAll('.cbvParentToggleButton');
+
+
+// Wire up event listeners
+toolbarHandler.addEventListener('click', toggleLogVisibility);
+
+djCbvExitPanelBtn.addEventListener('click', toggleLogVisibility);
+
+columnCollapseButtons.forEach(colCollapseButton => {
+  colCollapseButton.addEventListener('click', toggleColumnVisibility);
+})
+
+parentToggleButtons.forEach(toggleButton => {
+  toggleButton.addEventListener('click', toggleChildLogsVisibility)
+});
+
+
+// Event listener functions
+function toggleLogVisibility() {
+  logContainer.classList.toggle('djcbv-hidden');
+}
+
+function toggleColumnVisibility(e) {
+  colName = e.currentTarget.dataset.cbvCol;
+  tableCells = document.querySelectorAll(`#djCbv .cbvLogEntry td[data-cbv-col="${colName}"]`);
+
+  tableCells.forEach(cell => {
+    children = cell.children;
+    if (children.length > 0) {
+      Array.from(children).forEach(child => child.classList.toggle('djcbv-hidden'));
+    }
+  });
+
+  // // update current target's toggle button
+  if (e.currentTarget.innerHTML === '-') {
+    e.currentTarget.innerHTML = '+';
+  }
+
+  else if (e.currentTarget.innerHTML === '+') {
+    e.currentTarget.innerHTML = '-';
+  }
+}
+
+function toggleChildLogsVisibility(e){
+  const parent = e.currentTarget.closest('tr');
+  let parentOrder = parent.dataset.cbvOrder;
+  let parentTabIndex = parent.dataset.cbvTabIndex;
+  const descendantLogs = document.querySelectorAll(`tr.${parent.id}`);
+
+  // hide all descendents!
+  if (e.currentTarget.innerHTML === '-') {
+    descendantLogs.forEach(el => {
+      el.classList.add('djcbv-hidden');
+      let hasButton = el.querySelector('.cbvParentToggleButton');
+      hasButton ? hasButton.innerHTML = '+' : null;
+    });
+  }
+  // show all descendents!
+  else if (e.currentTarget.innerHTML === '+') {
+    descendantLogs.forEach(el => {
+      el.classList.remove('djcbv-hidden');
+      let hasButton = el.querySelector('.cbvParentToggleButton');
+      hasButton ? hasButton.innerHTML = '-' : null;
+    });
+  }
+
+  // update current target's toggle button
+  if (descendantLogs[0].classList.contains('djcbv-hidden')) {
+    e.currentTarget.innerHTML = '+';
+  }
+  else {
+    e.currentTarget.innerHTML = '-';
+  }
+}
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from cbv_inspect import utils
+
+
+class DjCbvHistogram:
+    """
+    A fixed-memory histogram of durations, for quantiles over any number of values.
+
+    Buckets are log-scaled: bucket 0 counts durations under `MIN_NS`, and each following
+    bucket is `GROWTH` times wider than the previous one, up to about 10 minutes
+    (the last bucket counts anything longer). Quantiles are the geometric middle of
+    their bucket, so they are within 5% of the actual value, and within the min and max.
+    """
+
+    MIN_NS = 1_000
+    GROWTH = 1.1
+    BUCKETS = 216
+
+    __slots__ = ("counts", "count", "min_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * self.BUCKETS
+        self.count = 0
+        self.min_ns: Optional[int] = None
+        self.max_ns: Optional[int] = None
+
+    def add(self, value_ns: int) -> None:
+        if value_ns < self.MIN_NS:
+            index = 0
+        else:
+            index = int(math.log(value_ns / self.MIN_NS, self.GROWTH)) + 1
+
+        self.counts[min(index, self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.min_ns = value_ns if self.min_ns is None else min(self.min_ns, value_ns)
+        self.max_ns = value_ns if self.max_ns is None else max(self.max_ns, value_ns)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the approximate value in nanoseconds below which a `q` share of values fall.
+        """
+
+        if not self.count:
+            return None
+
+        rank = max(math.ceil(q * self.count), 1)
+        seen = 0
+
+        for index, bucket_count in enumerate(self.counts):  # pragma: no branch
+            seen += bucket_count
+
+            if seen >= rank:
+                break
+
+        if index == 0:
+            value = self.MIN_NS / 2
+        elif index == self.BUCKETS - 1:
+            # the last bucket has no upper bound
+            value = self.max_ns
+        else:
+            value = self.MIN_NS * self.GROWTH ** (index - 0.5)
+
+        return min(max(value, self.min_ns), self.max_ns)
+
+
+@dataclass
+class DjCbvTimingStats:
+    """
+    Dataclass to store the aggregated timings and queries of a view or view method.
+    """
+
+    count: int = 0
+    wall_ns: int = 0
+    self_wall_ns: int = 0
+    queries: int = 0
+    histogram: DjCbvHistogram = field(default_factory=DjCbvHistogram)
+
+    def add(self, wall_ns: int, self_wall_ns: int, queries: int) -> None:
+        self.count += 1
+        self.wall_ns += wall_ns
+        self.self_wall_ns += self_wall_ns
+        self.queries += queries
+        self.histogram.add(wall_ns)
+
+    @property
+    def total_ms(self) -> float:
+        return self.wall_ns / 1e6
+
+    @property
+    def self_ms(self) -> float:
+        return self.self_wall_ns / 1e6
+
+    @property
+    def mean_ms(self) -> float:
+        return self.wall_ns / self.count / 1e6 if self.count else 0.0
+
+    @property
+    def p50_ms(self) -> Optional[float]:
+        return self.get_quantile_ms(0.5)
+
+    @property
+    def p95_ms(self) -> Optional[float]:
+        return self.get_quantile_ms(0.95)
+
+    @property
+    def p99_ms(self) -> Optional[float]:
+        return self.get_quantile_ms(0.99)
+
+    @property
+    def queries_per_call(self) -> float:
+        return self.queries / self.count if self.count else 0.0
+
+    def get_quantile_ms(self, q: float) -> Optional[float]:
+        value = self.histogram.quantile(q)
+        return None if value is None else value / 1e6
+
+
+# Stats that views and methods can be ranked by, the highest first
+STATS_ORDERINGS = (
+    "self_ms",
+    "total_ms",
+    "mean_ms",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "count",
+    "queries",
+)
+
+
+class DjCbvAggregator:
+    """
+    Aggregate the timings and queries of every traced request in this process,
+    per view class and per view method.
+
+    Memory is fixed per view class and method, as each keeps a `DjCbvHistogram`
+    rather than its timings.
+    """
+
+    def __init__(self) -> None:
+        self.views: Dict[str, DjCbvTimingStats] = {}
+        self.methods: Dict[Tuple[str, str], DjCbvTimingStats] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        """
+        Add the timings of a finalized request, see `views.finalize_metadata`.
+        """
+
+        view_path = metadata.view_path
+        logs = list(metadata.logs.values())
+        queries = metadata.unattributed_queries.count + sum(log.queries.count for log in logs)
+
+        with self._lock:
+            if view_path not in self.views:
+                self.views[view_path] = DjCbvTimingStats()
+
+            self.views[view_path].add(metadata.total_wall_ns, 0, queries)
+
+            for log in logs:
+                key = (view_path, log.name)
+
+                if key not in self.methods:
+                    self.methods[key] = DjCbvTimingStats()
+
+                self.methods[key].add(log.wall_ns, log.self_wall_ns, log.queries.count)
+
+    def get_views(
+        self, order_by: str = "p95_ms", limit: Optional[int] = None
+    ) -> List[Tuple[str, DjCbvTimingStats]]:
+        """
+        Return (view path, stats) pairs, ranked by a stat of `STATS_ORDERINGS`.
+        """
+
+        with self._lock:
+            items = list(self.views.items())
+
+        return rank(items, order_by, limit)
+
+    def get_methods(
+        self, order_by: str = "self_ms", limit: Optional[int] = None
+    ) -> List[Tuple[Tuple[str, str], DjCbvTimingStats]]:
+        """
+        Return ((view path, method name), stats) pairs, ranked by a stat of `STATS_ORDERINGS`.
+        """
+
+        with self._lock:
+            items = list(self.methods.items())
+
+        return rank(items, order_by, limit)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.views.clear()
+            self.methods.clear()
+            self.started_at = time.time()
+
+
+def rank(items: List, order_by: str, limit: Optional[int]) -> List:
+    """
+    Sort (key, stats) pairs by a stat, the highest first.
+    """
+
+    if order_by not in STATS_ORDERINGS:
+        raise ValueError(f"Can't rank by {order_by!r}, use one of {STATS_ORDERINGS}")
+
+    items.sort(key=lambda item: getattr(item[1], order_by) or 0, reverse=True)
+
+    return items[:limit]
+
+
+aggregator = DjCbvAggregator()
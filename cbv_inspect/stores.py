@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from cbv_inspect import utils
+from cbv_inspect.settings import get_config
+
+
+def dump_trace(metadata: utils.DjCbvRequestMetadata) -> str:
+    return metadata.to_json()
+
+
+def load_trace(data: str) -> utils.DjCbvRequestMetadata:
+    """
+    Return the metadata of a trace stored as JSON.
+
+    Traces are stored as JSON rather than pickled, so reading a tampered store
+    can't run code.
+    """
+
+    return utils.DjCbvRequestMetadata.from_dict(json.loads(data))
+
+
+class DjCbvTraceStore:
+    """
+    Base class of trace stores, which keep the metadata of traced requests by request ID.
+
+    Stored metadata is complete, i.e. its logs have their values serialized
+    (see `views.finalize_metadata`).
+    """
+
+    def save(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        raise NotImplementedError
+
+    def get(self, request_id: str) -> Optional[utils.DjCbvRequestMetadata]:
+        raise NotImplementedError
+
+    def list(self) -> List[utils.DjCbvRequestMetadata]:
+        """
+        Return all stored metadata, the most recent first.
+        """
+
+        raise NotImplementedError
+
+    def query(
+        self,
+        url_name: Optional[str] = None,
+        view_path: Optional[str] = None,
+        method: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        order_by: str = "-started_at",
+        limit: Optional[int] = 50,
+    ) -> List[utils.DjCbvRequestMetadata]:
+        """
+        Return the stored metadata matching all the given filters, i.e. the 50 slowest
+        traces of a view with `query(url_name="books:list", order_by="-total_wall_ns")`.
+
+        `since` and `until` are timestamps (like `time.time()`) the request started
+        at or after, and before. `order_by` is one of `QUERY_ORDERINGS`, prefixed with
+        "-" for descending order. `limit` is the max number of traces, or None for all.
+
+        This filters and sorts the result of `list()`, stores with indexes override it.
+        """
+
+        field_name, descending = parse_ordering(order_by)
+        filters = {"url_name": url_name, "view_path": view_path, "method": method}
+        filters = {key: value for key, value in filters.items() if value is not None}
+        traces = []
+
+        for metadata in self.list():
+            if any(getattr(metadata, key) != value for key, value in filters.items()):
+                continue
+
+            if since is not None and metadata.started_at < since:
+                continue
+
+            if until is not None and metadata.started_at >= until:
+                continue
+
+            traces.append(metadata)
+
+        traces.sort(key=lambda metadata: getattr(metadata, field_name), reverse=descending)
+
+        return traces[:limit]
+
+
+QUERY_ORDERINGS = ("started_at", "total_wall_ns")
+
+
+def parse_ordering(order_by: str) -> Tuple[str, bool]:
+    """
+    Return the field name of an ordering and whether it's descending.
+    """
+
+    field_name = order_by.lstrip("-")
+
+    if field_name not in QUERY_ORDERINGS:
+        raise ValueError(f"Can't order traces by {order_by!r}, use one of {QUERY_ORDERINGS}")
+
+    return field_name, order_by.startswith("-")
+
+
+class DjCbvMemoryTraceStore(DjCbvTraceStore):
+    """
+    Keep the `max_traces` most recent traces in memory, in this process only.
+    """
+
+    def __init__(self, max_traces: int = 100) -> None:
+        self.max_traces = max_traces
+        self._data: OrderedDict[str, utils.DjCbvRequestMetadata] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        with self._lock:
+            self._data[metadata.request_id] = metadata
+
+            while len(self._data) > self.max_traces:
+                self._data.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[utils.DjCbvRequestMetadata]:
+        return self._data.get(request_id)
+
+    def list(self) -> List[utils.DjCbvRequestMetadata]:
+        with self._lock:
+            return list(reversed(self._data.values()))
+
+
+class DjCbvCacheTraceStore(DjCbvTraceStore):
+    """
+    Keep traces in a Django cache, so they're shared between processes.
+
+    The IDs of the `max_traces` most recent traces are kept in an index entry, for `list()`.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        timeout: int = 3600,
+        max_traces: int = 100,
+        key_prefix: str = "cbv_inspect:trace:",
+    ) -> None:
+        self.alias = alias
+        self.timeout = timeout
+        self.max_traces = max_traces
+        self.key_prefix = key_prefix
+        self.index_key = f"{key_prefix}index"
+
+    @property
+    def cache(self) -> Any:
+        return caches[self.alias]
+
+    def save(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        index: List[str] = self.cache.get(self.index_key, [])
+        index = [metadata.request_id] + index[: self.max_traces - 1]
+
+        self.cache.set_many(
+            {self.key_prefix + metadata.request_id: metadata, self.index_key: index},
+            self.timeout,
+        )
+
+    def get(self, request_id: str) -> Optional[utils.DjCbvRequestMetadata]:
+        return self.cache.get(self.key_prefix + request_id)
+
+    def list(self) -> List[utils.DjCbvRequestMetadata]:
+        index: List[str] = self.cache.get(self.index_key, [])
+        traces = self.cache.get_many([self.key_prefix + request_id for request_id in index])
+
+        return [
+            traces[self.key_prefix + request_id]
+            for request_id in index
+            if self.key_prefix + request_id in traces
+        ]
+
+
+class DjCbvFileTraceStore(DjCbvTraceStore):
+    """
+    Keep the `max_traces` most recent traces as JSON files in a directory,
+    so they're shared between processes and survive restarts.
+
+    The directory is created private to the user running the app (mode 0700),
+    and an existing one must be owned by that user.
+    """
+
+    suffix = ".json"
+
+    def __init__(self, directory: str, max_traces: int = 100) -> None:
+        self.directory = directory
+        self.max_traces = max_traces
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+        # os.getuid is POSIX only
+        if hasattr(os, "getuid") and os.stat(self.directory).st_uid != os.getuid():
+            raise PermissionError(f"{self.directory} is not owned by the user running the app")
+
+    def get_path(self, request_id: str) -> str:
+        # request IDs come from URLs, so keep them from pointing outside the directory
+        return os.path.join(self.directory, os.path.basename(request_id) + self.suffix)
+
+    def get_paths(self) -> List[str]:
+        """
+        Return the paths of the stored traces, the most recent first.
+        """
+
+        paths = [
+            entry.path for entry in os.scandir(self.directory) if entry.name.endswith(self.suffix)
+        ]
+
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def save(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        path = self.get_path(metadata.request_id)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(dump_trace(metadata))
+
+        # readers never see a partly written file
+        os.replace(temp_path, path)
+
+        for old_path in self.get_paths()[self.max_traces :]:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:  # removed by another process
+                pass
+
+    def load(self, path: str) -> Optional[utils.DjCbvRequestMetadata]:
+        try:
+            with open(path, encoding="utf-8") as file:
+                return load_trace(file.read())
+        except FileNotFoundError:
+            return None
+
+    def get(self, request_id: str) -> Optional[utils.DjCbvRequestMetadata]:
+        return self.load(self.get_path(request_id))
+
+    def list(self) -> List[utils.DjCbvRequestMetadata]:
+        traces = (self.load(path) for path in self.get_paths())
+        return [metadata for metadata in traces if metadata is not None]
+
+
+class DjCbvSqliteTraceStore(DjCbvTraceStore):
+    """
+    Keep the `max_traces` most recent traces in a SQLite database file,
+    so they're shared between processes and survive restarts.
+
+    Traces are indexed by URL name, view path, HTTP method and start time, so `query()`
+    filters, sorts and limits them in SQLite and only loads the traces it returns.
+    The oldest traces are deleted as new ones are saved, like a ring buffer.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS traces (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id TEXT NOT NULL UNIQUE,
+            started_at REAL NOT NULL,
+            url_name TEXT,
+            view_path TEXT,
+            method TEXT,
+            total_wall_ns INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS traces_started_at ON traces (started_at);
+        CREATE INDEX IF NOT EXISTS traces_url_name ON traces (url_name, started_at);
+        CREATE INDEX IF NOT EXISTS traces_view_path ON traces (view_path, started_at);
+        CREATE INDEX IF NOT EXISTS traces_method ON traces (method, started_at);
+    """
+
+    def __init__(self, path: str, max_traces: int = 1000, timeout: float = 5.0) -> None:
+        self.path = path
+        self.max_traces = max_traces
+        self.timeout = timeout
+        # sqlite3 connections can't be shared between threads
+        self._local = threading.local()
+
+        with self.connection as connection:
+            # readers don't block the writer, and the other way around
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(self.SCHEMA)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            self._local.connection = connection
+
+        return connection
+
+    def save(self, metadata: utils.DjCbvRequestMetadata) -> None:
+        data = dump_trace(metadata)
+
+        with self.connection as connection:
+            cursor = connection.execute(
+                "INSERT OR REPLACE INTO traces"
+                " (request_id, started_at, url_name, view_path, method, total_wall_ns, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    metadata.request_id,
+                    metadata.started_at,
+                    metadata.url_name,
+                    metadata.view_path,
+                    metadata.method,
+                    metadata.total_wall_ns,
+                    data,
+                ),
+            )
+            connection.execute(
+                "DELETE FROM traces WHERE seq <= ?", (cursor.lastrowid - self.max_traces,)
+            )
+
+    def get(self, request_id: str) -> Optional[utils.DjCbvRequestMetadata]:
+        row = self.connection.execute(
+            "SELECT data FROM traces WHERE request_id = ?", (request_id,)
+        ).fetchone()
+
+        return load_trace(row[0]) if row is not None else None
+
+    def list(self) -> List[utils.DjCbvRequestMetadata]:
+        rows = self.connection.execute("SELECT data FROM traces ORDER BY seq DESC")
+        return [load_trace(data) for (data,) in rows]
+
+    def query(
+        self,
+        url_name: Optional[str] = None,
+        view_path: Optional[str] = None,
+        method: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        order_by: str = "-started_at",
+        limit: Optional[int] = 50,
+    ) -> List[utils.DjCbvRequestMetadata]:
+        # field names are checked against QUERY_ORDERINGS, which are also column names
+        field_name, descending = parse_ordering(order_by)
+        conditions = []
+        params: List[Any] = []
+        filters = {"url_name": url_name, "view_path": view_path, "method": method}
+
+        for column, value in filters.items():
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        if since is not None:
+            conditions.append("started_at >= ?")
+            params.append(since)
+
+        if until is not None:
+            conditions.append("started_at < ?")
+            params.append(until)
+
+        sql = "SELECT data FROM traces"
+
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+
+        # newest first among traces with the same value
+        sql += f" ORDER BY {field_name} {'DESC' if descending else 'ASC'}, seq DESC"
+
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self.connection.execute(sql, params)
+
+        return [load_trace(data) for (data,) in rows]
+
+
+@lru_cache(maxsize=None)
+def get_store() -> DjCbvTraceStore:
+    """
+    Return the trace store set by the `TRACE_STORE` and `TRACE_STORE_OPTIONS` configs.
+    """
+
+    config = get_config()
+    store_class = import_string(config["TRACE_STORE"])
+
+    return store_class(**config["TRACE_STORE_OPTIONS"])
+
+
+@receiver(setting_changed)
+def reset_store(*, setting: str, **kwargs: Any) -> None:
+    """
+    Clear the cached store when `CBV_INSPECT_CONFIG` changes, i.e. with `override_settings`.
+    """
+
+    if setting == "CBV_INSPECT_CONFIG":
+        get_store.cache_clear()
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from cbv_inspect import views
+
+app_name = "cbv_inspect"
+
+urlpatterns = [
+    path("", views.dashboard, name="dashboard"),
+    path("trace/<str:request_id>/", views.trace, name="trace"),
+    path("trace/<str:request_id>/json/", views.trace_json, name="trace_json"),
+    path("trace/<str:request_id>/chrome/", views.trace_chrome, name="trace_chrome"),
+    path("trace/<str:request_id>/speedscope/", views.trace_speedscope, name="trace_speedscope"),
+]
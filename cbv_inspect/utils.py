@@ -1,18 +1,43 @@
 from __future__ import annotations
 
+import ast
+import asyncio
+import builtins
 import functools
 import inspect
+import json
 import logging
 import re
+import sys
+import threading
+import time
+import types
+import uuid
+import weakref
+from collections import Counter
 from dataclasses import dataclass, field
 from pprint import pformat
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Type, Union
 
 from django import get_version
 from django.http import HttpRequest
-from django.urls import resolve
+from django.urls import ResolverMatch, resolve
+
+from cbv_inspect import mixins, serializers
+from cbv_inspect.settings import get_config
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # pragma: no cover (asgiref < 3.6.0)
+
+    def markcoroutinefunction(func: Callable) -> Callable:
+        """
+        Mark a callable that returns a coroutine as a coroutine function.
+        """
+
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
 
-from cbv_inspect import mixins
 
 logger = logging.getLogger("cbv_inspect.utils")
 
@@ -21,6 +46,48 @@ class DjCbvException(Exception):
     pass
 
 
+@dataclass
+class DjCbvSerializationBudget:
+    """
+    Dataclass to store how many characters are left for serializing the method arguments
+    and return values of a request (see the `MAX_REQUEST_LENGTH` config).
+    """
+
+    remaining: int = sys.maxsize
+
+
+@dataclass
+class DjCbvQueryStats:
+    """
+    Dataclass to store the SQL queries run by a method call (or outside of any).
+
+    Queries are grouped by fingerprint, see `queries.fingerprint`.
+    """
+
+    count: int = 0
+    duration_ns: int = 0
+    fingerprints: Counter = field(default_factory=Counter)
+    fingerprint_durations_ns: Counter = field(default_factory=Counter)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1e6
+
+    @property
+    def fingerprint_counts(self) -> List[Tuple[str, int]]:
+        """
+        Return fingerprints with their number of queries, most common first.
+        """
+
+        return self.fingerprints.most_common()
+
+    def add(self, fingerprint: str, duration_ns: int) -> None:
+        self.count += 1
+        self.duration_ns += duration_ns
+        self.fingerprints[fingerprint] += 1
+        self.fingerprint_durations_ns[fingerprint] += duration_ns
+
+
 @dataclass
 class DjCbvRequestMetadata:
     """
@@ -38,6 +105,54 @@ class DjCbvRequestMetadata:
     logs: Dict = field(default_factory=dict)
     base_classes: Optional[List] = None
     mro: Optional[List] = None
+    budget: DjCbvSerializationBudget = field(default_factory=DjCbvSerializationBudget)
+    # timers of the traced calls currently running, innermost last
+    call_stack: List = field(default_factory=list)
+    # queries run while no traced call was running, i.e. when rendering a template
+    unattributed_queries: DjCbvQueryStats = field(default_factory=DjCbvQueryStats)
+    # whether to trace memory allocations, and the trackers of the traced calls running
+    trace_memory: bool = False
+    memory_stack: List = field(default_factory=list)
+    # sampled requests are stored (see `stores.get_store`) rather than shown in a toolbar
+    sampled: bool = False
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: float = field(default_factory=time.time)
+    # repeated queries found once the request is done, see `queries.get_repeated_queries`
+    repeated_queries: List = field(default_factory=list)
+
+    @property
+    def total_wall_ns(self) -> int:
+        """
+        Return the wall time of the inspected calls, i.e. the calls made by the view function.
+        """
+
+        return sum(log.wall_ns for log in self.logs.values() if log.indent == 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the trace of the request as a dict, see `export.metadata_to_dict`.
+        """
+
+        from cbv_inspect import export
+
+        return export.metadata_to_dict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DjCbvRequestMetadata":
+        """
+        Return the metadata of a trace dumped by `to_dict`, see `export.metadata_from_dict`.
+        """
+
+        from cbv_inspect import export
+
+        return export.metadata_from_dict(data)
+
+    def to_json(self, **kwargs: Any) -> str:
+        """
+        Return the trace of the request as JSON, passing keyword arguments to `json.dumps`.
+        """
+
+        return json.dumps(self.to_dict(), **kwargs)
 
 
 @dataclass
@@ -62,6 +177,31 @@ class DjCbvLog:
     path: str = None
     super_calls: List[str] = field(default_factory=list)
     ccbv_link: str = None
+    # notes of a log loaded from JSON, whose values are already strings
+    # (see `export.metadata_from_dict`)
+    loaded_truncation_notes: List[str] = field(default_factory=list)
+
+    # Timings in nanoseconds, without the inspection overhead (see `DjCbvCallTimer`).
+    # CPU time is None for async calls, since other tasks run while they're awaited.
+    wall_ns: int = 0
+    cpu_ns: Optional[int] = 0
+    self_wall_ns: int = 0
+    self_cpu_ns: Optional[int] = 0
+    # the inspection overhead on each clock, including that of the traced children
+    overhead_ns: int = 0
+    cpu_overhead_ns: int = 0
+    is_hot: bool = False
+
+    # SQL queries run by the call itself, and including those of its children
+    queries: DjCbvQueryStats = field(default_factory=DjCbvQueryStats)
+    total_queries: DjCbvQueryStats = field(default_factory=DjCbvQueryStats)
+    # whether the call is the origin of repeated queries, see `queries.get_repeated_queries`
+    has_repeated_queries: bool = False
+
+    # Memory allocations in bytes, None unless traced (see `memory.DjCbvMemoryTracker`)
+    memory_bytes: Optional[int] = None
+    memory_peak_bytes: Optional[int] = None
+    memory_top_lines: List[str] = field(default_factory=list)
 
     @property
     def parents(self) -> str:
@@ -71,6 +211,37 @@ class DjCbvLog:
     def padding(self) -> int:
         return self.indent * 30
 
+    @property
+    def truncation_notes(self) -> List[str]:
+        """
+        Return notes about what was cut off when serializing the arguments and return value.
+        """
+
+        notes = list(self.loaded_truncation_notes)
+        values = (("args", self.args), ("kwargs", self.kwargs), ("return value", self.return_value))
+
+        for label, value in values:
+            if isinstance(value, DjCbvDeferredValue):
+                notes.extend(f"{label}: {note}" for note in value.truncation_notes)
+
+        return notes
+
+    @property
+    def wall_ms(self) -> float:
+        return self.wall_ns / 1e6
+
+    @property
+    def self_wall_ms(self) -> float:
+        return self.self_wall_ns / 1e6
+
+    @property
+    def cpu_ms(self) -> Optional[float]:
+        return None if self.cpu_ns is None else self.cpu_ns / 1e6
+
+    @property
+    def self_cpu_ms(self) -> Optional[float]:
+        return None if self.self_cpu_ns is None else self.self_cpu_ns / 1e6
+
 
 @dataclass
 class DjCbvClassOrMethodInfo:
@@ -90,12 +261,33 @@ def is_cbv_view(func: Callable) -> bool:
     return hasattr(func, "view_class")
 
 
+def get_resolver_match(request: HttpRequest) -> ResolverMatch:
+    """
+    Return the ResolverMatch for a request, walking the URL resolver at most once.
+
+    Django sets `request.resolver_match` right before view middleware runs, so reuse
+    it when it exists. Otherwise, resolve the path and cache the result on the request
+    so all following checks for the same request can share it.
+    """
+
+    match: Optional[ResolverMatch] = getattr(request, "resolver_match", None)
+
+    if match is None:
+        match = getattr(request, "_djcbv_resolver_match", None)
+
+    if match is None:
+        match = resolve(request.path_info)
+        request._djcbv_resolver_match = match
+
+    return match
+
+
 def is_cbv_request(request: HttpRequest) -> bool:
     """
     Determine if a request will map to a CBV.
     """
 
-    view_func = resolve(request.path).func
+    view_func = get_resolver_match(request).func
 
     return is_cbv_view(view_func)
 
@@ -124,6 +316,25 @@ get_bases = functools.partial(collect_parent_classes, attr="__bases__")
 get_mro = functools.partial(collect_parent_classes, attr="__mro__")
 
 
+def get_allowed_callables(cls: Type) -> FrozenSet[str]:
+    """
+    Return the names of all methods of a class that can be inspected (no dunder methods).
+    """
+
+    return frozenset(
+        name for name, _ in inspect.getmembers(cls, inspect.isfunction) if not name.startswith("__")
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_ccbv_version() -> str:
+    """
+    Return the Django version in the format ccbv.co.uk uses, i.e. "4.1".
+    """
+
+    return get_version().rsplit(".", 1)[0]
+
+
 def get_ccbv_link(obj: Union[Callable, Type]) -> Optional[str]:
     """
     Construct the ccbv.co.uk link for a class or method.
@@ -138,7 +349,7 @@ def get_ccbv_link(obj: Union[Callable, Type]) -> Optional[str]:
     from_auth: bool = module.startswith("django.contrib.auth.views")
 
     if from_generic or from_auth:
-        version = get_version().rsplit(".", 1)[0]
+        version = get_ccbv_version()
 
         if inspect.isroutine(obj):  # function or bound method?
             class_name, method_name = obj.__qualname__.rsplit(".", 1)
@@ -168,22 +379,161 @@ def get_path(obj: Callable) -> str:
     return path
 
 
-def serialize_params(obj: Any) -> str:
+def serialize_params(
+    obj: Any,
+    budget: Optional[DjCbvSerializationBudget] = None,
+    notes: Optional[Counter] = None,
+) -> str:
     """
     Return a stringified and masked representation of an object for
     function arguments, keyword arguments, and return values.
+
+    Objects with a registered serializer (see `cbv_inspect.serializers`) are serialized
+    with it, the masks catch any other request or queryset representations.
+
+    The result is cut off at the `MAX_VALUE_LENGTH` config, or at what is left of
+    the request budget. Anything cut off is counted in `notes`.
     """
 
-    formatted: str = pformat(obj)
+    notes = notes if notes is not None else Counter()
+
+    if budget is not None and budget.remaining <= 0:
+        notes["MAX_REQUEST_LENGTH"] += 1
+        return "..."
+
+    formatted: str = pformat(serializers.prepare(obj, notes))
 
     clean_funcs = [mask_request, mask_queryset]
 
     for clean_func in clean_funcs:
         formatted = clean_func(formatted)
 
+    max_length: int = get_config()["MAX_VALUE_LENGTH"]
+    limit = "MAX_VALUE_LENGTH"
+
+    if budget is not None and budget.remaining < max_length:
+        max_length = budget.remaining
+        limit = "MAX_REQUEST_LENGTH"
+
+    if len(formatted) > max_length:
+        notes[limit] += len(formatted) - max_length
+        formatted = formatted[:max_length] + "..."
+
+    if budget is not None:
+        budget.remaining -= min(len(formatted), max_length)
+
     return formatted
 
 
+TRUNCATION_NOTES = {
+    "MAX_DEPTH": "{count} containers nested deeper than {limit} levels cut off",
+    "MAX_ITEMS": "{count} items over {limit} per container cut off",
+    "MAX_STRING_LENGTH": "{count} strings longer than {limit} characters cut off",
+    "MAX_VALUE_LENGTH": "{count} characters over {limit} per value cut off",
+    "MAX_REQUEST_LENGTH": "cut off by the {limit} characters per request limit",
+}
+
+
+def format_truncation_notes(notes: Counter) -> List[str]:
+    """
+    Return a readable note for each serialization limit that cut something off.
+    """
+
+    config = get_config()
+
+    return [
+        TRUNCATION_NOTES[limit].format(count=count, limit=config[limit])
+        for limit, count in notes.items()
+        if count
+    ]
+
+
+class DjCbvDeferredValue:
+    """
+    A function argument, keyword arguments or return value that is serialized on first use.
+
+    Serializing is most of the per-call overhead of inspecting a view, so it's deferred
+    until the toolbar gets rendered. The reference to the value is dropped once
+    it's serialized.
+    """
+
+    __slots__ = ("_value", "_serialized", "_budget", "_notes")
+
+    def __init__(self, value: Any, budget: Optional[DjCbvSerializationBudget] = None) -> None:
+        self._value = value
+        self._serialized: Optional[str] = None
+        self._budget = budget
+        self._notes: Counter = Counter()
+
+    def __str__(self) -> str:
+        if self._serialized is None:
+            self._serialized = serialize_params(self._value, self._budget, self._notes)
+            self._value = None
+
+        return self._serialized
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self}>"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (str, DjCbvDeferredValue)):
+            return str(self) == str(other)
+
+        return NotImplemented
+
+    __hash__ = None
+
+    @property
+    def truncation_notes(self) -> List[str]:
+        """
+        Return notes about anything that was cut off when serializing the value.
+        """
+
+        str(self)
+        return format_truncation_notes(self._notes)
+
+
+def snapshot(obj: Any, depth: int) -> Any:
+    """
+    Return a copy of an object where dicts, lists, sets and tuples are copied `depth` levels deep.
+
+    Anything else is kept as a reference. Only exact builtin container types are copied,
+    since subclasses might not take their items as constructor arguments.
+    """
+
+    obj_type = type(obj)
+
+    if depth <= 0 or obj_type not in (dict, list, set, tuple):
+        return obj
+
+    if obj_type is dict:
+        return {key: snapshot(value, depth - 1) for key, value in obj.items()}
+
+    return obj_type(snapshot(item, depth - 1) for item in obj)
+
+
+def capture_params(
+    obj: Any, budget: Optional[DjCbvSerializationBudget] = None
+) -> DjCbvDeferredValue:
+    """
+    Capture function arguments, keyword arguments or return values for a log,
+    according to the `SERIALIZE_MODE` config.
+    """
+
+    config = get_config()
+    mode: str = config["SERIALIZE_MODE"]
+
+    if mode == "snapshot":
+        obj = snapshot(obj, config["SNAPSHOT_DEPTH"])
+
+    value = DjCbvDeferredValue(obj, budget)
+
+    if mode == "eager":
+        str(value)
+
+    return value
+
+
 def get_signature(obj: Callable) -> str:
     """
     Return the signature of a callable using inspect.Signature.
@@ -209,7 +559,7 @@ def mask_request(s: str) -> str:
     Subsitute an HttpRequests's string representation with a masked value.
     """
 
-    pattern = re.compile("<WSGIRequest: .*?>")
+    pattern = re.compile("<(?:WSGI|ASGI)Request: .*?>")
     mask = "<<request>>"
     return re.sub(pattern, mask, s)
 
@@ -250,47 +600,183 @@ def class_has_method(cls: Type, method: str) -> bool:
     return False
 
 
-def get_sourcecode(obj: Callable) -> str:
+class DjCbvSuperCallVisitor(ast.NodeVisitor):
+    """
+    Collect the `super().method(...)` calls of a function's syntax tree.
+
+    Each call is stored as (line, column, method name, dotted class name), where the class
+    name is the first argument of a two-argument `super(cls, self)` call, else None.
+    The class name is empty if the first argument isn't a (dotted) name.
+    """
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[int, int, str, Optional[str]]] = []
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        # super() calls in nested classes belong to those classes
+        pass
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+
+        if isinstance(func, ast.Attribute) and is_super_call(func.value):
+            super_args = func.value.args
+            # classes passed as other expressions than names can't be resolved statically
+            class_name = (get_dotted_name(super_args[0]) or "") if super_args else None
+            self.calls.append((node.lineno, node.col_offset, func.attr, class_name))
+
+        self.generic_visit(node)
+
+
+def is_super_call(node: ast.AST) -> bool:
+    """
+    Check if a node is a `super(...)` call.
+    """
+
+    return isinstance(node, ast.Call) and getattr(node.func, "id", None) == "super"
+
+
+def get_dotted_name(node: ast.AST) -> Optional[str]:
+    """
+    Return the dotted name of a name or attribute node, i.e. `views.BookView`.
+    """
+
+    if isinstance(node, ast.Name):
+        return node.id
+
+    if isinstance(node, ast.Attribute):
+        value = get_dotted_name(node.value)
+        return f"{value}.{node.attr}" if value else None
+
+    return None
+
+
+_super_calls_cache: "weakref.WeakKeyDictionary[types.CodeType, Tuple]" = weakref.WeakKeyDictionary()
+_mro_index_cache: "weakref.WeakKeyDictionary[Type, Tuple]" = weakref.WeakKeyDictionary()
+# WeakKeyDictionary writes are not atomic
+_cache_lock = threading.Lock()
+
+
+def parse_super_calls(func: Callable) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    Return the (method name, dotted class name) of every super call in a function,
+    in source order.
+
+    The source is parsed with `ast`, so calls in strings and comments are ignored,
+    and calls spanning multiple lines are found. The result is cached per code object.
+    """
+
+    code: types.CodeType = func.__code__
+
+    try:
+        return _super_calls_cache[code]
+    except KeyError:
+        pass
+
+    try:
+        source: str = inspect.getsource(func)
+    except (OSError, TypeError):  # no source, i.e. defined in a shell
+        source = ""
+
+    # methods are indented in their class body
+    if source[:1].isspace():
+        source = f"if 1:\n{source}"
+
+    visitor = DjCbvSuperCallVisitor()
+
+    for node in ast.parse(source).body:
+        visitor.generic_visit(node)
+
+    calls = tuple(
+        (method_name, class_name) for *_, method_name, class_name in sorted(visitor.calls)
+    )
+
+    with _cache_lock:
+        _super_calls_cache[code] = calls
+
+    return calls
+
+
+def get_mro_index(cls: Type) -> Tuple[Tuple[Type, ...], Dict[Type, int]]:
     """
-    Return an object's sourcecode without docstring and comments.
+    Return the MRO classes of a class except for DjCbvInspectMixin,
+    and the position of each of those classes in it. The result is cached per class.
     """
 
-    source: str = inspect.getsource(obj)
+    try:
+        return _mro_index_cache[cls]
+    except KeyError:
+        pass
 
-    # remove docstring if it exists
-    if obj.__doc__:
-        source = source.replace(obj.__doc__, "", 1)
+    mro = tuple(mro_cls for mro_cls in cls.__mro__ if mro_cls is not mixins.DjCbvInspectMixin)
+    index = {mro_cls: position for position, mro_cls in enumerate(mro)}
 
-    return re.sub(re.compile(r"#.*?\n"), "", source)
+    with _cache_lock:
+        _mro_index_cache[cls] = (mro, index)
 
+    return mro, index
+
+
+def resolve_super_class(func: Callable, class_name: Optional[str]) -> Optional[Type]:
+    """
+    Return the class a super call in a function starts the MRO search after.
 
-def get_super_calls(method: Callable) -> List:
+    That is the first argument of `super(cls, self)`, looked up in the function's globals,
+    or the class that defines the function for `super()`.
+    """
+
+    if class_name is None:
+        # the compiler gives functions with a zero-argument super() a __class__ cell
+        if "__class__" in func.__code__.co_freevars:
+            index = func.__code__.co_freevars.index("__class__")
+            return func.__closure__[index].cell_contents
+
+        return None
+
+    name, *attrs = class_name.split(".")
+    obj = func.__globals__.get(name, getattr(builtins, name, None))
+
+    for attr in attrs:
+        obj = getattr(obj, attr, None)
+
+    return obj if inspect.isclass(obj) else None
+
+
+def get_super_calls(method: Callable, view_class: Optional[Type] = None) -> List:
     """
     Extract, resolve, and return metadata for all super calls defined in a bound method.
+
+    Super calls are resolved against the MRO of `view_class`, which defaults to the class
+    of the object the method is bound to.
     """
 
-    source: str = get_sourcecode(method)
-    SUPER_PATTERN = re.compile(r"(super\(.*\)\.(?P<methodName>\w+)\(.*\))")
-    matches: List = re.findall(SUPER_PATTERN, source)
+    func: Callable = inspect.unwrap(getattr(method, "__func__", method))
+    calls = parse_super_calls(func)
 
-    if not matches:
+    if not calls:
         return
 
+    if view_class is None:
+        owner = method.__self__
+        view_class = owner if inspect.isclass(owner) else type(owner)
+
+    mro_classes, mro_index = get_mro_index(view_class)
     super_metadata: List[DjCbvClassOrMethodInfo] = []
-    view_instance_cls = method.__self__.__class__
-    mro_classes: List = list(
-        filter(lambda x: x.__name__ != "DjCBVInspectMixin", view_instance_cls.__mro__)
-    )
-    # the class that defines this method containing super calls
-    method_cls: Type = get_callable_source(method)
 
     # for each super call in method
-    for match in matches:
-        _, method_name = match
+    for method_name, class_name in calls:
         method_info = {}
+        # the class that defines this method containing super calls, or the class
+        # passed to super(), which the search for the super method starts after
+        start_cls: Optional[Type] = resolve_super_class(func, class_name)
+        position: Optional[int] = mro_index.get(start_cls)
+
+        if position is None:
+            super_metadata.append(method_info)
+            continue
 
-        # search remaining mro classes, after method_cls
-        for mro_cls in mro_classes[mro_classes.index(method_cls) + 1 :]:
+        # search remaining mro classes, after start_cls
+        for mro_cls in mro_classes[position + 1 :]:
             if class_has_method(mro_cls, method_name):
                 attr: Callable = getattr(mro_cls, method_name)
 
@@ -386,3 +872,48 @@ def set_log_parents(order: int, request: HttpRequest) -> None:
                     break
     except KeyError:
         pass
+
+
+def serialize_logs(logs: Dict[int, DjCbvLog]) -> None:
+    """
+    Serialize the deferred arguments and return values of logs, dropping the values.
+    """
+
+    for log in logs.values():
+        for value in (log.args, log.kwargs, log.return_value):
+            if isinstance(value, DjCbvDeferredValue):
+                str(value)
+
+
+def set_log_timings(logs: Dict[int, DjCbvLog], hot_count: int) -> None:
+    """
+    Derive the self times of logs and mark the `hot_count` logs with the most self time as hot.
+
+    The self time of a log is its time minus the time of its direct children.
+    Logs are ordered by call, so the direct children of a log are the following logs
+    one indent deeper, up to the next log at the same indent or less.
+    """
+
+    parents: List[DjCbvLog] = []
+
+    for log in logs.values():
+        log.self_wall_ns = log.wall_ns
+        log.self_cpu_ns = log.cpu_ns
+        log.is_hot = False
+
+        while parents and parents[-1].indent >= log.indent:
+            parents.pop()
+
+        if parents:
+            parent = parents[-1]
+            parent.self_wall_ns = max(parent.self_wall_ns - log.wall_ns, 0)
+
+            if parent.self_cpu_ns is not None:
+                parent.self_cpu_ns = max(parent.self_cpu_ns - (log.cpu_ns or 0), 0)
+
+        parents.append(log)
+
+    hottest = sorted(logs.values(), key=lambda log: log.self_wall_ns, reverse=True)
+
+    for log in hottest[:hot_count]:
+        log.is_hot = log.self_wall_ns > 0
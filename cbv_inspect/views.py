@@ -1,16 +1,207 @@
 from dataclasses import fields
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
 
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.template.loader import render_to_string
+from django.urls import NoReverseMatch, reverse
 from django.utils.safestring import SafeString
 
-from cbv_inspect.utils import DjCbvRequestMetadata
+from cbv_inspect import export, memory, queries, stats, stores
+from cbv_inspect.settings import get_config
+from cbv_inspect.utils import DjCbvRequestMetadata, serialize_logs, set_log_timings
 
 
-def render_djcbv_panel(request) -> SafeString:
+def finalize_metadata(metadata: DjCbvRequestMetadata) -> None:
+    """
+    Derive what's computed once a request is done: self times, hot methods and
+    repeated queries.
+    """
+
+    config = get_config()
+    set_log_timings(metadata.logs, config["HOT_METHODS"])
+    metadata.repeated_queries = queries.get_repeated_queries(
+        metadata, config["REPEATED_QUERY_THRESHOLD"]
+    )
+
+
+def store_trace(request) -> None:
+    """
+    Save the finalized metadata of a request to the trace store.
+
+    Values are serialized first, so the store doesn't keep the request's objects alive.
+    """
+
     metadata: DjCbvRequestMetadata = getattr(request, "_djcbv_inspect_metadata")
+    serialize_logs(metadata.logs)
+    stores.get_store().save(metadata)
 
+
+def get_panel_context(metadata: DjCbvRequestMetadata, export_links: bool = True) -> Dict[str, Any]:
     # creates a shallow copy of the metadata object
     # because we want to keep each log as a dataclass object
     ctx_data = dict((field.name, getattr(metadata, field.name)) for field in fields(metadata))
+    ctx_data["heaviest_memory_log"] = memory.get_heaviest_log(metadata.logs)
+    # exports are downloaded from the trace store, so only stored traces link to them
+    ctx_data["export_urls"] = get_export_urls(metadata) if export_links else {}
+
+    return ctx_data
+
+
+def get_export_urls(metadata: DjCbvRequestMetadata) -> Dict[str, str]:
+    """
+    Return the URLs to download a trace in each export format by their label,
+    or an empty dict if `cbv_inspect.urls` isn't included.
+    """
+
+    kwargs = {"request_id": metadata.request_id}
+
+    try:
+        return {
+            "JSON": reverse("cbv_inspect:trace_json", kwargs=kwargs),
+            "Chrome trace": reverse("cbv_inspect:trace_chrome", kwargs=kwargs),
+            "speedscope": reverse("cbv_inspect:trace_speedscope", kwargs=kwargs),
+        }
+    except NoReverseMatch:
+        return {}
+
+
+def render_djcbv_panel(request) -> SafeString:
+    """
+    Render the panel of a request.
+
+    With `INLINE_EXPORT_LINKS`, the panel links to the exports of the trace,
+    and the trace is stored so they can be downloaded.
+    """
+
+    metadata: DjCbvRequestMetadata = getattr(request, "_djcbv_inspect_metadata")
+    context = get_panel_context(metadata, get_config()["INLINE_EXPORT_LINKS"])
+
+    if context["export_urls"]:
+        store_trace(request)
+
+    return render_to_string("cbv_inspect/toolbar.html", context)
+
+
+def render_djcbv_loader(request) -> SafeString:
+    """
+    Store the trace of a request and render a snippet that fetches its panel when opened.
+
+    Falls back to rendering the panel inline if `cbv_inspect.urls` isn't included.
+    """
+
+    metadata: DjCbvRequestMetadata = getattr(request, "_djcbv_inspect_metadata")
+
+    try:
+        trace_url = reverse("cbv_inspect:trace", kwargs={"request_id": metadata.request_id})
+    except NoReverseMatch:
+        return render_djcbv_panel(request)
+
+    store_trace(request)
+
+    return render_to_string("cbv_inspect/loader.html", {"trace_url": trace_url})
+
+
+def get_stored_trace(request: HttpRequest, request_id: str) -> DjCbvRequestMetadata:
+    """
+    Return a stored trace, or raise Http404.
+
+    Only requests that would show the toolbar get to see traces.
+    """
+
+    from cbv_inspect.middleware import DjCbvInspectMiddleware
+
+    if not DjCbvInspectMiddleware.show_toolbar(request):
+        raise Http404("Traces are not available")
+
+    metadata = stores.get_store().get(request_id)
+
+    if metadata is None:
+        raise Http404("Trace not found")
+
+    return metadata
+
+
+def trace(request: HttpRequest, request_id: str) -> HttpResponse:
+    """
+    Return the panel of a stored trace, for the loader snippet.
+    """
+
+    metadata = get_stored_trace(request, request_id)
+
+    return HttpResponse(render_to_string("cbv_inspect/toolbar.html", get_panel_context(metadata)))
+
+
+def trace_json(request: HttpRequest, request_id: str) -> JsonResponse:
+    """
+    Return a stored trace as JSON, see `export.metadata_to_dict` for the schema.
+    """
+
+    metadata = get_stored_trace(request, request_id)
+
+    return JsonResponse(metadata.to_dict())
+
+
+def export_trace(
+    request: HttpRequest, request_id: str, to_dict: Callable, suffix: str
+) -> JsonResponse:
+    """
+    Return a stored trace exported by a function of `export`, as a file download.
+    """
+
+    metadata = get_stored_trace(request, request_id)
+    response = JsonResponse(to_dict(metadata))
+    response["Content-Disposition"] = (
+        f'attachment; filename="cbv-inspect-{metadata.request_id}.{suffix}"'
+    )
+
+    return response
+
+
+def trace_chrome(request: HttpRequest, request_id: str) -> JsonResponse:
+    """
+    Return a stored trace in the Chrome Trace Event Format, for Perfetto or chrome://tracing.
+    """
+
+    return export_trace(request, request_id, export.metadata_to_chrome_trace, "trace.json")
+
+
+def trace_speedscope(request: HttpRequest, request_id: str) -> JsonResponse:
+    """
+    Return a stored trace as a speedscope profile.
+    """
+
+    return export_trace(request, request_id, export.metadata_to_speedscope, "speedscope.json")
+
+
+def dashboard(request: HttpRequest) -> HttpResponse:
+    """
+    Rank the slowest view methods, and views, across every request traced by this process.
+
+    The `order_by` query parameter picks the stat to rank by, see `stats.STATS_ORDERINGS`.
+    """
+
+    from cbv_inspect.middleware import DjCbvInspectMiddleware
+
+    if not DjCbvInspectMiddleware.show_toolbar(request):
+        raise Http404("Stats are not available")
+
+    order_by = request.GET.get("order_by")
+
+    if order_by not in stats.STATS_ORDERINGS:
+        order_by = "self_ms"
+
+    aggregator = stats.aggregator
+    # views have no self time of their own, as their time is that of their methods
+    view_stats = aggregator.get_views("total_ms" if order_by == "self_ms" else order_by)
+
+    context = {
+        "order_by": order_by,
+        "orderings": stats.STATS_ORDERINGS,
+        "started_at": datetime.fromtimestamp(aggregator.started_at, tz=timezone.utc),
+        "request_count": sum(view.count for _, view in view_stats),
+        "views": view_stats,
+        "methods": aggregator.get_methods(order_by, get_config()["DASHBOARD_METHODS"]),
+    }
 
-    return render_to_string("cbv_inspect/toolbar.html", ctx_data)
+    return HttpResponse(render_to_string("cbv_inspect/dashboard.html", context))
@@ -0,0 +1,87 @@
+import logging
+import threading
+from typing import Callable, Iterator, Optional
+
+from django.urls import URLResolver, get_resolver
+
+from cbv_inspect import instrumentation, plans, utils
+from cbv_inspect.settings import get_config
+
+logger = logging.getLogger("cbv_inspect.warmup")
+
+
+def iter_view_functions(resolver: URLResolver) -> Iterator[Callable]:
+    """
+    Yield the view function of every URL pattern of a resolver, including nested resolvers.
+    """
+
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_view_functions(pattern)
+        else:
+            yield pattern.callback
+
+
+def warm_up_view(view_func: Callable) -> None:
+    """
+    Build and cache the inspection plans and instrumented class of a CBV view function.
+    """
+
+    view_class = view_func.view_class
+    view_plan = plans.get_view_plan(view_class)
+    # methods are looked up like on inspected instances, skipping the setup hook
+    instrumented_class = instrumentation.get_instrumented_class(view_class)
+
+    for name in view_plan.allowed_callables:
+        plans.get_method_plan(view_class, name, getattr(instrumented_class, name))
+
+
+def warm_up(urlconf: Optional[str] = None) -> int:
+    """
+    Inspect every class-based view in a URLconf ahead of its first request.
+
+    Views that fail to warm up are logged and skipped, they are inspected on their
+    first request instead. Return the number of views warmed up.
+    """
+
+    seen = set()
+    count = 0
+
+    for view_func in iter_view_functions(get_resolver(urlconf)):
+        if not utils.is_cbv_view(view_func) or view_func in seen:
+            continue
+
+        seen.add(view_func)
+
+        try:
+            warm_up_view(view_func)
+        except Exception:
+            logger.warning("Could not warm up view %s", view_func, exc_info=True)
+        else:
+            count += 1
+
+    logger.debug("Warmed up %s class-based views", count)
+
+    return count
+
+
+def run_configured_warm_up() -> Optional[threading.Thread]:
+    """
+    Warm up the root URLconf according to the `WARMUP` and `WARMUP_BACKGROUND` config.
+
+    Return the warm-up thread when it runs in the background.
+    """
+
+    config = get_config()
+
+    if not config["WARMUP"]:
+        return None
+
+    if not config["WARMUP_BACKGROUND"]:
+        warm_up()
+        return None
+
+    thread = threading.Thread(target=warm_up, name="cbv-inspect-warmup", daemon=True)
+    thread.start()
+
+    return thread
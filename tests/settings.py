@@ -34,6 +34,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "tests.urls"
 
+# Keep traces in memory, rather than writing them to disk during tests
+CBV_INSPECT_CONFIG = {"TRACE_STORE": "cbv_inspect.stores.DjCbvMemoryTraceStore"}
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
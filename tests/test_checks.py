@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from cbv_inspect.checks import (
+    MIDDLEWARE_PATH,
+    check_compressing_middleware,
+    check_config,
+    check_trace_urls,
+)
+
+GZIP_MIDDLEWARE = "django.middleware.gzip.GZipMiddleware"
+BROTLI_MIDDLEWARE = "django_brotli.middleware.BrotliMiddleware"
+
+
+class TestCheckConfig(SimpleTestCase):
+    """
+    Tests for the `check_config` system check.
+    """
+
+    def test_no_error_for_default_config(self):
+        """
+        Test that there is no error for the default config.
+        """
+
+        # Act/Assert
+        self.assertEqual([], check_config(None))
+
+    @override_settings(CBV_INSPECT_CONFIG={"SERIALIZE_MODE": "lazy"})
+    def test_error_for_invalid_serialize_mode(self):
+        """
+        Test that there is an error for an unknown serialize mode.
+        """
+
+        # Act
+        errors = check_config(None)
+
+        # Assert
+        self.assertEqual(1, len(errors))
+        self.assertEqual("cbv_inspect.E001", errors[0].id)
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={"SAMPLE_RATE": 2, "SAMPLE_RATES": {"books:list": "all", "ok": 0.5}}
+    )
+    def test_error_for_invalid_sample_rates(self):
+        """
+        Test that there is an error for each sample rate that isn't between 0 and 1.
+        """
+
+        # Act
+        errors = check_config(None)
+
+        # Assert
+        self.assertEqual(["cbv_inspect.E002"] * 2, [error.id for error in errors])
+        self.assertIn("['SAMPLE_RATE']", errors[0].msg)
+        self.assertIn("['SAMPLE_RATES']['books:list']", errors[1].msg)
+
+    @override_settings(CBV_INSPECT_CONFIG={"TOOLBAR_DELIVERY": "lazy"})
+    def test_error_for_invalid_toolbar_delivery(self):
+        """
+        Test that an unknown toolbar delivery is an error.
+        """
+
+        # Act
+        errors = check_config(None)
+
+        # Assert
+        self.assertEqual(["cbv_inspect.E003"], [error.id for error in errors])
+
+    @override_settings(CBV_INSPECT_CONFIG={"INLINE_MAX_RESPONSE_SIZE": "10MB"})
+    def test_error_for_invalid_inline_max_response_size(self):
+        """
+        Test that an inline max response size that isn't a number of bytes is an error.
+        """
+
+        # Act
+        errors = check_config(None)
+
+        # Assert
+        self.assertEqual(["cbv_inspect.E004"], [error.id for error in errors])
+
+    @override_settings(CBV_INSPECT_CONFIG={"INLINE_MAX_RESPONSE_SIZE": None})
+    def test_no_error_without_inline_max_response_size(self):
+        """
+        Test that None is a valid inline max response size.
+        """
+
+        # Act/Assert
+        self.assertEqual([], check_config(None))
+
+
+class TestCheckTraceUrls(SimpleTestCase):
+    """
+    Tests for the `check_trace_urls` system check.
+    """
+
+    def test_no_warning_for_inline_delivery(self):
+        """
+        Test that the trace URLs aren't needed with inline delivery.
+        """
+
+        # Act/Assert
+        self.assertEqual([], check_trace_urls(None))
+
+    @override_settings(CBV_INSPECT_CONFIG={"TOOLBAR_DELIVERY": "endpoint"})
+    def test_no_warning_when_urls_are_included(self):
+        """
+        Test that endpoint delivery doesn't warn when the trace URLs are included.
+        """
+
+        # Act/Assert
+        self.assertEqual([], check_trace_urls(None))
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={"TOOLBAR_DELIVERY": "endpoint"}, ROOT_URLCONF="tests.test_checks"
+    )
+    def test_warning_when_urls_are_not_included(self):
+        """
+        Test that endpoint delivery warns when the trace URLs aren't included.
+        """
+
+        # Act
+        warnings = check_trace_urls(None)
+
+        # Assert
+        self.assertEqual(["cbv_inspect.W002"], [warning.id for warning in warnings])
+
+
+class TestCheckCompressingMiddleware(SimpleTestCase):
+    """
+    Tests for the `check_compressing_middleware` system check.
+    """
+
+    @override_settings(MIDDLEWARE=[GZIP_MIDDLEWARE, *settings.MIDDLEWARE])
+    def test_no_warning_for_compressing_middleware_listed_before(self):
+        """
+        Test that compressing middleware listed before DjCbvInspectMiddleware is fine.
+        """
+
+        # Act/Assert
+        self.assertEqual([], check_compressing_middleware(None))
+
+    @override_settings(MIDDLEWARE=[*settings.MIDDLEWARE, GZIP_MIDDLEWARE, BROTLI_MIDDLEWARE])
+    def test_warning_for_compressing_middleware_listed_after(self):
+        """
+        Test that each compressing middleware listed after DjCbvInspectMiddleware is a warning.
+        """
+
+        # Act
+        warnings = check_compressing_middleware(None)
+
+        # Assert
+        self.assertEqual(["cbv_inspect.W003"] * 2, [warning.id for warning in warnings])
+        self.assertIn("GZipMiddleware", warnings[0].msg)
+        self.assertIn("BrotliMiddleware", warnings[1].msg)
+
+    @override_settings(
+        MIDDLEWARE=[
+            *(path for path in settings.MIDDLEWARE if path != MIDDLEWARE_PATH),
+            GZIP_MIDDLEWARE,
+        ]
+    )
+    def test_no_warning_without_middleware(self):
+        """
+        Test that nothing is checked when DjCbvInspectMiddleware isn't used.
+        """
+
+        # Act/Assert
+        self.assertEqual([], check_compressing_middleware(None))
+
+
+urlpatterns = []
@@ -0,0 +1,368 @@
+import json
+import uuid
+
+from django.test import TestCase
+
+from cbv_inspect import export
+from cbv_inspect.queries import DjCbvRepeatedQuery
+from cbv_inspect.utils import (
+    DjCbvClassOrMethodInfo,
+    DjCbvDeferredValue,
+    DjCbvLog,
+    DjCbvRequestMetadata,
+    DjCbvSerializationBudget,
+)
+
+from .test_helpers import make_metadata
+
+# request fields of the traced requests
+BOOK_LIST = {"path": "/books/", "view_path": "books.views.BookListView", "url_name": "books:list"}
+
+
+class TestToJsonValue(TestCase):
+    def test_to_json_value(self):
+        """
+        Test that values JSON can't represent are turned into strings.
+        """
+
+        # Arrange
+        value = uuid.UUID(int=1)
+
+        # Act/Assert
+        self.assertEqual(3, export.to_json_value(3))
+        self.assertIsNone(export.to_json_value(None))
+        self.assertEqual(str(value), export.to_json_value(value))
+        self.assertEqual("(1, 2)", export.to_json_value(DjCbvDeferredValue((1, 2))))
+
+
+class TestGetCallTree(TestCase):
+    def test_get_call_tree_nests_logs_by_indent(self):
+        """
+        Test that each log is nested under the closest preceding log with a smaller indent.
+        """
+
+        # Arrange
+        logs = {
+            order: DjCbvLog(order=order, indent=indent, name=f"method_{order}")
+            for order, indent in enumerate([0, 1, 2, 1, 0], start=1)
+        }
+
+        # Act
+        tree = export.get_call_tree(logs)
+
+        # Assert
+        def names(nodes):
+            return [(node["name"], names(node["children"])) for node in nodes]
+
+        self.assertEqual(
+            [
+                ("method_1", [("method_2", [("method_3", [])]), ("method_4", [])]),
+                ("method_5", []),
+            ],
+            names(tree),
+        )
+
+
+class TestMetadataToDict(TestCase):
+    def setUp(self):
+        self.metadata = make_metadata(
+            **BOOK_LIST,
+            args=(uuid.UUID(int=1),),
+            kwargs={"page": 2},
+            base_classes=[DjCbvClassOrMethodInfo(name="django.views.generic.list.ListView")],
+            mro=[DjCbvClassOrMethodInfo(name="books.views.BookListView")],
+        )
+        self.log = DjCbvLog(
+            order=1,
+            name="BookListView.get_queryset",
+            args=DjCbvDeferredValue(()),
+            return_value=DjCbvDeferredValue("books"),
+            super_calls=[DjCbvClassOrMethodInfo(name="ListView.get_queryset"), {}],
+            wall_ns=2_000,
+            cpu_ns=None,
+        )
+        self.log.queries.add("SELECT ? FROM book", 500)
+        self.metadata.logs[1] = self.log
+
+    def test_metadata_to_dict(self):
+        """
+        Test that the request, classes and calls of a trace are exported.
+        """
+
+        # Act
+        trace = export.metadata_to_dict(self.metadata)
+
+        # Assert
+        call = trace["calls"][0]
+        self.assertEqual(export.SCHEMA_VERSION, trace["schema_version"])
+        self.assertEqual(self.metadata.request_id, trace["request_id"])
+        self.assertEqual("books:list", trace["request"]["url_name"])
+        self.assertEqual([str(uuid.UUID(int=1))], trace["request"]["args"])
+        self.assertEqual({"page": 2}, trace["request"]["kwargs"])
+        self.assertEqual("django.views.generic.list.ListView", trace["base_classes"][0]["name"])
+        self.assertEqual("BookListView.get_queryset", call["name"])
+        self.assertEqual("()", call["args"])
+        self.assertEqual("'books'", call["return_value"])
+        self.assertEqual("ListView.get_queryset", call["super_calls"][0]["name"])
+        self.assertIsNone(call["super_calls"][1])
+        self.assertEqual(2_000, call["wall_ns"])
+        self.assertEqual(2_000, trace["total_wall_ns"])
+        self.assertIsNone(call["cpu_ns"])
+        self.assertEqual(
+            {
+                "count": 1,
+                "duration_ns": 500,
+                "fingerprints": [{"sql": "SELECT ? FROM book", "count": 1, "duration_ns": 500}],
+            },
+            call["queries"],
+        )
+        self.assertEqual([], call["children"])
+
+    def test_metadata_to_dict_with_repeated_queries(self):
+        """
+        Test that repeated queries are exported with the order of their origin call.
+        """
+
+        # Arrange
+        self.metadata.repeated_queries = [
+            DjCbvRepeatedQuery("SELECT ?", 3, 900, origin=self.log, call_path=["get"]),
+            DjCbvRepeatedQuery("SELECT ??", 4, 800),
+        ]
+
+        # Act
+        trace = export.metadata_to_dict(self.metadata)
+
+        # Assert
+        self.assertEqual(
+            [
+                {
+                    "sql": "SELECT ?",
+                    "count": 3,
+                    "duration_ns": 900,
+                    "origin": 1,
+                    "call_path": ["get"],
+                },
+                {
+                    "sql": "SELECT ??",
+                    "count": 4,
+                    "duration_ns": 800,
+                    "origin": None,
+                    "call_path": [],
+                },
+            ],
+            trace["repeated_queries"],
+        )
+
+    def test_to_dict_and_to_json(self):
+        """
+        Test that `to_json` dumps the dict returned by `to_dict`.
+        """
+
+        # Act
+        trace = self.metadata.to_dict()
+        trace_json = self.metadata.to_json(indent=2)
+
+        # Assert
+        self.assertEqual(trace, json.loads(trace_json))
+        self.assertIn("\n  ", trace_json)
+
+
+class TestMetadataFromDict(TestCase):
+    def setUp(self):
+        self.metadata = make_metadata(
+            **BOOK_LIST,
+            args=(uuid.UUID(int=1),),
+            kwargs={"page": 2},
+            base_classes=[DjCbvClassOrMethodInfo(name="django.views.generic.list.ListView")],
+            mro=[DjCbvClassOrMethodInfo(name="books.views.BookListView")],
+        )
+        self.metadata.logs = {
+            order: DjCbvLog(
+                order=order,
+                indent=indent,
+                name=f"method_{order}",
+                args=DjCbvDeferredValue(("x" * 10,), budget=DjCbvSerializationBudget(5)),
+                super_calls=[DjCbvClassOrMethodInfo(name="View.setup"), {}],
+                wall_ns=1_000 * order,
+            )
+            for order, indent in enumerate([0, 1, 2, 1, 0], start=1)
+        }
+        self.metadata.logs[3].queries.add("SELECT ? FROM book", 500)
+        self.metadata.repeated_queries = [
+            DjCbvRepeatedQuery("SELECT ? FROM book", 3, 900, self.metadata.logs[3], ["method_1"])
+        ]
+
+    def test_metadata_from_dict_round_trips(self):
+        """
+        Test that metadata loaded from its dict dumps back to the same dict.
+        """
+
+        # Arrange
+        trace = json.loads(self.metadata.to_json())
+
+        # Act
+        metadata = DjCbvRequestMetadata.from_dict(trace)
+
+        # Assert
+        self.assertEqual(trace, metadata.to_dict())
+        self.assertEqual((str(uuid.UUID(int=1)),), metadata.args)
+        self.assertEqual(self.metadata.logs[1].truncation_notes, metadata.logs[1].truncation_notes)
+        self.assertIs(metadata.logs[3], metadata.repeated_queries[0].origin)
+        self.assertEqual({}, metadata.logs[1].super_calls[1])
+
+    def test_metadata_from_dict_derives_parents(self):
+        """
+        Test that indents and parents of logs are derived from the call tree.
+        """
+
+        # Act
+        metadata = export.metadata_from_dict(self.metadata.to_dict())
+
+        # Assert
+        self.assertEqual([1, 2, 3, 4, 5], list(metadata.logs))
+        self.assertEqual([0, 1, 2, 1, 0], [log.indent for log in metadata.logs.values()])
+        self.assertEqual(
+            [True, True, False, False, False], [log.is_parent for log in metadata.logs.values()]
+        )
+        self.assertEqual("cbvInspect_1_0 cbvInspect_2_1", metadata.logs[3].parents)
+        self.assertEqual("cbvInspect_1_0", metadata.logs[4].parents)
+        self.assertEqual(self.metadata.total_wall_ns, metadata.total_wall_ns)
+
+    def test_metadata_from_dict_with_unsupported_schema_version(self):
+        """
+        Test that a trace dumped with another schema version is refused.
+        """
+
+        # Arrange
+        trace = dict(self.metadata.to_dict(), schema_version=export.SCHEMA_VERSION + 1)
+
+        # Act/Assert
+        with self.assertRaises(ValueError):
+            export.metadata_from_dict(trace)
+
+
+def make_timed_logs(*calls):
+    """
+    Return logs from (indent, name, wall_ns) calls.
+    """
+
+    return {
+        order: DjCbvLog(order=order, indent=indent, name=name, wall_ns=wall_ns)
+        for order, (indent, name, wall_ns) in enumerate(calls, start=1)
+    }
+
+
+class TestGetCallSpans(TestCase):
+    def test_get_call_spans_lays_out_calls_back_to_back(self):
+        """
+        Test that children start with their parent, and siblings after each other.
+        """
+
+        # Arrange
+        logs = make_timed_logs(
+            (0, "setup", 10), (0, "dispatch", 100), (1, "get", 60), (2, "context", 20), (1, "x", 30)
+        )
+
+        # Act
+        spans = export.get_call_spans(logs)
+
+        # Assert
+        self.assertEqual(
+            [
+                ("setup", 0, 10),
+                ("dispatch", 10, 110),
+                ("get", 10, 70),
+                ("context", 10, 30),
+                ("x", 70, 100),
+            ],
+            [(log.name, start, end) for log, start, end in spans],
+        )
+
+    def test_get_call_spans_clips_children_to_parent(self):
+        """
+        Test that children longer than their parent, after overhead adjustments, are clipped.
+        """
+
+        # Arrange
+        logs = make_timed_logs((0, "dispatch", 100), (1, "get", 80), (1, "post", 30), (1, "put", 5))
+
+        # Act
+        spans = export.get_call_spans(logs)
+
+        # Assert
+        self.assertEqual(
+            [("dispatch", 0, 100), ("get", 0, 80), ("post", 80, 100), ("put", 100, 100)],
+            [(log.name, start, end) for log, start, end in spans],
+        )
+
+
+class TestFlameGraphExports(TestCase):
+    def setUp(self):
+        self.metadata = make_metadata(**BOOK_LIST)
+        self.metadata.logs = make_timed_logs(
+            (0, "View.setup", 1_000), (0, "View.dispatch", 5_000), (1, "ListView.get", 3_000)
+        )
+        self.metadata.logs[3].path = "/django/views/generic/list.py"
+        self.metadata.logs[3].cpu_ns = None
+
+    def test_metadata_to_chrome_trace(self):
+        """
+        Test that calls are exported as complete events, timed in microseconds.
+        """
+
+        # Act
+        trace = export.metadata_to_chrome_trace(self.metadata)
+
+        # Assert
+        calls = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual(
+            [("View.setup", 0, 1), ("View.dispatch", 1, 5), ("ListView.get", 1, 3)],
+            [(event["name"], event["ts"], event["dur"]) for event in calls],
+        )
+        self.assertEqual(
+            "GET /books/ (books.views.BookListView)", trace["traceEvents"][0]["args"]["name"]
+        )
+        self.assertIsNone(calls[2]["args"]["cpu_ms"])
+        self.assertEqual(0.0, calls[0]["args"]["cpu_ms"])
+        self.assertEqual(self.metadata.request_id, trace["otherData"]["request_id"])
+        json.dumps(trace)
+
+    def test_metadata_to_speedscope(self):
+        """
+        Test that calls are exported as open and close events of frames shared between calls.
+        """
+
+        # Arrange
+        self.metadata.logs[4] = DjCbvLog(order=4, indent=0, name="View.setup", wall_ns=500)
+
+        # Act
+        profile = export.metadata_to_speedscope(self.metadata)
+
+        # Assert
+        self.assertEqual(
+            [
+                {"name": "View.setup"},
+                {"name": "View.dispatch"},
+                {"name": "ListView.get", "file": "/django/views/generic/list.py"},
+            ],
+            profile["shared"]["frames"],
+        )
+        self.assertEqual(
+            [
+                ("O", 0, 0),
+                ("C", 0, 1_000),
+                ("O", 1, 1_000),
+                ("O", 2, 1_000),
+                ("C", 2, 4_000),
+                ("C", 1, 6_000),
+                ("O", 0, 6_000),
+                ("C", 0, 6_500),
+            ],
+            [
+                (event["type"], event["frame"], event["at"])
+                for event in profile["profiles"][0]["events"]
+            ],
+        )
+        self.assertEqual(6_500, profile["profiles"][0]["endValue"])
+        self.assertEqual(export.SPEEDSCOPE_SCHEMA, profile["$schema"])
+        json.dumps(profile)
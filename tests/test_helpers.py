@@ -3,6 +3,7 @@ Some random classes and functions used for unittests!
 """
 
 from cbv_inspect import mixins
+from cbv_inspect.utils import DjCbvRequestMetadata
 
 
 class AncientFoo:
@@ -64,15 +65,37 @@ class DjFoo(mixins.DjCbvInspectMixin, FuturisticFoo):
     pass
 
 
-def sample_func():
-    """
-    Sample docstring!
-    """
-    x = 1  # comment 1
+class ModernFoo(FuturisticFoo):
+    def greet(self):
+        """Not a super call: super().goodbye()"""
+        # not a super call either: super().goodbye()
+        text = "super().goodbye()"
+
+        greeting = super(
+            Foo,
+            self,
+        ).greet()
+
+        return greeting + text
+
+    def customize_greet(self, name):
+        class NestedFoo(AncientFoo):
+            def greet(self):
+                return super().greet()
+
+        return super().customize_greet(
+            name,
+        )
+
+    def dynamic_greet(self):
+        return super(type(self), self).greet()
 
-    # comment 2
+    def skip_mixin_greet(self):
+        return super(mixins.DjCbvInspectMixin, self).greet()
 
-    return x
+    @classmethod
+    def get_cls_color(cls):
+        return super().get_cls_color()
 
 
 def sample_func2():
@@ -82,3 +105,19 @@ def sample_func2():
 class AwesomeMixin:
     def do_some_django_thing(self, *args, **kwargs):
         pass
+
+
+def make_metadata(*logs, **fields):
+    """
+    Return request metadata with placeholder request fields, overridden by `fields`,
+    and `logs` ordered from 1.
+    """
+
+    defaults = {"path": "/", "method": "GET", "view_path": "", "url_name": "", "args": ()}
+    metadata = DjCbvRequestMetadata(**{**defaults, "kwargs": {}, **fields})
+
+    for order, log in enumerate(logs, start=1):
+        log.order = order
+        metadata.logs[order] = log
+
+    return metadata
@@ -0,0 +1,271 @@
+import gzip
+
+from django.test import SimpleTestCase
+
+from asgiref.sync import async_to_sync
+
+from cbv_inspect.injection import (
+    DjCbvStreamInjector,
+    ainject_stream,
+    inject_stream,
+    rfind_body_end,
+    splice,
+)
+
+
+class TestRfindBodyEnd(SimpleTestCase):
+    def test_rfind_body_end_finds_last_closing_body_tag(self):
+        """
+        Test that the last closing body tag is found, in any case.
+        """
+
+        # Arrange
+        content = b"<body><pre></body></pre></BODY>\n</html>\n"
+
+        # Act
+        index = rfind_body_end(content)
+
+        # Assert
+        self.assertEqual(24, index)
+
+    def test_rfind_body_end_without_closing_body_tag(self):
+        """
+        Test that -1 is returned without a closing body tag.
+        """
+
+        # Act/Assert
+        self.assertEqual(-1, rfind_body_end(b"<p>test</p></bod"))
+        self.assertEqual(-1, rfind_body_end(b""))
+
+
+class TestSplice(SimpleTestCase):
+    def test_splice(self):
+        """
+        Test that content is inserted at an index.
+        """
+
+        # Act
+        content = splice(b"<body></body>", 6, b"<toolbar>")
+
+        # Assert
+        self.assertEqual(b"<body><toolbar></body>", content)
+
+
+class TestDjCbvStreamInjector(SimpleTestCase):
+    def test_feed_holds_back_closing_body_tag_until_end_of_stream(self):
+        """
+        Test that a closing body tag is held back with the bytes after it, and the content
+        inserted before it at the end of the stream.
+        """
+
+        # Arrange
+        injector = DjCbvStreamInjector(b"<toolbar>")
+
+        # Act
+        chunks = [injector.feed(b"<body><p>test</p></body>"), injector.feed(b"</html>")]
+        tail = injector.flush()
+
+        # Assert
+        self.assertEqual([b"<body><p>test</p>", b""], chunks)
+        self.assertEqual(b"<toolbar></body></html>", tail)
+        self.assertEqual(b"", injector.flush())
+
+    def test_feed_finds_closing_body_tag_split_across_chunks(self):
+        """
+        Test that a closing body tag split between two chunks is found.
+        """
+
+        # Arrange
+        injector = DjCbvStreamInjector(b"<toolbar>")
+
+        # Act
+        chunks = [injector.feed(chunk) for chunk in [b"<body>test<", b"/Bo", b"dY>"]]
+
+        # Assert
+        self.assertEqual([b"<body", b">te", b"st"], chunks)
+        self.assertEqual(b"<toolbar></BodY>", injector.flush())
+
+    def test_feed_holds_back_carry_over_window(self):
+        """
+        Test that the end of a chunk is held back, in case it starts a closing body tag.
+        """
+
+        # Arrange
+        injector = DjCbvStreamInjector(b"<toolbar>")
+
+        # Act
+        chunk = injector.feed(b"<body>test</bod")
+
+        # Assert
+        self.assertEqual(b"<body>tes", chunk)
+        self.assertEqual(b"t</bod", injector.flush())
+        self.assertEqual(b"", injector.flush())
+
+    def test_feed_inserts_before_last_closing_body_tag(self):
+        """
+        Test that an earlier closing body tag (i.e. in an inline script) is passed on
+        once a later one is found, so the content goes before the last one.
+        """
+
+        # Arrange
+        injector = DjCbvStreamInjector(b"<toolbar>")
+        chunks = [b"<body><script>'</body>'</script>", b"<p>test</p>", b"</BODY></html>"]
+
+        # Act
+        content = b"".join(injector.feed(chunk) for chunk in chunks) + injector.flush()
+
+        # Assert
+        self.assertEqual(
+            b"<body><script>'</body>'</script><p>test</p><toolbar></BODY></html>", content
+        )
+
+
+class TestInjectStream(SimpleTestCase):
+    def test_inject_stream(self):
+        """
+        Test that content is inserted into a stream of chunks.
+        """
+
+        # Arrange
+        chunks = [b"<html>", b"<body>", b"", b"</", b"body>", b"</html>"]
+
+        # Act
+        content = list(inject_stream(iter(chunks), b"<toolbar>"))
+
+        # Assert
+        self.assertNotIn(b"", content)
+        self.assertEqual(b"<html><body><toolbar></body></html>", b"".join(content))
+
+    def test_inject_stream_without_closing_body_tag(self):
+        """
+        Test that a stream without a closing body tag is passed on unchanged.
+        """
+
+        # Act
+        content = list(inject_stream(iter([b"<p>", b"test</p>"]), b"<toolbar>"))
+
+        # Assert
+        self.assertEqual([b"<p>te", b"st</p>"], content)
+
+    def test_inject_stream_of_empty_stream(self):
+        """
+        Test that an empty stream stays empty.
+        """
+
+        # Act
+        content = list(inject_stream(iter([]), b"<toolbar>"))
+
+        # Assert
+        self.assertEqual([], content)
+
+    def test_ainject_stream(self):
+        """
+        Test that content is inserted into an async stream of chunks.
+        """
+
+        # Arrange
+        async def chunks():
+            for chunk in [b"<body>", b"", b"</body>", b"</html>"]:
+                yield chunk
+
+        async def read():
+            return [chunk async for chunk in ainject_stream(chunks(), b"<toolbar>")]
+
+        # Act
+        content = async_to_sync(read)()
+
+        # Assert
+        self.assertNotIn(b"", content)
+        self.assertEqual(b"<body><toolbar></body></html>", b"".join(content))
+
+    def test_ainject_stream_without_closing_body_tag(self):
+        """
+        Test that an async stream without a closing body tag is passed on unchanged.
+        """
+
+        # Arrange
+        async def chunks():
+            yield b"<p>test</p>"
+
+        async def read():
+            return [chunk async for chunk in ainject_stream(chunks(), b"<toolbar>")]
+
+        # Act
+        content = async_to_sync(read)()
+
+        # Assert
+        self.assertEqual([b"<p>te", b"st</p>"], content)
+
+    def test_ainject_stream_of_empty_stream(self):
+        """
+        Test that an empty async stream stays empty.
+        """
+
+        # Arrange
+        async def chunks():
+            for chunk in []:
+                yield chunk
+
+        async def read():
+            return [chunk async for chunk in ainject_stream(chunks(), b"<toolbar>")]
+
+        # Act
+        content = async_to_sync(read)()
+
+        # Assert
+        self.assertEqual([], content)
+
+
+class TestDjCbvGzipStreamInjector(SimpleTestCase):
+    def test_inject_stream_into_gzip_stream(self):
+        """
+        Test that a gzip stream, split at arbitrary bytes, gets the content inserted
+        and is compressed again.
+        """
+
+        # Arrange
+        compressed = gzip.compress(b"<html><body>" + b"<p>test</p>" * 100 + b"</body></html>")
+        chunks = [compressed[i : i + 10] for i in range(0, len(compressed), 10)]
+
+        # Act
+        content = list(inject_stream(iter(chunks), b"<toolbar>", "gzip"))
+
+        # Assert
+        self.assertTrue(all(content))
+        self.assertEqual(
+            b"<html><body>" + b"<p>test</p>" * 100 + b"<toolbar></body></html>",
+            gzip.decompress(b"".join(content)),
+        )
+
+    def test_inject_stream_into_gzip_members(self):
+        """
+        Test a stream where each chunk is a gzip member of its own,
+        i.e. from `GZipMiddleware` with an async stream.
+        """
+
+        # Arrange
+        chunks = [gzip.compress(b"<body>test</bo"), gzip.compress(b"dy>") + gzip.compress(b"!")]
+
+        # Act
+        content = b"".join(inject_stream(iter(chunks), b"<toolbar>", "gzip"))
+
+        # Assert
+        self.assertEqual(b"<body>test<toolbar></body>!", gzip.decompress(content))
+
+    def test_ainject_stream_into_gzip_stream(self):
+        """
+        Test that content is inserted into an async gzip stream, which stays compressed.
+        """
+
+        # Arrange
+        async def chunks():
+            yield gzip.compress(b"<body></body>")
+
+        async def read():
+            return [chunk async for chunk in ainject_stream(chunks(), b"<toolbar>", "gzip")]
+
+        # Act
+        content = async_to_sync(read)()
+
+        # Assert
+        self.assertEqual(b"<body><toolbar></body>", gzip.decompress(b"".join(content)))
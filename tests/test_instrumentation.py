@@ -0,0 +1,115 @@
+import unittest
+
+from django.test import RequestFactory
+from django.views.generic import View
+
+from cbv_inspect.instrumentation import (
+    get_instrumented_class,
+    get_original_setup,
+    install_setup_hook,
+)
+from cbv_inspect.mixins import DjCbvInspectMixin
+
+from . import views
+
+
+class TestGetInstrumentedClass(unittest.TestCase):
+    """
+    Tests for the `get_instrumented_class` function.
+    """
+
+    def test_instrumented_class_subclasses_view_class(self):
+        """
+        Test that the instrumented class is a subclass of the view class
+        with `DjCbvInspectMixin` as its first base.
+        """
+
+        # Act
+        instrumented_class = get_instrumented_class(views.HelloTest)
+
+        # Assert
+        self.assertEqual((DjCbvInspectMixin, views.HelloTest), instrumented_class.__bases__)
+        self.assertEqual(views.HelloTest.__qualname__, instrumented_class.__qualname__)
+        self.assertEqual(views.HelloTest.__module__, instrumented_class.__module__)
+        self.assertNotIn(DjCbvInspectMixin, views.HelloTest.__mro__)
+
+    def test_instrumented_class_is_built_once(self):
+        """
+        Test that the instrumented class is cached per view class.
+        """
+
+        # Act/Assert
+        self.assertIs(
+            get_instrumented_class(views.HelloTest), get_instrumented_class(views.HelloTest)
+        )
+
+
+class TestInstallSetupHook(unittest.TestCase):
+    """
+    Tests for the `install_setup_hook` function.
+    """
+
+    def make_view_class(self):
+        class SetupView(View):
+            def setup(self, request, *args, **kwargs):
+                super().setup(request, *args, **kwargs)
+                self.was_set_up = True
+
+        return SetupView
+
+    def test_setup_hook_is_installed_once(self):
+        """
+        Test that installing the setup hook again leaves the first hook in place.
+        """
+
+        # Arrange
+        view_class = self.make_view_class()
+        original_setup = view_class.setup
+
+        # Act
+        install_setup_hook(view_class)
+        hook = view_class.setup
+        install_setup_hook(view_class)
+
+        # Assert
+        self.assertIs(hook, view_class.setup)
+        self.assertIs(original_setup, get_original_setup(view_class))
+        self.assertEqual(original_setup.__qualname__, hook.__qualname__)
+
+    def test_setup_hook_runs_original_setup_for_other_requests(self):
+        """
+        Test that instances set up for requests that aren't marked for their view class
+        keep their class and run the original setup.
+        """
+
+        # Arrange
+        view_class = self.make_view_class()
+        install_setup_hook(view_class)
+        request = RequestFactory().get("/")
+        request._djcbv_view_class = views.HelloTest
+        view = view_class()
+
+        # Act
+        view.setup(request)
+
+        # Assert
+        self.assertIs(view_class, type(view))
+        self.assertTrue(view.was_set_up)
+        self.assertIs(request, view.request)
+
+    def test_instrumented_class_skips_setup_hook(self):
+        """
+        Test that the instrumented class runs the original setup, so it gets inspected
+        rather than the hook.
+        """
+
+        # Arrange
+        view_class = self.make_view_class()
+        original_setup = view_class.setup
+        install_setup_hook(view_class)
+
+        # Act
+        instrumented_class = get_instrumented_class(view_class)
+
+        # Assert
+        self.assertIs(original_setup, instrumented_class.setup)
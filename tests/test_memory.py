@@ -0,0 +1,276 @@
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+from django.test.utils import override_settings
+
+from cbv_inspect import memory
+from cbv_inspect.utils import DjCbvLog
+
+from . import views
+from .test_helpers import make_metadata
+
+
+class TestShouldTraceMemory(SimpleTestCase):
+    """
+    Tests for the `should_trace_memory` function.
+    """
+
+    def setUp(self):
+        self.view_func = MagicMock(spec=[])
+
+    def test_should_trace_memory_is_off_by_default(self):
+        """
+        Test that memory isn't traced without a config, decorator or parameter.
+        """
+
+        # Act
+        result = memory.should_trace_memory(RequestFactory().get("/"), self.view_func)
+
+        # Assert
+        self.assertFalse(result)
+
+    @override_settings(CBV_INSPECT_CONFIG={"TRACE_MEMORY": True})
+    def test_should_trace_memory_with_config(self):
+        """
+        Test that memory is traced for every request with the `TRACE_MEMORY` config.
+        """
+
+        # Act
+        result = memory.should_trace_memory(RequestFactory().get("/"), self.view_func)
+
+        # Assert
+        self.assertTrue(result)
+
+    def test_should_trace_memory_per_view(self):
+        """
+        Test that memory is traced for views decorated with `djcbv_trace_memory`.
+        """
+
+        # Act
+        result = memory.should_trace_memory(
+            RequestFactory().get("/"), views.AllocatingView.as_view()
+        )
+
+        # Assert
+        self.assertTrue(result)
+
+    @override_settings(DEBUG=True)
+    def test_should_trace_memory_per_request(self):
+        """
+        Test that memory is traced for requests with the query string parameter.
+        """
+
+        # Act
+        result = memory.should_trace_memory(
+            RequestFactory().get("/", {"djcbv-trace-memory": ""}), self.view_func
+        )
+
+        # Assert
+        self.assertTrue(result)
+
+    @override_settings(DEBUG=False, CBV_INSPECT_CONFIG={"SAMPLE_RATE": 1})
+    def test_should_trace_memory_per_request_without_toolbar(self):
+        """
+        Test that the query string parameter is ignored for requests that wouldn't
+        show the toolbar, i.e. sampled requests from any client.
+        """
+
+        # Act
+        result = memory.should_trace_memory(
+            RequestFactory().get("/", {"djcbv-trace-memory": ""}), self.view_func
+        )
+
+        # Assert
+        self.assertFalse(result)
+
+
+class TestTracing(SimpleTestCase):
+    """
+    Tests for the `tracing` context manager.
+    """
+
+    def test_tracing_runs_while_any_request_needs_it(self):
+        """
+        Test that tracemalloc is started by the first request and stopped by the last.
+        """
+
+        # Act
+        with memory.tracing(True):
+            with memory.tracing(True):
+                pass
+
+            still_tracing = tracemalloc.is_tracing()
+
+        # Assert
+        self.assertTrue(still_tracing)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_tracing_leaves_tracemalloc_started_elsewhere_running(self):
+        """
+        Test that tracemalloc isn't stopped if it was started before tracing.
+        """
+
+        # Arrange
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+
+        # Act
+        with memory.tracing(True):
+            pass
+
+        # Assert
+        self.assertTrue(tracemalloc.is_tracing())
+
+    def test_tracing_disabled(self):
+        """
+        Test that tracemalloc isn't started when tracing is disabled.
+        """
+
+        # Act
+        with memory.tracing(False):
+            tracing = tracemalloc.is_tracing()
+
+        # Assert
+        self.assertFalse(tracing)
+
+
+class TestDjCbvMemoryTracker(SimpleTestCase):
+    """
+    Tests for the `DjCbvMemoryTracker` class.
+    """
+
+    def setUp(self):
+        self.stack = []
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+
+    def test_tracker_measures_net_and_peak_bytes(self):
+        """
+        Test that net bytes are what's still allocated on exit, and that the peak of a
+        child call counts for its parent.
+        """
+
+        # Arrange
+        parent, child = DjCbvLog(order=1), DjCbvLog(order=2, indent=1)
+
+        # Act
+        with memory.DjCbvMemoryTracker(parent, self.stack, top_lines=0):
+            kept = bytearray(1_000_000)
+
+            with memory.DjCbvMemoryTracker(child, self.stack, top_lines=0):
+                freed = bytearray(3_000_000)
+                del freed
+
+        # Assert
+        self.assertGreaterEqual(parent.memory_bytes, 1_000_000)
+        self.assertLess(parent.memory_bytes, 1_100_000)
+        self.assertGreaterEqual(parent.memory_peak_bytes, 3_900_000)
+        self.assertLess(abs(child.memory_bytes), 100_000)
+        self.assertGreaterEqual(child.memory_peak_bytes, 2_900_000)
+        self.assertEqual([], parent.memory_top_lines)
+        self.assertEqual([], self.stack)
+        del kept
+
+    def test_tracker_finds_top_lines(self):
+        """
+        Test that the source lines allocating the most are found.
+        """
+
+        # Arrange
+        log = DjCbvLog(order=1)
+
+        # Act
+        with memory.DjCbvMemoryTracker(log, self.stack, top_lines=1):
+            kept = [str(i) for i in range(10_000)]
+
+        # Assert
+        self.assertEqual(1, len(log.memory_top_lines))
+        self.assertIn("test_memory.py", log.memory_top_lines[0])
+        del kept
+
+    @patch("cbv_inspect.memory.reset_peak", new=None)
+    def test_tracker_without_reset_peak(self):
+        """
+        Test that the peak isn't measured when `tracemalloc.reset_peak` isn't available.
+        """
+
+        # Arrange
+        log = DjCbvLog(order=1)
+
+        # Act
+        with memory.DjCbvMemoryTracker(log, self.stack, top_lines=0):
+            pass
+
+        # Assert
+        self.assertIsNotNone(log.memory_bytes)
+        self.assertIsNone(log.memory_peak_bytes)
+
+
+class TestGetTracker(SimpleTestCase):
+    """
+    Tests for the `get_tracker` function.
+    """
+
+    def test_get_tracker_when_memory_is_not_traced(self):
+        """
+        Test that a no-op tracker is returned when memory isn't traced.
+        """
+
+        # Act
+        tracker = memory.get_tracker(DjCbvLog(), make_metadata())
+
+        # Assert
+        self.assertNotIsInstance(tracker, memory.DjCbvMemoryTracker)
+
+    def test_get_tracker_when_memory_is_traced(self):
+        """
+        Test that a memory tracker is returned when memory is traced.
+        """
+
+        # Arrange
+        metadata = make_metadata(trace_memory=True)
+
+        # Act
+        with memory.tracing(True):
+            tracker = memory.get_tracker(DjCbvLog(), metadata)
+
+        # Assert
+        self.assertIsInstance(tracker, memory.DjCbvMemoryTracker)
+        self.assertIs(metadata.memory_stack, tracker.stack)
+        self.assertEqual(10, tracker.top_lines)
+
+
+class TestGetHeaviestLog(SimpleTestCase):
+    """
+    Tests for the `get_heaviest_log` function.
+    """
+
+    def test_get_heaviest_log(self):
+        """
+        Test that the log with the largest memory peak is returned.
+        """
+
+        # Arrange
+        logs = {
+            1: DjCbvLog(order=1, memory_bytes=10),
+            2: DjCbvLog(order=2, memory_bytes=30),
+            3: DjCbvLog(order=3),
+        }
+
+        # Act
+        result = memory.get_heaviest_log(logs)
+
+        # Assert
+        self.assertIs(logs[2], result)
+
+    def test_get_heaviest_log_without_traced_logs(self):
+        """
+        Test that None is returned when no log has traced memory.
+        """
+
+        # Act
+        result = memory.get_heaviest_log({1: DjCbvLog(order=1)})
+
+        # Assert
+        self.assertIsNone(result)
@@ -1,12 +1,59 @@
+import asyncio
+import gzip
+import io
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipIf
 from unittest.mock import MagicMock, create_autospec, patch
 
-from django.http import HttpResponse
-from django.test import Client, RequestFactory, TestCase
-from django.test.utils import override_settings
-from django.urls import resolve
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    Client,
+    RequestFactory,
+    TestCase,
+)
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import path, resolve
+
+from asgiref.sync import async_to_sync, sync_to_async
 
 from cbv_inspect.middleware import DjCbvInspectMiddleware
 from cbv_inspect.mixins import DjCbvInspectMixin
+from cbv_inspect.stores import get_store
+
+from . import models, views
+
+MEMORY_STORE = "cbv_inspect.stores.DjCbvMemoryTraceStore"
+
+
+class TeapotExceptionMiddleware:
+    """
+    Handle view exceptions with a 418 response, to check `process_exception` hooks run.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        return HttpResponse("<html><body>teapot</body></html>", status=418)
+
+
+def show_toolbar_with_header(request):
+    return request.headers.get("X-Cbv-Inspect") == "on"
+
+
+def show_toolbar_for_staff(request):
+    return request.user.is_staff
 
 
 class TestDjCBVInspectMiddleware(TestCase):
@@ -16,7 +63,9 @@ class TestDjCBVInspectMiddleware(TestCase):
 
     def setUp(self):
         self.mock_get_response = MagicMock()
-        self.middleware = DjCbvInspectMiddleware(self.mock_get_response)
+
+        with self.settings(DEBUG=True):
+            self.middleware = DjCbvInspectMiddleware(self.mock_get_response)
         self.request = RequestFactory().get("/simple_cbv_render")
 
         self.addCleanup(patch.stopall)
@@ -33,7 +82,7 @@ class TestDjCBVInspectMiddleware(TestCase):
         # Assert
         self.assertFalse(should_show_toolbar)
 
-    @patch("cbv_inspect.middleware.resolve")
+    @patch("cbv_inspect.utils.resolve")
     def test_view_excluded_check_is_true_when_attr_exists(self, mock_resolve):
         """
         Test that the `is_view_excluded` method determines a view
@@ -49,7 +98,7 @@ class TestDjCBVInspectMiddleware(TestCase):
         # Assert
         self.assertTrue(is_excluded)
 
-    @patch("cbv_inspect.middleware.resolve")
+    @patch("cbv_inspect.utils.resolve")
     def test_view_excluded_check_is_false_when_attr_does_not_exist(self, mock_resolve):
         """
         Test that the `is_view_excluded` method determines a view is not excluded
@@ -134,6 +183,7 @@ class TestDjCBVInspectMiddleware(TestCase):
     @patch.object(DjCbvInspectMiddleware, "is_view_excluded", new=MagicMock(return_value=False))
     @patch("cbv_inspect.utils.is_cbv_request", new=MagicMock(return_value=True))
     @patch("cbv_inspect.middleware.DjCbvToolbar.__init__", return_value=None)
+    @patch("cbv_inspect.stats.aggregator", new=MagicMock())
     def test_middleware_should_process_request_allows_cbv_view(self, mock_toolbar_init):
         """
         Test that the `should_process_request` allows middleware to run fully.
@@ -142,6 +192,8 @@ class TestDjCBVInspectMiddleware(TestCase):
         # Arrange
         response = create_autospec(HttpResponse)
         self.mock_get_response.return_value = response
+        # attached by the mocked toolbar
+        self.request._djcbv_inspect_metadata = MagicMock(sampled=False)
 
         # Act
         self.middleware(self.request)
@@ -152,7 +204,6 @@ class TestDjCBVInspectMiddleware(TestCase):
     @patch.object(
         DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=True)
     )
-    @patch.object(DjCbvInspectMiddleware, "_remove_djcbv_mixin", new=MagicMock())
     @patch.object(
         DjCbvInspectMiddleware, "_is_response_insertable", new=MagicMock(return_value=False)
     )
@@ -176,7 +227,6 @@ class TestDjCBVInspectMiddleware(TestCase):
     @patch.object(
         DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=True)
     )
-    @patch.object(DjCbvInspectMiddleware, "_remove_djcbv_mixin", new=MagicMock())
     @patch.object(
         DjCbvInspectMiddleware, "_is_response_insertable", new=MagicMock(return_value=True)
     )
@@ -188,6 +238,7 @@ class TestDjCBVInspectMiddleware(TestCase):
 
         # Arrange
         response = create_autospec(HttpResponse)
+        response.streaming = False
         response.charset = "utf-8"
         response.content = bytes("<foo>", response.charset)
         response.__contains__.return_value = True  # "Content-Length" in response
@@ -202,7 +253,6 @@ class TestDjCBVInspectMiddleware(TestCase):
     @patch.object(
         DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=True)
     )
-    @patch.object(DjCbvInspectMiddleware, "_remove_djcbv_mixin", new=MagicMock())
     @patch.object(
         DjCbvInspectMiddleware, "_is_response_insertable", new=MagicMock(return_value=True)
     )
@@ -215,6 +265,7 @@ class TestDjCBVInspectMiddleware(TestCase):
         # Arrange
         html_content = "<html><head></head><body><p>test</p></body></html>"
         response = create_autospec(HttpResponse)
+        response.streaming = False
         response.charset = "utf-8"
         response.headers = {"Content-Length": len(html_content)}
         response.__contains__.side_effect = (
@@ -233,13 +284,12 @@ class TestDjCBVInspectMiddleware(TestCase):
         res = self.middleware(self.request)
 
         # Assert
-        self.assertTrue('id="djCbv"' in res.content)
+        self.assertTrue(b'id="djCbv"' in res.content)
         self.assertTrue(res["Content-Length"] > len(html_content))
 
     @patch.object(
         DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=True)
     )
-    @patch.object(DjCbvInspectMiddleware, "_remove_djcbv_mixin", new=MagicMock())
     @patch.object(
         DjCbvInspectMiddleware, "_is_response_insertable", new=MagicMock(return_value=True)
     )
@@ -252,6 +302,7 @@ class TestDjCBVInspectMiddleware(TestCase):
         # Arrange
         html_content = "<html><head></head><body><p>test</p></body></html>"
         response = create_autospec(HttpResponse)
+        response.streaming = False
         response.charset = "utf-8"
         response.content = bytes(html_content, response.charset)
         response.__contains__.return_value = False  # "Content-Length" in response
@@ -261,45 +312,148 @@ class TestDjCBVInspectMiddleware(TestCase):
         res = self.middleware(self.request)
 
         # Assert
-        self.assertTrue('id="djCbv"' in res.content)
+        self.assertTrue(b'id="djCbv"' in res.content)
+
+    def test_attachment_response_is_not_insertable(self):
+        """
+        Test that HTML files sent as a download are left as they are.
+        """
+
+        # Arrange
+        response = FileResponse(
+            io.BytesIO(b"<html><body></body></html>"),
+            as_attachment=True,
+            filename="page.html",
+            content_type="text/html",
+        )
+
+        # Act
+        insertable = self.middleware._is_response_insertable(response)
+
+        # Assert
+        self.assertTrue(response.streaming)
+        self.assertFalse(insertable)
+
+    def test_response_with_unsupported_content_encoding_is_not_insertable(self):
+        """
+        Test that responses compressed with an unsupported encoding (i.e. brotli) are skipped.
+        """
+
+        # Arrange
+        response = HttpResponse(b"<html><body></body></html>", headers={"Content-Encoding": "br"})
+
+        # Act
+        insertable = self.middleware._is_response_insertable(response)
+
+        # Assert
+        self.assertFalse(insertable)
+
+    @patch.object(
+        DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=True)
+    )
+    def test_middleware_inserts_toolbar_into_streaming_response(self):
+        """
+        Test that the toolbar is inserted into a streaming response without buffering it,
+        and that its Content-Length header is removed.
+        """
+
+        # Arrange
+        chunks = [b"<html><body>", b"<p>test</p></BO", b"DY>", b"</html>"]
+        response = StreamingHttpResponse(iter(chunks))
+        response["Content-Length"] = sum(len(chunk) for chunk in chunks)
+        self.mock_get_response.return_value = response
+
+        # Act
+        res = self.middleware(self.request)
+        first_chunk = next(res.streaming_content)
+        content = first_chunk + b"".join(res.streaming_content)
+
+        # Assert
+        self.assertEqual(b"<html>", first_chunk)
+        self.assertNotIn("Content-Length", res)
+        self.assertIn(b'id="djCbv"', content)
+        self.assertTrue(content.startswith(b"<html><body><p>test</p>"))
+        self.assertTrue(content.endswith(b"</BODY></html>"))
 
     @patch.object(
         DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=True)
     )
-    @patch.object(DjCbvInspectMiddleware, "_add_djcbv_mixin")
-    def test_middleware_process_view_hook_appends_mixin(self, mock_add_mixin):
+    @patch.object(
+        DjCbvInspectMiddleware, "_is_response_insertable", new=MagicMock(return_value=True)
+    )
+    def test_middleware_inserts_toolbar_into_async_streaming_response(self):
+        """
+        Test that the toolbar is inserted into a response streaming an async iterator
+        (Django 4.2+).
+        """
+
+        # Arrange
+        async def chunks():
+            yield b"<html><body>"
+            yield b"</body></html>"
+
+        async def read(streaming_content):
+            return b"".join([chunk async for chunk in streaming_content])
+
+        response = MagicMock(streaming=True, is_async=True, charset="utf-8")
+        response.get.return_value = ""  # no Content-Encoding
+        response.streaming_content = chunks()
+        self.mock_get_response.return_value = response
+
+        # Act
+        res = self.middleware(self.request)
+        content = async_to_sync(read)(res.streaming_content)
+
+        # Assert
+        self.assertIn(b'id="djCbv"', content)
+        self.assertTrue(content.endswith(b"</body></html>"))
+
+    @patch.object(DjCbvInspectMiddleware, "should_process_request")
+    @patch("cbv_inspect.instrumentation.install_setup_hook")
+    def test_middleware_process_view_hook_marks_request(
+        self, mock_install_setup_hook, mock_should_process_request
+    ):
         """
-        Test that the `process_view` hook runs when `should_process_request`
-        is True.
+        Test that the `process_view` hook installs the setup hook on the view class
+        and marks the request for it when the request was processed in `__call__`,
+        i.e. it has metadata attached, and lets Django call the view.
 
         Even if the middleware exits early in `__call__`, the `get_response()` call
         still triggers the `process_view` hook, hence the secondary check here.
+        The check reuses the decision made in `__call__` instead of running
+        `should_process_request` again.
         """
 
+        # Arrange
+        self.request._djcbv_inspect_metadata = MagicMock()
+        view_func = views.HelloTest.as_view()
+
         # Act
-        self.middleware.process_view(self.request, MagicMock(), (), {})
+        response = self.middleware.process_view(self.request, view_func, (1,), {"foo": "bar"})
 
         # Assert
-        mock_add_mixin.assert_called_once()
+        self.assertIsNone(response)
+        mock_install_setup_hook.assert_called_once_with(views.HelloTest)
+        self.assertIs(views.HelloTest, self.request._djcbv_view_class)
+        mock_should_process_request.assert_not_called()
 
-    @patch.object(
-        DjCbvInspectMiddleware, "should_process_request", new=MagicMock(return_value=False)
-    )
-    @patch.object(DjCbvInspectMiddleware, "_add_djcbv_mixin")
-    def test_middleware_process_view_hook_does_not_append_mixin(self, mock_add_mixin):
+    @patch("cbv_inspect.instrumentation.install_setup_hook")
+    def test_middleware_process_view_hook_does_not_mark_request(self, mock_install_setup_hook):
         """
-        Test that the middleware `process_view` hook exits early when `should_process_request`
-        is False.
+        Test that the middleware `process_view` hook exits early when the request
+        was not processed in `__call__`, i.e. it has no metadata attached.
 
         Even if the middleware exits early in `__call__`, the `get_response` calls which
         still triggers the `process_view` hook, hence the secondary check here.
         """
 
         # Act
-        self.middleware.process_view(self.request, MagicMock(), (), {})
+        response = self.middleware.process_view(self.request, MagicMock(), (), {})
 
         # Assert
-        mock_add_mixin.assert_not_called()
+        self.assertIsNone(response)
+        self.assertFalse(hasattr(self.request, "_djcbv_view_class"))
+        mock_install_setup_hook.assert_not_called()
 
 
 @override_settings(DEBUG=True)
@@ -337,6 +491,42 @@ class TestMiddlewareWithClient(TestCase):
         # Assert
         self.assertFalse('id="djCbv"' in response.content.decode(response.charset))
 
+    @override_settings(
+        MIDDLEWARE=settings.MIDDLEWARE + ["tests.test_middleware.TeapotExceptionMiddleware"]
+    )
+    def test_client_request_exception_reaches_process_exception_hooks(self):
+        """
+        Test that exceptions raised by an inspected view go through the
+        `process_exception` hooks of other middleware, since Django calls the view.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/raise_exception_cbv")
+
+        # Assert
+        self.assertEqual(418, response.status_code)
+        self.assertTrue(len(response.wsgi_request._djcbv_inspect_metadata.logs) > 0)
+
+    def test_client_request_for_cbv_without_response_runs_view_once(self):
+        """
+        Test that a view returning None fails like it does without inspection,
+        and only runs once.
+        """
+
+        # Arrange
+        client = Client()
+        views.NoResponseView.calls = 0
+
+        # Act
+        with self.assertRaises(ValueError), self.assertLogs("django.request", "ERROR"):
+            client.get("/no_response_cbv")
+
+        # Assert
+        self.assertEqual(1, views.NoResponseView.calls)
+
     def test_client_request_for_cbv_returns_early_when_excluded_with_decorator(self):
         """
         Test an excluded class-based view using the `djcbv_exclude` decorator function
@@ -370,3 +560,986 @@ class TestMiddlewareWithClient(TestCase):
         self.assertFalse("get_greeting" in response.content.decode(response.charset))
         bases = resolve(response._request.path).func.view_class.__bases__
         self.assertTrue(DjCbvInspectMixin not in bases)
+
+    def test_client_request_for_cbv_links_static_files(self):
+        """
+        Test that the toolbar CSS and JS are linked as static files instead of inlined.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/simple_cbv_render")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertIn('href="/static/cbv_inspect/css/toolbar.css"', content)
+        self.assertIn('src="/static/cbv_inspect/js/toolbar.js"', content)
+        self.assertNotIn("<style>", content)
+        self.assertNotIn("<script>", content)
+
+    def test_client_request_for_streaming_cbv_shows_toolbar(self):
+        """
+        Test that the toolbar is inserted into a streaming response.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/streaming_cbv")
+
+        # Assert
+        content = response.getvalue().decode(response.charset)
+        self.assertIn('id="djCbv"', content)
+        self.assertIn("StreamingView.get_rows", content)
+        self.assertTrue(content.endswith("</boDY></html>"))
+
+    def test_client_request_for_gzipped_cbv_shows_toolbar(self):
+        """
+        Test that the toolbar is inserted into a gzip compressed response,
+        which stays compressed.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/gzipped_cbv", HTTP_ACCEPT_ENCODING="gzip")
+
+        # Assert
+        content = gzip.decompress(response.content).decode(response.charset)
+        self.assertEqual("gzip", response["Content-Encoding"])
+        self.assertEqual(len(response.content), int(response["Content-Length"]))
+        self.assertIn('id="djCbv"', content)
+        self.assertTrue(content.rstrip().endswith("</body>\n</html>"))
+
+    def test_client_request_for_gzipped_streaming_cbv_shows_toolbar(self):
+        """
+        Test that the toolbar is inserted into a gzipped streaming response.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/gzipped_streaming_cbv", HTTP_ACCEPT_ENCODING="gzip")
+
+        # Assert
+        content = gzip.decompress(response.getvalue()).decode(response.charset)
+        self.assertEqual("gzip", response["Content-Encoding"])
+        self.assertIn('id="djCbv"', content)
+        self.assertTrue(content.endswith("</boDY></html>"))
+
+    def test_client_request_for_cbv_only_installs_setup_hook_on_view_class(self):
+        """
+        Test that the view runs with an instrumented subclass, the bases of the view class
+        are left as they are, and the setup hook it gets runs the view as is for requests
+        that aren't inspected.
+        """
+
+        # Arrange
+        client = Client()
+        view_class = views.RenderHtmlView
+        bases = view_class.__bases__
+
+        # Act
+        response = client.get("/simple_cbv_render")
+        uninspected_response = view_class.as_view()(RequestFactory().get("/simple_cbv_render"))
+
+        # Assert
+        view_instance = response.context_data["view"]
+        self.assertIsNot(view_class, type(view_instance))
+        self.assertIsInstance(view_instance, view_class)
+        self.assertIsInstance(view_instance, DjCbvInspectMixin)
+        self.assertEqual(bases, view_class.__bases__)
+        self.assertIn("setup", view_class.__dict__)
+        self.assertTrue(hasattr(view_class.setup, "_djcbv_original_setup"))
+        self.assertIs(view_class, type(uninspected_response.context_data["view"]))
+        self.assertTrue(len(response.wsgi_request._djcbv_inspect_metadata.logs) > 0)
+
+    def test_client_request_for_decorated_cbv_runs_decorator(self):
+        """
+        Test that decorators applied to the `as_view()` view function in the URLconf
+        still run for an inspected view.
+        """
+
+        # Arrange
+        client = Client()
+        user = User.objects.create_user("djcbv")
+
+        # Act
+        anonymous_response = client.get("/login_required_cbv")
+        client.force_login(user)
+        response = client.get("/login_required_cbv")
+
+        # Assert
+        self.assertEqual(302, anonymous_response.status_code)
+        self.assertTrue('id="djCbv"' in response.content.decode(response.charset))
+        self.assertTrue(len(response.wsgi_request._djcbv_inspect_metadata.logs) > 0)
+
+    def test_client_request_for_list_view_does_not_add_queries(self):
+        """
+        Test that serializing querysets, paginators and pages for the toolbar
+        doesn't run any queries of its own.
+        """
+
+        # Arrange
+        client = Client()
+        models.Book.objects.bulk_create(models.Book(name=str(i)) for i in range(3))
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/book_list_cbv")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertTrue('id="djCbv"' in content)
+        self.assertIn("&lt;&lt;queryset tests.Book", content)
+        self.assertEqual(1, len(queries))  # the paginator count, the template lists no books
+
+    def test_client_request_for_cbv_attributes_queries_to_methods(self):
+        """
+        Test that queries are attributed to the method running them, and counted
+        in the totals of its callers.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/book_list_cbv")
+
+        # Assert
+        logs = response.wsgi_request._djcbv_inspect_metadata.logs.values()
+        paginate_log = next(log for log in logs if log.name.endswith("paginate_queryset"))
+        context_log = next(log for log in logs if log.name.endswith("get_context_data"))
+        content = response.content.decode(response.charset)
+        self.assertEqual(1, paginate_log.queries.count)
+        self.assertIn(
+            'SELECT COUNT(*) AS "__count" FROM "tests_book"', paginate_log.queries.fingerprints
+        )
+        self.assertEqual(0, context_log.queries.count)
+        self.assertEqual(1, context_log.total_queries.count)
+        self.assertIn("COUNT(*)", content)
+        self.assertNotIn("Queries outside of CBV methods", content)
+
+    def test_client_request_for_cbv_flags_repeated_queries(self):
+        """
+        Test that the method running a query once per object is flagged as the origin.
+        """
+
+        # Arrange
+        client = Client()
+        models.Book.objects.bulk_create(models.Book(name=f"Book {i}") for i in range(4))
+
+        # Act
+        response = client.get("/book_names_cbv")
+
+        # Assert
+        logs = response.wsgi_request._djcbv_inspect_metadata.logs.values()
+        context_log = next(log for log in logs if log.name.endswith("get_context_data"))
+        content = response.content.decode(response.charset)
+        self.assertTrue(context_log.has_repeated_queries)
+        self.assertEqual(5, context_log.total_queries.count)
+        self.assertIn("Repeated queries", content)
+        self.assertIn("djcbv-repeated", content)
+        self.assertIn("BookNamesView.get", content)
+
+    def test_client_request_for_cbv_traces_memory_per_view(self):
+        """
+        Test that the memory allocations of a view with `DjCbvTraceMemoryMixin` are traced.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/allocating_cbv")
+
+        # Assert
+        logs = response.wsgi_request._djcbv_inspect_metadata.logs.values()
+        rows_log = next(log for log in logs if log.name.endswith("get_rows"))
+        content = response.content.decode(response.charset)
+        self.assertGreater(rows_log.memory_bytes, 0)
+        self.assertGreater(rows_log.memory_peak_bytes, rows_log.memory_bytes)
+        self.assertIn("Memory", content)
+        self.assertIn("Top allocations of", content)
+        self.assertIn("views.py", content)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_client_request_for_cbv_traces_memory_per_request(self):
+        """
+        Test that memory is traced for a request with the `djcbv-trace-memory` parameter only.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        traced_response = client.get("/simple_cbv_render", {"djcbv-trace-memory": "1"})
+        response = client.get("/simple_cbv_render")
+
+        # Assert
+        traced_logs = traced_response.wsgi_request._djcbv_inspect_metadata.logs.values()
+        logs = response.wsgi_request._djcbv_inspect_metadata.logs.values()
+        self.assertTrue(all(log.memory_bytes is not None for log in traced_logs))
+        self.assertTrue(all(log.memory_bytes is None for log in logs))
+        self.assertIn('data-cbv-col="memory"', traced_response.content.decode())
+        self.assertNotIn('data-cbv-col="memory"', response.content.decode())
+
+    def test_client_request_for_cbv_shows_unattributed_queries(self):
+        """
+        Test that queries run when rendering a template response are shown as unattributed.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        with patch.multiple(views.BookListView, paginate_by=None, template_name="book_list.html"):
+            response = client.get("/book_list_cbv")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertIn("Queries outside of CBV methods", content)
+
+    def test_client_request_for_cbv_with_large_values_is_bounded(self):
+        """
+        Test that large arguments and return values are cut off at the serialization limits,
+        and the toolbar says what was cut off.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        with override_settings(CBV_INSPECT_CONFIG={"MAX_ITEMS": 5, "MAX_REQUEST_LENGTH": 500}):
+            response = client.get("/large_context_cbv")
+
+        unbounded_response = client.get("/large_context_cbv")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertIn("995 items over 5 per container cut off", content)
+        self.assertIn("cut off by the 500 characters per request limit", content)
+        self.assertLess(len(content), len(unbounded_response.content) / 2)
+
+    def test_client_request_for_cbv_shows_timings(self):
+        """
+        Test that the toolbar shows timings and highlights the slowest method.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/slow_cbv")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        logs = response.wsgi_request._djcbv_inspect_metadata.logs
+        wait_log = next(log for log in logs.values() if log.name == "SlowView.wait")
+        self.assertIn("Time (ms)", content)
+        self.assertIn("CPU time (ms)", content)
+        self.assertTrue(wait_log.is_hot)
+        self.assertEqual(wait_log.wall_ns, wait_log.self_wall_ns)
+        self.assertIn("djcbv-hot", content)
+
+    def test_client_request_for_cbv_resolves_url_once(self):
+        """
+        Test that the middleware walks the URL resolver at most once per request,
+        and reuses the `ResolverMatch` that Django sets on the request after that.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        with patch("cbv_inspect.utils.resolve", wraps=resolve) as mock_resolve:
+            response = client.get("/simple_cbv_render")
+
+        # Assert
+        self.assertTrue('id="djCbv"' in response.content.decode(response.charset))
+        mock_resolve.assert_called_once_with("/simple_cbv_render")
+
+
+@override_settings(DEBUG=True)
+class TestMiddlewareConcurrency(TestCase):
+    """
+    Multi-threaded tests for the `DjCbvInspectMiddleware` middleware class.
+    """
+
+    THREADS = 8
+    REQUESTS = 200
+
+    @staticmethod
+    def get_trace(response):
+        return [
+            (log.order, log.indent, log.name)
+            for log in response.wsgi_request._djcbv_inspect_metadata.logs.values()
+        ]
+
+    def test_concurrent_requests_to_same_cbv_have_isolated_traces(self):
+        """
+        Test that concurrent requests to the same view, some of them raising,
+        each get a complete trace of their own, and the bases of the view class are never
+        modified.
+        """
+
+        # Arrange
+        bases = views.NumberView.__bases__
+        expected_trace = self.get_trace(Client().get("/number_cbv/0"))
+
+        def make_request(number):
+            client = Client(raise_request_exception=False)
+
+            if number % 5 == 0:
+                error_response = client.get("/raise_exception_cbv")
+                self.assertEqual(500, error_response.status_code)
+
+            return number, client.get(f"/number_cbv/{number}")
+
+        # Act
+        with self.assertLogs("django.request", "ERROR"):
+            with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+                results = list(executor.map(make_request, range(self.REQUESTS)))
+
+        # Assert
+        self.assertEqual(bases, views.NumberView.__bases__)
+
+        for number, response in results:
+            with self.subTest(number=number):
+                logs = response.wsgi_request._djcbv_inspect_metadata.logs
+                square_logs = [log for log in logs.values() if log.name.endswith("get_square")]
+
+                self.assertEqual(200, response.status_code)
+                self.assertEqual(expected_trace, self.get_trace(response))
+                self.assertEqual(f"({number},)", square_logs[0].args)
+                self.assertEqual(str(number * number), square_logs[0].return_value)
+
+
+@override_settings(DEBUG=True)
+class TestDjCBVInspectMiddlewareAsync(TestCase):
+    """
+    Tests for the `DjCbvInspectMiddleware` middleware class in async mode.
+    """
+
+    def setUp(self):
+        self.response = HttpResponse("<html><body></body></html>")
+
+        async def get_response(request):
+            return self.response
+
+        self.middleware = DjCbvInspectMiddleware(get_response)
+        self.request = AsyncRequestFactory().get("/simple_cbv_render")
+
+    def test_middleware_runs_natively_in_async_mode(self):
+        """
+        Test that the middleware is a coroutine function with an async `process_view` hook
+        when the next handler is async, so Django doesn't adapt it with a thread hop.
+        """
+
+        # Act
+        sync_middleware = DjCbvInspectMiddleware(MagicMock())
+
+        # Assert
+        self.assertTrue(asyncio.iscoroutinefunction(self.middleware))
+        self.assertTrue(asyncio.iscoroutinefunction(self.middleware.process_view))
+        self.assertFalse(asyncio.iscoroutinefunction(sync_middleware))
+        self.assertFalse(asyncio.iscoroutinefunction(sync_middleware.process_view))
+
+    @override_settings(DEBUG=False)
+    async def test_middleware_does_not_process_request_in_async_mode(self):
+        """
+        Test that the response is returned as is when the request shouldn't be processed.
+        """
+
+        # Act
+        response = await self.middleware(self.request)
+
+        # Assert
+        self.assertIs(self.response, response)
+        self.assertFalse(hasattr(self.request, "_djcbv_inspect_metadata"))
+
+    @override_settings(DEBUG=True)
+    async def test_middleware_inserts_toolbar_in_async_mode(self):
+        """
+        Test that the djCbv markup is inserted into the response in async mode.
+        """
+
+        # Act
+        response = await self.middleware(self.request)
+
+        # Assert
+        self.assertTrue(b'id="djCbv"' in response.content)
+
+    async def test_middleware_async_process_view_hook_does_not_mark_request(self):
+        """
+        Test that the async `process_view` hook returns None for requests without metadata.
+        """
+
+        # Act
+        response = await self.middleware.process_view(self.request, MagicMock(), (), {})
+
+        # Assert
+        self.assertIsNone(response)
+        self.assertFalse(hasattr(self.request, "_djcbv_view_class"))
+
+    @patch("cbv_inspect.instrumentation.install_setup_hook")
+    async def test_middleware_async_process_view_hook_marks_request(self, mock_install_setup_hook):
+        """
+        Test that the async `process_view` hook marks the request and lets Django call the view.
+        """
+
+        # Arrange
+        self.request._djcbv_inspect_metadata = MagicMock()
+
+        # Act
+        response = await self.middleware.process_view(
+            self.request, views.HelloTest.as_view(), (), {}
+        )
+
+        # Assert
+        self.assertIsNone(response)
+        mock_install_setup_hook.assert_called_once_with(views.HelloTest)
+        self.assertIs(views.HelloTest, self.request._djcbv_view_class)
+
+
+@override_settings(DEBUG=True)
+class TestMiddlewareWithAsyncClient(TestCase):
+    """
+    Client end-to-end request/response tests for the `DjCbvInspectMiddleware` middleware class
+    running under ASGI.
+    """
+
+    async def test_async_client_request_for_cbv_shows_toolbar(self):
+        """
+        Test a sync class-based view request under ASGI.
+        """
+
+        # Arrange
+        client = AsyncClient()
+
+        # Act
+        response = await client.get("/simple_cbv_render")
+
+        # Assert
+        self.assertTrue('id="djCbv"' in response.content.decode(response.charset))
+        self.assertTrue(len(response.asgi_request._djcbv_inspect_metadata.logs) > 0)
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={"SHOW_TOOLBAR_CALLBACK": "tests.test_middleware.show_toolbar_for_staff"}
+    )
+    async def test_async_client_request_with_show_toolbar_callback_using_user(self):
+        """
+        Test that a show toolbar callback can load the user from the database under ASGI,
+        both to show the toolbar and to trace memory per request.
+        """
+
+        # Arrange
+        client = AsyncClient()
+        user = await sync_to_async(User.objects.create_user)("staff", is_staff=True)
+        await sync_to_async(client.force_login)(user)
+
+        # Act
+        response = await client.get("/simple_cbv_render", {"djcbv-trace-memory": ""})
+        hidden_response = await AsyncClient().get("/simple_cbv_render")
+
+        # Assert
+        self.assertIn('id="djCbv"', response.content.decode(response.charset))
+        self.assertTrue(response.asgi_request._djcbv_inspect_metadata.trace_memory)
+        self.assertNotIn('id="djCbv"', hidden_response.content.decode(response.charset))
+
+    async def test_async_client_request_for_streaming_cbv_shows_toolbar(self):
+        """
+        Test that the toolbar is inserted into a streaming response under ASGI.
+        """
+
+        # Arrange
+        client = AsyncClient()
+
+        # Act
+        response = await client.get("/streaming_cbv")
+
+        # Assert
+        self.assertIn(b'id="djCbv"', b"".join(response.streaming_content))
+
+    async def test_async_client_request_for_cbv_attributes_queries(self):
+        """
+        Test that the queries of a sync view are attributed under ASGI.
+        """
+
+        # Arrange
+        client = AsyncClient()
+
+        # Act
+        response = await client.get("/book_list_cbv")
+
+        # Assert
+        logs = response.asgi_request._djcbv_inspect_metadata.logs.values()
+        paginate_log = next(log for log in logs if log.name.endswith("paginate_queryset"))
+        self.assertEqual(1, paginate_log.queries.count)
+
+    @skipIf(django.VERSION < (4, 1), "async class-based views require Django 4.1")
+    async def test_async_client_request_for_async_cbv_traces_memory(self):
+        """
+        Test that awaited async methods have no memory measurements, and that
+        the methods they call do.
+        """
+
+        # Arrange
+        client = AsyncClient()
+
+        # Act
+        response = await client.get("/async_number_cbv/3", {"djcbv-trace-memory": "1"})
+
+        # Assert
+        logs = response.asgi_request._djcbv_inspect_metadata.logs
+        handler_log = next(log for log in logs.values() if log.name == "AsyncNumberView.get")
+        square_log = next(log for log in logs.values() if log.name.endswith("get_square"))
+        self.assertIsNone(handler_log.memory_bytes)
+        self.assertIsNotNone(square_log.memory_bytes)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @skipIf(django.VERSION < (4, 1), "async class-based views require Django 4.1")
+    async def test_async_client_request_for_async_cbv_shows_toolbar(self):
+        """
+        Test an async class-based view request under ASGI, and assert that methods
+        called by the async handler are nested under it.
+        """
+
+        # Arrange
+        client = AsyncClient()
+
+        # Act
+        response = await client.get("/async_number_cbv/3")
+
+        # Assert
+        logs = response.asgi_request._djcbv_inspect_metadata.logs
+        handler_log = next(log for log in logs.values() if log.name == "AsyncNumberView.get")
+        square_log = next(log for log in logs.values() if log.name.endswith("get_square"))
+        self.assertTrue('id="djCbv"' in response.content.decode(response.charset))
+        self.assertIn("TemplateResponse", str(handler_log.return_value))
+        self.assertEqual(handler_log.indent + 2, square_log.indent)
+        self.assertEqual("9", square_log.return_value)
+
+
+@override_settings(DEBUG=False, CBV_INSPECT_CONFIG={"SAMPLE_RATE": 1, "TRACE_STORE": MEMORY_STORE})
+class TestMiddlewareSampling(TestCase):
+    """
+    Client end-to-end tests for sampled requests, which are traced to the trace store
+    instead of getting a toolbar.
+    """
+
+    def test_client_request_for_sampled_cbv_stores_trace(self):
+        """
+        Test that a sampled request gets no toolbar, and its trace is stored
+        with serialized values.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/book_list_cbv")
+
+        # Assert
+        metadata = response.wsgi_request._djcbv_inspect_metadata
+        context_log = next(
+            log for log in metadata.logs.values() if log.name.endswith("get_context_data")
+        )
+        self.assertNotIn('id="djCbv"', response.content.decode(response.charset))
+        self.assertTrue(metadata.sampled)
+        self.assertIs(metadata, get_store().get(metadata.request_id))
+        self.assertIsNone(context_log.return_value._value)
+        self.assertEqual(1, context_log.total_queries.count)
+        self.assertGreater(context_log.self_wall_ns, 0)
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={"SAMPLE_RATES": {"render_html_view": 0}, "TRACE_STORE": MEMORY_STORE}
+    )
+    def test_client_request_for_unsampled_cbv(self):
+        """
+        Test that a request that isn't sampled isn't traced.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/simple_cbv_render")
+
+        # Assert
+        self.assertFalse(hasattr(response.wsgi_request, "_djcbv_inspect_metadata"))
+        self.assertEqual([], get_store().list())
+
+    @override_settings(DEBUG=True)
+    def test_client_request_with_toolbar_is_not_sampled(self):
+        """
+        Test that requests get a toolbar instead when it's shown.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/simple_cbv_render")
+
+        # Assert
+        self.assertIn('id="djCbv"', response.content.decode(response.charset))
+        self.assertFalse(response.wsgi_request._djcbv_inspect_metadata.sampled)
+
+    async def test_async_client_request_for_sampled_cbv_stores_trace(self):
+        """
+        Test that a sampled request is stored under ASGI.
+        """
+
+        # Arrange
+        client = AsyncClient()
+
+        # Act
+        response = await client.get("/simple_cbv_render")
+
+        # Assert
+        metadata = response.asgi_request._djcbv_inspect_metadata
+        self.assertNotIn('id="djCbv"', response.content.decode(response.charset))
+        self.assertIs(metadata, get_store().get(metadata.request_id))
+
+
+class TestMiddlewareActivation(TestCase):
+    """
+    Tests for deciding whether the `DjCbvInspectMiddleware` middleware class is used,
+    and for which requests it shows the toolbar.
+    """
+
+    def test_middleware_is_not_used_when_disabled(self):
+        """
+        Test that the middleware takes itself out of the chain when DEBUG is False,
+        without a show toolbar callback or sampling.
+        """
+
+        # Act/Assert
+        with self.assertRaises(MiddlewareNotUsed):
+            DjCbvInspectMiddleware(MagicMock())
+
+    @override_settings(CBV_INSPECT_CONFIG={"SHOW_TOOLBAR_CALLBACK": show_toolbar_with_header})
+    def test_middleware_is_used_with_show_toolbar_callback(self):
+        """
+        Test that the middleware stays enabled with DEBUG off when a show toolbar callback is set.
+        """
+
+        # Act/Assert
+        self.assertTrue(DjCbvInspectMiddleware.is_enabled())
+
+    @override_settings(CBV_INSPECT_CONFIG={"SHOW_TOOLBAR_CALLBACK": show_toolbar_with_header})
+    def test_show_toolbar_calls_callback(self):
+        """
+        Test that `show_toolbar` calls the callback with the request, ignoring DEBUG.
+        """
+
+        # Arrange
+        request = RequestFactory().get("/", HTTP_X_CBV_INSPECT="on")
+
+        # Act/Assert
+        with self.settings(DEBUG=True):
+            self.assertFalse(DjCbvInspectMiddleware.show_toolbar(RequestFactory().get("/")))
+
+        self.assertTrue(DjCbvInspectMiddleware.show_toolbar(request))
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATE": 0.1})
+    def test_middleware_is_used_with_sampling(self):
+        """
+        Test that the middleware stays enabled with DEBUG off when requests are sampled.
+        """
+
+        # Act/Assert
+        self.assertTrue(DjCbvInspectMiddleware.is_enabled())
+
+    def test_disabled_middleware_is_skipped_by_handler(self):
+        """
+        Test that requests don't go through the middleware at all when it's disabled.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        with patch.object(DjCbvInspectMiddleware, "__call__") as mock_call:
+            response = client.get("/simple_cbv_render")
+
+        # Assert
+        self.assertEqual(200, response.status_code)
+        mock_call.assert_not_called()
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={
+            "SHOW_TOOLBAR_CALLBACK": "tests.test_middleware.show_toolbar_with_header"
+        }
+    )
+    def test_client_request_with_show_toolbar_callback(self):
+        """
+        Test that the callback decides which requests show the toolbar, even with
+        DEBUG set to False.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/simple_cbv_render", HTTP_X_CBV_INSPECT="on")
+        hidden_response = client.get("/simple_cbv_render")
+
+        # Assert
+        self.assertIn('id="djCbv"', response.content.decode(response.charset))
+        self.assertNotIn('id="djCbv"', hidden_response.content.decode(response.charset))
+        self.assertFalse(hasattr(hidden_response.wsgi_request, "_djcbv_resolver_match"))
+
+
+@override_settings(
+    DEBUG=True, CBV_INSPECT_CONFIG={"TOOLBAR_DELIVERY": "endpoint", "TRACE_STORE": MEMORY_STORE}
+)
+class TestMiddlewareEndpointDelivery(TestCase):
+    """
+    Client end-to-end tests for delivering the toolbar through the trace endpoint.
+    """
+
+    def test_client_request_inserts_loader_and_stores_trace(self):
+        """
+        Test that only the loader snippet is inserted, and that the trace endpoint
+        returns the toolbar.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/simple_cbv_render")
+        metadata = response.wsgi_request._djcbv_inspect_metadata
+        trace_response = client.get(f"/__cbv_inspect__/trace/{metadata.request_id}/")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        trace_content = trace_response.content.decode(trace_response.charset)
+        self.assertIn('id="djCbvLoader"', content)
+        self.assertIn(f'data-url="/__cbv_inspect__/trace/{metadata.request_id}/"', content)
+        self.assertIn('src="/static/cbv_inspect/js/loader.js"', content)
+        self.assertNotIn('id="djCbv"', content)
+        self.assertEqual(200, trace_response.status_code)
+        self.assertIn('id="djCbv"', trace_content)
+        self.assertIn("RenderHtmlView.get_context_data", trace_content)
+        self.assertLess(len(content), len(trace_content))
+
+    def test_trace_json_endpoint_returns_trace(self):
+        """
+        Test that the JSON endpoint returns the stored trace.
+        """
+
+        # Arrange
+        client = Client()
+        response = client.get("/number_cbv/3")
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+
+        # Act
+        trace_response = client.get(f"/__cbv_inspect__/trace/{request_id}/json/")
+
+        # Assert
+        trace = trace_response.json()
+        self.assertEqual("application/json", trace_response["Content-Type"])
+        self.assertEqual(request_id, trace["request_id"])
+        self.assertEqual({"number": 3}, trace["request"]["kwargs"])
+        self.assertEqual("tests.views.NumberView", trace["mro"][0]["name"])
+        self.assertEqual("View.setup", trace["calls"][0]["name"])
+
+    def test_trace_json_endpoint_for_unknown_trace(self):
+        """
+        Test that the JSON endpoint returns a 404 for an unknown trace.
+        """
+
+        # Act
+        response = Client().get("/__cbv_inspect__/trace/unknown/json/")
+
+        # Assert
+        self.assertEqual(404, response.status_code)
+
+    def test_trace_chrome_endpoint_returns_trace_file(self):
+        """
+        Test that the Chrome trace endpoint returns the stored trace as a file download.
+        """
+
+        # Arrange
+        client = Client()
+        response = client.get("/number_cbv/3")
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+
+        # Act
+        trace_response = client.get(f"/__cbv_inspect__/trace/{request_id}/chrome/")
+
+        # Assert
+        trace = trace_response.json()
+        self.assertEqual(
+            f'attachment; filename="cbv-inspect-{request_id}.trace.json"',
+            trace_response["Content-Disposition"],
+        )
+        self.assertIn("View.setup", [event["name"] for event in trace["traceEvents"]])
+
+    def test_trace_speedscope_endpoint_returns_profile_file(self):
+        """
+        Test that the speedscope endpoint returns the stored trace as a file download.
+        """
+
+        # Arrange
+        client = Client()
+        response = client.get("/number_cbv/3")
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+
+        # Act
+        trace_response = client.get(f"/__cbv_inspect__/trace/{request_id}/speedscope/")
+
+        # Assert
+        profile = trace_response.json()
+        self.assertEqual(
+            f'attachment; filename="cbv-inspect-{request_id}.speedscope.json"',
+            trace_response["Content-Disposition"],
+        )
+        self.assertEqual("View.setup", profile["shared"]["frames"][0]["name"])
+
+    def test_trace_speedscope_endpoint_for_unknown_trace(self):
+        """
+        Test that the speedscope endpoint returns a 404 for an unknown trace.
+        """
+
+        # Act
+        response = Client().get("/__cbv_inspect__/trace/unknown/speedscope/")
+
+        # Assert
+        self.assertEqual(404, response.status_code)
+
+    @override_settings(CBV_INSPECT_CONFIG={"TRACE_STORE": MEMORY_STORE})
+    def test_inline_panel_is_not_stored_by_default(self):
+        """
+        Test that the inline panel doesn't link to the trace exports, nor store the trace.
+        """
+
+        # Act
+        response = Client().get("/number_cbv/3")
+
+        # Assert
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+        self.assertContains(response, 'id="djCbv"')
+        self.assertNotContains(response, "djcbv-exports")
+        self.assertIsNone(get_store().get(request_id))
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={"INLINE_EXPORT_LINKS": True, "TRACE_STORE": MEMORY_STORE}
+    )
+    def test_inline_panel_links_to_stored_trace_exports(self):
+        """
+        Test that with inline export links, the inline panel links to the trace exports,
+        and stores the trace for them.
+        """
+
+        # Arrange
+        client = Client()
+        response = client.get("/number_cbv/3")
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+        url = f"/__cbv_inspect__/trace/{request_id}/chrome/"
+
+        # Act
+        trace_response = client.get(url)
+
+        # Assert
+        self.assertContains(response, 'id="djCbv"')
+        self.assertContains(response, f'href="{url}" download')
+        self.assertEqual(200, trace_response.status_code)
+
+    @override_settings(
+        CBV_INSPECT_CONFIG={"INLINE_MAX_RESPONSE_SIZE": 100, "TRACE_STORE": MEMORY_STORE}
+    )
+    def test_client_request_over_inline_max_response_size_inserts_loader(self):
+        """
+        Test that the loader is inserted instead of the toolbar into responses
+        larger than `INLINE_MAX_RESPONSE_SIZE`, even with inline delivery.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/large_context_cbv")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertIn('id="djCbvLoader"', content)
+        self.assertNotIn('id="djCbv"', content)
+
+    def test_trace_endpoint_for_unknown_trace(self):
+        """
+        Test that the trace endpoint returns a 404 for an unknown trace.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/__cbv_inspect__/trace/unknown/")
+
+        # Assert
+        self.assertEqual(404, response.status_code)
+
+    def test_trace_endpoint_hides_traces_without_toolbar(self):
+        """
+        Test that traces are only returned to requests that would show the toolbar.
+        """
+
+        # Arrange
+        client = Client()
+        response = client.get("/simple_cbv_render")
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+
+        # Act
+        with self.settings(DEBUG=False):
+            trace_response = client.get(f"/__cbv_inspect__/trace/{request_id}/")
+
+        # Assert
+        self.assertEqual(404, trace_response.status_code)
+
+    @override_settings(ROOT_URLCONF="tests.test_middleware")
+    def test_client_request_without_trace_urls_inserts_toolbar(self):
+        """
+        Test that the toolbar is inserted inline when `cbv_inspect.urls` isn't included.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        response = client.get("/simple_cbv_render")
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertIn('id="djCbv"', content)
+        self.assertNotIn('id="djCbvLoader"', content)
+
+    @override_settings(
+        ROOT_URLCONF="tests.test_middleware",
+        CBV_INSPECT_CONFIG={"INLINE_EXPORT_LINKS": True, "TRACE_STORE": MEMORY_STORE},
+    )
+    def test_inline_export_links_without_trace_urls(self):
+        """
+        Test that the inline panel has no export links, and the trace isn't stored,
+        when `cbv_inspect.urls` isn't included.
+        """
+
+        # Act
+        response = Client().get("/simple_cbv_render")
+
+        # Assert
+        request_id = response.wsgi_request._djcbv_inspect_metadata.request_id
+        self.assertContains(response, 'id="djCbv"')
+        self.assertNotContains(response, "djcbv-exports")
+        self.assertIsNone(get_store().get(request_id))
+
+
+urlpatterns = [path("simple_cbv_render", views.RenderHtmlView.as_view())]
@@ -1,13 +1,19 @@
-from unittest.mock import Mock, patch
+import asyncio
+import time
+from unittest.mock import patch
 
 from django.test import RequestFactory, TestCase
 
-from cbv_inspect.mixins import DjCbvInspectMixin
+from asgiref.sync import async_to_sync
+
+from cbv_inspect.instrumentation import get_instrumented_class
+from cbv_inspect.plans import plan_cache
 
 from . import views
+from .test_helpers import make_metadata
 
 
-@patch("cbv_inspect.utils.serialize_params")
+@patch("cbv_inspect.utils.capture_params")
 @patch("cbv_inspect.utils.get_path")
 @patch("cbv_inspect.utils.get_super_calls")
 @patch("cbv_inspect.utils.get_ccbv_link")
@@ -17,21 +23,18 @@ class TestDjCBVInspectMixin(TestCase):
     """
 
     def setUp(self):
+        plan_cache.clear()
         self.request = RequestFactory().get("/simple_cbv_render")
 
         # DjCBVInspectMixin only cares about the logs attr
-        self.request._djcbv_inspect_metadata = Mock(logs={})
-        self.view_func = views.RenderHtmlView.as_view()
-        self.view_func.view_class.__bases__ = (
-            DjCbvInspectMixin,
-            *self.view_func.view_class.__bases__,
-        )
+        self.request._djcbv_inspect_metadata = make_metadata()
+        self.view_func = get_instrumented_class(views.RenderHtmlView).as_view()
 
     @patch("cbv_inspect.utils.get_request")
     def test_mixin_runs_on_cbv_view(
         self,
         mock_utils_get_request,
-        mock_utils_serialize_params,
+        mock_utils_capture_params,
         mock_utils_get_path,
         mock_utils_get_super_calls,
         mock_utils_get_ccbv_link,
@@ -52,7 +55,226 @@ class TestDjCBVInspectMixin(TestCase):
         # Assert
         self.assertTrue(len(request_logs) > 0)
         mock_utils_get_request.assert_called()
-        mock_utils_serialize_params.assert_called()
+        mock_utils_capture_params.assert_called()
         mock_utils_get_path.assert_called()
         mock_utils_get_super_calls.assert_called()
         mock_utils_get_ccbv_link.assert_called()
+
+
+class TestDjCBVInspectMixinState(TestCase):
+    """
+    Tests for the per-call state kept by the `DjCbvInspectMixin` mixin class.
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get("/number_cbv/2")
+        self.request._djcbv_inspect_metadata = make_metadata()
+        self.view = get_instrumented_class(views.NumberView)()
+        self.view.setup(self.request, number=2)
+
+    def test_mixin_creates_a_log_per_call(self):
+        """
+        Test that calling the same bound method twice creates two logs.
+        """
+
+        # Arrange
+        get_square = self.view.get_square
+
+        # Act
+        get_square(2)
+        get_square(3)
+
+        # Assert
+        logs = self.request._djcbv_inspect_metadata.logs  # logs[1] is View.setup
+        self.assertEqual(3, len(logs))
+        self.assertEqual("(2,)", logs[2].args)
+        self.assertEqual("(3,)", logs[3].args)
+
+    def test_mixin_runs_methods_called_before_setup_as_is(self):
+        """
+        Test that methods called before `setup`, when no request can be found,
+        run without being logged.
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.NumberView)()
+
+        # Act
+        square = view.get_square(3)
+
+        # Assert
+        self.assertEqual(9, square)
+        self.assertEqual(1, len(self.request._djcbv_inspect_metadata.logs))
+
+    def test_mixin_restores_indent_when_method_raises(self):
+        """
+        Test that the indent is restored and the log is complete
+        when an inspected method raises.
+        """
+
+        # Arrange
+        with self.assertRaises(KeyError):
+            self.view.get_context_data()
+
+        # Act
+        self.view.get_square(2)
+
+        # Assert
+        logs = self.request._djcbv_inspect_metadata.logs  # logs[1] is View.setup
+        self.assertEqual(0, self.view.indent)
+        self.assertEqual("NumberView.get_context_data", logs[2].name)
+        self.assertEqual("NumberView.get_square", logs[3].name)
+        self.assertEqual(0, logs[3].indent)
+
+    def test_mixin_traces_async_method(self):
+        """
+        Test that an async method is traced until its coroutine is awaited,
+        and methods it calls are nested under it.
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.AsyncNumberView)()
+        view.setup(self.request, number=2)
+
+        # Act
+        response = async_to_sync(view.get)(self.request, number=2)
+
+        # Assert
+        logs = self.request._djcbv_inspect_metadata.logs  # logs[1] is View.setup
+        self.assertTrue(asyncio.iscoroutinefunction(view.get))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0, view.indent)
+        self.assertEqual("AsyncNumberView.get", logs[2].name)
+        self.assertIn("TemplateResponse", str(logs[2].return_value))
+        self.assertEqual("NumberView.get_context_data", logs[3].name)
+        self.assertEqual(1, logs[3].indent)
+        self.assertEqual("NumberView.get_square", logs[4].name)
+        self.assertEqual(2, logs[4].indent)
+
+    def test_mixin_logs_serialized_result_at_debug_level(self):
+        """
+        Test that the serialized return value is only logged when debug logging is enabled.
+        """
+
+        # Act
+        with self.assertLogs("cbv_inspect.mixins", "DEBUG") as logs:
+            self.view.get_square(3)
+
+        # Assert
+        self.assertIn("(2) result: 9", logs.output[-1])
+
+
+class TestDjCBVInspectMixinTimings(TestCase):
+    """
+    Tests for the timings recorded by the `DjCbvInspectMixin` mixin class.
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get("/slow_cbv")
+        self.request._djcbv_inspect_metadata = make_metadata()
+        self.logs = self.request._djcbv_inspect_metadata.logs
+
+    def test_mixin_records_wall_and_cpu_time(self):
+        """
+        Test that inclusive wall and CPU time are recorded for each call,
+        and that a sleeping call takes wall time but next to no CPU time.
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.SlowView)()
+        view.setup(self.request)
+
+        # Act
+        view.get_context_data()
+
+        # Assert
+        parent, child = self.logs[2], self.logs[3]  # logs[1] is View.setup
+        self.assertEqual("SlowView.wait", child.name)
+        self.assertGreaterEqual(child.wall_ns, 20_000_000)
+        self.assertLess(child.cpu_ns, 10_000_000)
+        self.assertGreaterEqual(parent.wall_ns, child.wall_ns)
+        self.assertGreater(child.overhead_ns, 0)
+        self.assertGreater(parent.overhead_ns, child.overhead_ns)
+        self.assertEqual([], self.request._djcbv_inspect_metadata.call_stack)
+
+    def test_mixin_leaves_out_overhead_of_child_calls(self):
+        """
+        Test that the overhead of child calls isn't counted in the time of their parent.
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.SlowView)()
+        view.setup(self.request)
+
+        # Act
+        with patch(
+            "cbv_inspect.utils.serialize_params", side_effect=lambda *a: time.sleep(0.05) or ""
+        ):
+            with self.settings(CBV_INSPECT_CONFIG={"SERIALIZE_MODE": "eager"}):
+                view.get_context_data()
+
+        # Assert
+        parent, child = self.logs[2], self.logs[3]
+        self.assertGreaterEqual(child.overhead_ns, 150_000_000)  # args, kwargs, return value
+        self.assertLess(parent.wall_ns, child.wall_ns + 100_000_000)
+
+    def test_mixin_leaves_out_cpu_overhead_of_child_calls(self):
+        """
+        Test that the CPU time of a parent only loses the CPU overhead of its child calls,
+        not their wall clock overhead (i.e. sleeping while serializing).
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.SlowView)()
+        view.setup(self.request)
+
+        # Act
+        with patch(
+            "cbv_inspect.utils.serialize_params", side_effect=lambda *a: time.sleep(0.05) or ""
+        ):
+            with self.settings(CBV_INSPECT_CONFIG={"SERIALIZE_MODE": "eager"}):
+                view.get_context_data()
+
+        # Assert
+        parent, child = self.logs[2], self.logs[3]
+        self.assertLess(child.cpu_overhead_ns, 50_000_000)
+        self.assertGreaterEqual(parent.cpu_overhead_ns, child.cpu_overhead_ns)
+        self.assertGreater(parent.cpu_ns, 0)
+        self.assertGreaterEqual(parent.cpu_ns, child.cpu_ns)
+
+    def test_mixin_records_timings_of_raising_call(self):
+        """
+        Test that a call that raises is timed and taken off the call stack.
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.RaiseExceptionView)()
+        view.setup(self.request)
+
+        # Act
+        with self.assertRaises(ValueError):
+            view.get_context_data()
+
+        # Assert
+        self.assertGreater(self.logs[2].wall_ns, 0)
+        self.assertEqual([], self.request._djcbv_inspect_metadata.call_stack)
+
+    def test_mixin_records_timings_of_async_calls(self):
+        """
+        Test that async calls are timed until awaited, without CPU time,
+        including when they raise.
+        """
+
+        # Arrange
+        view = get_instrumented_class(views.AsyncRaiseExceptionView)()
+        view.setup(self.request)
+
+        # Act
+        with self.assertRaises(ValueError):
+            async_to_sync(view.get)(self.request)
+
+        # Assert
+        self.assertEqual("AsyncRaiseExceptionView.get", self.logs[2].name)
+        self.assertGreater(self.logs[2].wall_ns, 0)
+        self.assertIsNone(self.logs[2].cpu_ns)
+        self.assertEqual([], self.request._djcbv_inspect_metadata.call_stack)
@@ -0,0 +1,127 @@
+import gc
+import weakref
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.views.generic import TemplateView
+
+from cbv_inspect.plans import (
+    DjCbvMethodPlan,
+    get_method_plan,
+    get_view_plan,
+    plan_cache,
+)
+
+from . import views
+
+
+class TestGetViewPlan(TestCase):
+    """
+    Tests for the `get_view_plan` function and the plan cache.
+    """
+
+    def setUp(self):
+        plan_cache.clear()
+
+    def test_view_plan_is_built_once(self):
+        """
+        Test that the plan of a view class is reused across lookups.
+        """
+
+        # Act
+        with patch("cbv_inspect.utils.get_mro") as mock_get_mro:
+            first_plan = get_view_plan(views.RenderHtmlView)
+            second_plan = get_view_plan(views.RenderHtmlView)
+
+        # Assert
+        self.assertIs(first_plan, second_plan)
+        mock_get_mro.assert_called_once_with(views.RenderHtmlView)
+
+    def test_view_plan_contains_allowed_callables(self):
+        """
+        Test that the plan lists the non-dunder methods of a view class.
+        """
+
+        # Act
+        plan = get_view_plan(views.RenderHtmlView)
+
+        # Assert
+        self.assertIn("get_context_data", plan.allowed_callables)
+        self.assertIn("dispatch", plan.allowed_callables)
+        self.assertNotIn("__init__", plan.allowed_callables)
+
+    @override_settings(CBV_INSPECT_CONFIG={"PLAN_CACHE_SIZE": 1})
+    def test_plan_cache_evicts_least_recently_used_plan(self):
+        """
+        Test that the plan cache is bounded.
+        """
+
+        # Act
+        get_view_plan(views.RenderHtmlView)
+        get_view_plan(views.HelloTest)
+
+        # Assert
+        self.assertEqual(1, len(plan_cache))
+        self.assertIsNone(plan_cache.get(views.RenderHtmlView))
+        self.assertIsNotNone(plan_cache.get(views.HelloTest))
+
+    def test_plan_cache_does_not_keep_view_class_alive(self):
+        """
+        Test that the plan cache only holds weak references to view classes.
+        """
+
+        # Arrange
+        view_class = type("TemporaryView", (TemplateView,), {"template_name": "base.html"})
+        get_method_plan(view_class, "get", view_class().get)
+        view_class_ref = weakref.ref(view_class)
+
+        # Act
+        del view_class
+        gc.collect()
+
+        # Assert
+        self.assertIsNone(view_class_ref())
+
+
+class TestGetMethodPlan(TestCase):
+    """
+    Tests for the `get_method_plan` function.
+    """
+
+    def setUp(self):
+        plan_cache.clear()
+
+    def test_method_plan_contains_static_metadata(self):
+        """
+        Test that the plan of a method holds its name, signature, path, super calls
+        and ccbv link.
+        """
+
+        # Arrange
+        method = views.ExcludedByMixin().get_context_data
+
+        # Act
+        plan = get_method_plan(views.ExcludedByMixin, "get_context_data", method)
+
+        # Assert
+        self.assertIsInstance(plan, DjCbvMethodPlan)
+        self.assertEqual("ExcludedByMixin.get_context_data", plan.name)
+        self.assertEqual("(self, **kwargs)", plan.signature)
+        self.assertTrue(plan.path.endswith("tests/views.py"))
+        self.assertEqual(1, len(plan.super_calls))
+        self.assertIsNone(plan.ccbv_link)
+
+    @patch("cbv_inspect.utils.get_super_calls")
+    def test_method_plan_is_built_once(self, mock_get_super_calls):
+        """
+        Test that the plan of a method is reused across lookups, i.e. requests.
+        """
+
+        # Act
+        for _ in range(3):
+            method = views.ExcludedByMixin().get_context_data
+            get_method_plan(views.ExcludedByMixin, "get_context_data", method)
+
+        # Assert
+        mock_get_super_calls.assert_called_once()
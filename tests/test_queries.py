@@ -0,0 +1,227 @@
+from django.db import connection, connections
+from django.test import TestCase
+
+from cbv_inspect.mixins import DjCbvCallTimer
+from cbv_inspect.queries import (
+    DjCbvQueryRecorder,
+    DjCbvRepeatedQuery,
+    fingerprint,
+    get_repeated_queries,
+    record_queries,
+)
+from cbv_inspect.utils import DjCbvLog
+
+from .test_helpers import make_metadata
+
+
+class TestFingerprint(TestCase):
+    """
+    Tests for the `fingerprint` function.
+    """
+
+    def test_fingerprint_replaces_values(self):
+        """
+        Test that placeholders, literals and whitespace are normalized.
+        """
+
+        # Arrange
+        sql = "SELECT *\n  FROM book WHERE id = %s AND title = 'It''s' LIMIT 21"
+
+        # Act
+        result = fingerprint(sql)
+
+        # Assert
+        self.assertEqual("SELECT * FROM book WHERE id = ? AND title = ? LIMIT ?", result)
+
+    def test_fingerprint_collapses_value_lists(self):
+        """
+        Test that queries with a different number of values in a list group together.
+        """
+
+        # Act
+        short = fingerprint("SELECT * FROM book WHERE id IN (%s, %s)")
+        long = fingerprint("SELECT * FROM book WHERE id IN (%s,%s,%s, %s)")
+
+        # Assert
+        self.assertEqual("SELECT * FROM book WHERE id IN (...)", short)
+        self.assertEqual(short, long)
+
+
+class TestDjCbvQueryRecorder(TestCase):
+    """
+    Tests for the `DjCbvQueryRecorder` class.
+    """
+
+    def setUp(self):
+        self.metadata = make_metadata()
+        self.recorder = DjCbvQueryRecorder(self.metadata)
+
+    def test_record_attributes_query_to_running_calls(self):
+        """
+        Test that a query counts for the innermost call, and in the totals of all calls.
+        """
+
+        # Arrange
+        parent, child = DjCbvLog(order=1), DjCbvLog(order=2, indent=1)
+        stack = self.metadata.call_stack
+        stack.extend([DjCbvCallTimer(parent, stack, 0, 0), DjCbvCallTimer(child, stack, 0, 0)])
+
+        # Act
+        self.recorder.record("SELECT %s", 5)
+        stack.pop()
+        self.recorder.record("SELECT %s", 7)
+
+        # Assert
+        self.assertEqual((1, 5), (child.queries.count, child.queries.duration_ns))
+        self.assertEqual((1, 5), (child.total_queries.count, child.total_queries.duration_ns))
+        self.assertEqual((1, 7), (parent.queries.count, parent.queries.duration_ns))
+        self.assertEqual((2, 12), (parent.total_queries.count, parent.total_queries.duration_ns))
+        self.assertEqual({"SELECT ?": 2}, parent.total_queries.fingerprints)
+        self.assertEqual(0, self.metadata.unattributed_queries.count)
+
+    def test_record_without_running_call(self):
+        """
+        Test that queries run outside of traced calls are recorded on the metadata.
+        """
+
+        # Act
+        self.recorder.record("SELECT 1", 1_000_000)
+
+        # Assert
+        self.assertEqual(1, self.metadata.unattributed_queries.count)
+        self.assertEqual(1.0, self.metadata.unattributed_queries.duration_ms)
+
+    def test_recorder_times_and_runs_query(self):
+        """
+        Test that the recorder runs the query, even one that fails, and records it.
+        """
+
+        # Act
+        with record_queries(self.metadata):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                row = cursor.fetchone()
+
+                with self.assertRaises(Exception):
+                    cursor.execute("SELECT * FROM no_such_table")
+
+        # Assert
+        self.assertEqual((1,), row)
+        self.assertEqual(2, self.metadata.unattributed_queries.count)
+        self.assertGreater(self.metadata.unattributed_queries.duration_ns, 0)
+
+    def test_record_queries_wraps_every_connection(self):
+        """
+        Test that the recorder is installed on every connection and removed afterwards.
+        """
+
+        # Act
+        with record_queries(self.metadata) as recorder:
+            installed = [recorder in conn.execute_wrappers for conn in connections.all()]
+
+        # Assert
+        self.assertTrue(installed and all(installed))
+        self.assertFalse(any(recorder in conn.execute_wrappers for conn in connections.all()))
+
+
+class TestGetRepeatedQueries(TestCase):
+    """
+    Tests for the `get_repeated_queries` function.
+    """
+
+    def setUp(self):
+        self.metadata = make_metadata()
+        self.recorder = DjCbvQueryRecorder(self.metadata)
+        self.logs = self.metadata.logs
+
+        for order, indent in enumerate([0, 1, 2, 2, 1], start=1):
+            self.logs[order] = DjCbvLog(order=order, indent=indent, name=f"method_{order}")
+
+    def run_queries(self, orders, sql, duration_ns=10):
+        """
+        Record a query as if run by the log of each order, with its ancestors on the stack.
+        """
+
+        stack = self.metadata.call_stack
+
+        for order in orders:
+            chain = [self.logs[order]]
+
+            for log in reversed(list(self.logs.values())[: order - 1]):
+                if log.indent < chain[0].indent:
+                    chain.insert(0, log)
+
+            stack[:] = [DjCbvCallTimer(log, stack, 0, 0) for log in chain]
+            self.recorder.record(sql, duration_ns)
+
+        stack.clear()
+
+    def test_get_repeated_queries_finds_innermost_origin(self):
+        """
+        Test that the origin is the innermost call that ran the fingerprint enough times,
+        even when each child call runs it once.
+        """
+
+        # Arrange
+        self.run_queries([3, 4, 4], "SELECT * FROM book WHERE id = %s")
+        self.run_queries([5, 5], "SELECT * FROM book WHERE id = %s")
+
+        # Act
+        repeated_queries = get_repeated_queries(self.metadata, threshold=3)
+
+        # Assert
+        self.assertEqual(
+            [
+                DjCbvRepeatedQuery(
+                    fingerprint="SELECT * FROM book WHERE id = ?",
+                    count=3,
+                    duration_ns=30,
+                    origin=self.logs[2],
+                    call_path=["method_1"],
+                )
+            ],
+            repeated_queries,
+        )
+        self.assertEqual(0.00002, repeated_queries[0].wasted_ms)
+        self.assertEqual(0.00003, repeated_queries[0].duration_ms)
+        self.assertTrue(self.logs[2].has_repeated_queries)
+        self.assertFalse(self.logs[1].has_repeated_queries)
+
+    def test_get_repeated_queries_sorts_by_wasted_time(self):
+        """
+        Test that repeated queries are sorted by wasted time, including those
+        run outside of traced calls.
+        """
+
+        # Arrange
+        self.run_queries([4, 4, 4], "SELECT 1", duration_ns=10)
+        self.run_queries([5, 5, 5], "SELECT 2", duration_ns=20)
+
+        for _ in range(3):
+            self.recorder.record("SELECT 3", 30)
+
+        # Act
+        repeated_queries = get_repeated_queries(self.metadata, threshold=3)
+
+        # Assert
+        self.assertEqual(
+            [("SELECT ?", None), ("SELECT ?", self.logs[5]), ("SELECT ?", self.logs[4])],
+            [(query.fingerprint, query.origin) for query in repeated_queries],
+        )
+        self.assertEqual(["method_1", "method_2"], repeated_queries[2].call_path)
+
+    def test_get_repeated_queries_below_threshold(self):
+        """
+        Test that nothing is flagged below the threshold, and earlier flags are cleared.
+        """
+
+        # Arrange
+        self.run_queries([4, 4], "SELECT 1")
+        self.logs[4].has_repeated_queries = True
+
+        # Act
+        repeated_queries = get_repeated_queries(self.metadata, threshold=3)
+
+        # Assert
+        self.assertEqual([], repeated_queries)
+        self.assertFalse(self.logs[4].has_repeated_queries)
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+from django.test import RequestFactory, SimpleTestCase
+from django.test.utils import override_settings
+
+from cbv_inspect.sampling import get_sample_rate, sample_request
+
+
+class TestGetSampleRate(SimpleTestCase):
+    """
+    Tests for the `get_sample_rate` function.
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get("/simple_cbv_render")
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATE": 0.5})
+    @patch("cbv_inspect.utils.resolve")
+    def test_get_sample_rate_without_per_view_rates(self, mock_resolve):
+        """
+        Test that the default rate is used, without resolving the URL.
+        """
+
+        # Act
+        rate = get_sample_rate(self.request)
+
+        # Assert
+        self.assertEqual(0.5, rate)
+        mock_resolve.assert_not_called()
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATES": {"render_html_view": 0.2}})
+    def test_get_sample_rate_by_url_name(self):
+        """
+        Test that a per URL name rate overrides the default rate.
+        """
+
+        # Act/Assert
+        self.assertEqual(0.2, get_sample_rate(self.request))
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATES": {"tests.views.RenderHtmlView": 0.3}})
+    def test_get_sample_rate_by_view_path(self):
+        """
+        Test that a per view path rate overrides the default rate.
+        """
+
+        # Act/Assert
+        self.assertEqual(0.3, get_sample_rate(self.request))
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATE": 0.1, "SAMPLE_RATES": {"other": 1}})
+    def test_get_sample_rate_falls_back_to_default_rate(self):
+        """
+        Test that views without a rate of their own get the `SAMPLE_RATE` config.
+        """
+
+        # Act/Assert
+        self.assertEqual(0.1, get_sample_rate(self.request))
+
+
+class TestSampleRequest(SimpleTestCase):
+    """
+    Tests for the `sample_request` function.
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get("/simple_cbv_render")
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATE": 0.5})
+    @patch("cbv_inspect.sampling.random.random", return_value=0.4)
+    def test_sample_request_under_rate(self, mock_random):
+        """
+        Test that a request whose random draw is under the rate is sampled.
+        """
+
+        # Act
+        sampled = sample_request(self.request)
+
+        # Assert
+        self.assertTrue(sampled)
+        self.assertTrue(self.request._djcbv_sampled)
+
+    @override_settings(CBV_INSPECT_CONFIG={"SAMPLE_RATE": 0.5})
+    @patch("cbv_inspect.sampling.random.random", return_value=0.5)
+    def test_sample_request_over_rate(self, mock_random):
+        """
+        Test that a request whose random draw is over the rate isn't sampled.
+        """
+
+        # Act
+        sampled = sample_request(self.request)
+
+        # Assert
+        self.assertFalse(sampled)
+        self.assertFalse(hasattr(self.request, "_djcbv_sampled"))
+
+    @patch("cbv_inspect.sampling.random.random")
+    def test_sample_request_when_sampling_is_off(self, mock_random):
+        """
+        Test that no random number is drawn with the default zero rate.
+        """
+
+        # Act
+        sampled = sample_request(self.request)
+
+        # Assert
+        self.assertFalse(sampled)
+        mock_random.assert_not_called()
@@ -0,0 +1,288 @@
+from collections import Counter
+from pprint import pformat
+
+from django import forms
+from django.core.paginator import Page, Paginator
+from django.test import AsyncRequestFactory, RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from cbv_inspect import serializers
+from cbv_inspect.serializers import (
+    DjCbvRepr,
+    DjCbvTruncated,
+    get_serializer,
+    prepare,
+    register,
+)
+
+from . import models
+
+
+class ContactForm(forms.Form):
+    name = forms.CharField()
+    email = forms.EmailField()
+
+
+class TestRegister(TestCase):
+    """
+    Tests for the `register` decorator and `get_serializer` lookup.
+    """
+
+    def setUp(self):
+        registry = serializers._registry.copy()
+        self.addCleanup(serializers._lookup_cache.clear)
+        self.addCleanup(serializers._registry.update, registry)
+        self.addCleanup(serializers._registry.clear)
+
+    def test_get_serializer_looks_up_mro(self):
+        """
+        Test that subclasses use the serializer of their closest registered parent class.
+        """
+
+        # Arrange
+        class Parent:
+            pass
+
+        class Child(Parent):
+            pass
+
+        @register(Parent)
+        def serialize_parent(obj):
+            return "parent"
+
+        # Act/Assert
+        self.assertIs(serialize_parent, get_serializer(Child))
+        self.assertIs(serialize_parent, get_serializer(Parent))
+        self.assertIsNone(get_serializer(int))
+
+    def test_register_replaces_serializer_and_clears_lookup_cache(self):
+        """
+        Test that registering a type again replaces its serializer, including cached lookups.
+        """
+
+        # Arrange
+        class Parent:
+            pass
+
+        class Child(Parent):
+            pass
+
+        register(Parent)(lambda obj: "parent")
+        get_serializer(Child)
+
+        # Act
+        @register(Child)
+        def serialize_child(obj):
+            return "child"
+
+        # Assert
+        self.assertIs(serialize_child, get_serializer(Child))
+
+
+class TestPrepare(TestCase):
+    """
+    Tests for the `prepare` function.
+    """
+
+    def test_prepare_replaces_objects_in_builtin_containers(self):
+        """
+        Test that nested objects with a registered serializer are replaced by their output.
+        """
+
+        # Arrange
+        book = models.Book(pk=1, name="Dune")
+        obj = {"books": [book], "pair": (book, 1), "names": {"Dune"}}
+
+        # Act
+        prepared = prepare(obj)
+
+        # Assert
+        self.assertEqual("<tests.Book: pk=1>", repr(prepared["books"][0]))
+        self.assertEqual("(<tests.Book: pk=1>, 1)", repr(prepared["pair"]))
+        self.assertEqual({"Dune"}, prepared["names"])
+
+    def test_prepare_handles_self_referencing_containers(self):
+        """
+        Test that a container that references itself doesn't recurse forever.
+        """
+
+        # Arrange
+        obj = [1]
+        obj.append(obj)
+
+        # Act
+        prepared = prepare(obj)
+
+        # Assert
+        self.assertEqual(1, prepared[0])
+        self.assertIs(obj, prepared[1])
+
+    def test_repr_outputs_text(self):
+        """
+        Test that `DjCbvRepr` outputs its text as is.
+        """
+
+        # Act/Assert
+        self.assertEqual("<<foo>>", repr(DjCbvRepr("<<foo>>")))
+
+
+@override_settings(CBV_INSPECT_CONFIG={"MAX_DEPTH": 2, "MAX_ITEMS": 2, "MAX_STRING_LENGTH": 3})
+class TestPrepareLimits(TestCase):
+    """
+    Tests for the serialization limits applied by `prepare`.
+    """
+
+    def setUp(self):
+        self.notes = Counter()
+
+    @override_settings(CBV_INSPECT_CONFIG={"MAX_DEPTH": 2})
+    def test_prepare_cuts_off_containers_beyond_max_depth(self):
+        """
+        Test that containers nested deeper than `MAX_DEPTH` are replaced by a placeholder.
+        """
+
+        # Arrange
+        obj = [[[1], {"a": 1}, (1,), {1}, frozenset({1}), []]]
+
+        # Act
+        prepared = pformat(prepare(obj, self.notes))
+
+        # Assert
+        self.assertIn("[[...], {...}, (...), {...}, frozenset({...}), []]", prepared)
+        self.assertEqual(Counter({"MAX_DEPTH": 5}), self.notes)
+
+    def test_prepare_cuts_off_items_beyond_max_items(self):
+        """
+        Test that items over `MAX_ITEMS` are cut off and marked at the end of the container.
+        """
+
+        # Act/Assert
+        self.assertEqual("[1, 2, ...<+3 more>]", pformat(prepare([1, 2, 3, 4, 5], self.notes)))
+        self.assertEqual(
+            "{'a': 1, 'b': 2, ...: <+1 more>}",
+            pformat(prepare({"a": 1, "b": 2, "c": 3}, self.notes)),
+        )
+        self.assertIn("...<+1 more>", pformat(prepare({1, 2, 3}, self.notes)))
+        self.assertEqual(5, self.notes["MAX_ITEMS"])
+
+    def test_prepare_cuts_off_long_strings(self):
+        """
+        Test that strings longer than `MAX_STRING_LENGTH` are cut off.
+        """
+
+        # Act/Assert
+        self.assertEqual("'abc'...", pformat(prepare("abcdef", self.notes)))
+        self.assertEqual("'abc'", pformat(prepare("abc", self.notes)))
+        self.assertEqual(1, self.notes["MAX_STRING_LENGTH"])
+
+    def test_truncated_marker_sorts_last(self):
+        """
+        Test that the marker for cut off items sorts after any other item.
+        """
+
+        # Arrange
+        marker = DjCbvTruncated("...")
+
+        # Act/Assert
+        self.assertEqual(["a", "b", marker], sorted([marker, "b", "a"]))
+
+
+class TestBuiltinSerializers(TestCase):
+    """
+    Tests for the built-in serializers.
+    """
+
+    def test_queryset_is_serialized_without_running_queries(self):
+        """
+        Test that an unevaluated queryset is serialized with its model and SQL,
+        and that no query runs.
+        """
+
+        # Arrange
+        queryset = models.Book.objects.filter(name="Dune")
+
+        # Act
+        with self.assertNumQueries(0):
+            serialized = repr(prepare(queryset))
+
+        # Assert
+        self.assertTrue(serialized.startswith("<<queryset tests.Book: SELECT"))
+        self.assertIn("Dune", serialized)
+        self.assertIsNone(queryset._result_cache)
+
+    def test_evaluated_and_empty_querysets(self):
+        """
+        Test that evaluated querysets show their result count,
+        and querysets that can't match anything are marked empty.
+        """
+
+        # Arrange
+        models.Book.objects.create(name="Dune")
+        evaluated = models.Book.objects.all()
+        list(evaluated)
+
+        # Act/Assert
+        self.assertIn("(1 results)", repr(prepare(evaluated)))
+        self.assertEqual(
+            "<<queryset tests.Book: EMPTY>>", repr(prepare(models.Book.objects.none()))
+        )
+
+    def test_requests_are_masked(self):
+        """
+        Test that WSGI and ASGI requests are masked.
+        """
+
+        # Act/Assert
+        self.assertEqual("<<request>>", repr(prepare(RequestFactory().get("/"))))
+        self.assertEqual("<<request>>", repr(prepare(AsyncRequestFactory().get("/"))))
+
+    def test_form_is_serialized_without_validating_it(self):
+        """
+        Test that a form is serialized without running validation.
+        """
+
+        # Arrange
+        form = ContactForm(data={"name": "Foo"})
+
+        # Act
+        serialized = repr(prepare(form))
+        form.is_valid()
+        validated = repr(prepare(form))
+
+        # Assert
+        self.assertEqual(
+            "<<form ContactForm: bound=True, valid=unknown, fields=(name, email)>>", serialized
+        )
+        self.assertEqual(
+            "<<form ContactForm: bound=True, valid=False, fields=(name, email)>>", validated
+        )
+
+    def test_paginator_and_page_are_serialized_without_counting(self):
+        """
+        Test that paginators and pages are serialized without running a count query,
+        unless the count is already known.
+        """
+
+        # Arrange
+        paginator = Paginator(models.Book.objects.order_by("pk"), 10)
+        page = paginator.page(1)
+
+        # Act
+        with self.assertNumQueries(0):
+            serialized_paginator = repr(prepare(paginator))
+            serialized_page = repr(prepare(page))
+
+        # Assert
+        self.assertTrue(serialized_paginator.startswith("<<paginator: per_page=10, count=0,"))
+        self.assertIn("<<queryset tests.Book: SELECT", serialized_paginator)
+        self.assertEqual("<<page 1 of 1>>", serialized_page)
+        self.assertEqual("<<page 1>>", repr(prepare(Page([1], 1, Paginator([1, 2], 1)))))
+        self.assertIn("count=unknown", repr(prepare(Paginator([1, 2], 1))))
+
+    def test_model_instance_is_serialized_by_pk(self):
+        """
+        Test that model instances are serialized by their label and primary key.
+        """
+
+        # Act/Assert
+        self.assertEqual("<tests.Book: pk=None>", repr(prepare(models.Book(name="Dune"))))
@@ -0,0 +1,333 @@
+import random
+
+from django.test import SimpleTestCase, TestCase
+from django.test.client import Client
+from django.test.utils import override_settings
+
+from cbv_inspect import stats
+from cbv_inspect.stats import DjCbvAggregator, DjCbvHistogram, DjCbvTimingStats
+from cbv_inspect.utils import DjCbvLog, DjCbvQueryStats
+
+from .test_helpers import make_metadata
+
+
+class TestDjCbvHistogram(SimpleTestCase):
+    """
+    Tests for the `DjCbvHistogram` class.
+    """
+
+    def test_quantile_of_empty_histogram(self):
+        """
+        Test that an empty histogram has no quantiles.
+        """
+
+        # Arrange
+        histogram = DjCbvHistogram()
+
+        # Act
+        quantile = histogram.quantile(0.5)
+
+        # Assert
+        self.assertIsNone(quantile)
+
+    def test_quantiles_are_within_five_percent(self):
+        """
+        Test that quantiles are close to the exact ones, across orders of magnitude.
+        """
+
+        # Arrange
+        rng = random.Random(0)
+        values = sorted(int(10 ** rng.uniform(3, 10)) for _ in range(10_000))
+        histogram = DjCbvHistogram()
+
+        # Act
+        for value in values:
+            histogram.add(value)
+
+        # Assert
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(exact, histogram.quantile(q), delta=exact * 0.05)
+
+    def test_memory_is_fixed(self):
+        """
+        Test that the number of buckets doesn't grow with the number of values.
+        """
+
+        # Arrange
+        histogram = DjCbvHistogram()
+
+        # Act
+        for value in range(0, 10**12, 10**8):
+            histogram.add(value)
+
+        # Assert
+        self.assertEqual(DjCbvHistogram.BUCKETS, len(histogram.counts))
+        self.assertEqual(10**4, histogram.count)
+
+    def test_quantiles_stay_within_min_and_max(self):
+        """
+        Test that values below the first bucket or above the last one are clamped
+        to the values seen.
+        """
+
+        # Arrange
+        histogram = DjCbvHistogram()
+        histogram.add(600)
+        histogram.add(10**13)
+
+        # Act
+        p0 = histogram.quantile(0)
+        p100 = histogram.quantile(1)
+
+        # Assert
+        self.assertEqual(600, p0)
+        self.assertEqual(10**13, p100)
+
+
+class TestDjCbvTimingStats(SimpleTestCase):
+    """
+    Tests for the `DjCbvTimingStats` dataclass.
+    """
+
+    def test_stats_without_calls(self):
+        """
+        Test that stats without calls have a zero mean and no quantiles.
+        """
+
+        # Arrange
+        timing_stats = DjCbvTimingStats()
+
+        # Assert
+        self.assertEqual(0.0, timing_stats.mean_ms)
+        self.assertEqual(0.0, timing_stats.queries_per_call)
+        self.assertIsNone(timing_stats.p50_ms)
+
+    def test_stats_add_calls(self):
+        """
+        Test that calls add up to totals, means and quantiles.
+        """
+
+        # Arrange
+        timing_stats = DjCbvTimingStats()
+
+        # Act
+        timing_stats.add(wall_ns=2_000_000, self_wall_ns=1_000_000, queries=3)
+        timing_stats.add(wall_ns=4_000_000, self_wall_ns=1_000_000, queries=1)
+
+        # Assert
+        self.assertEqual(2, timing_stats.count)
+        self.assertEqual(6.0, timing_stats.total_ms)
+        self.assertEqual(2.0, timing_stats.self_ms)
+        self.assertEqual(3.0, timing_stats.mean_ms)
+        self.assertEqual(2.0, timing_stats.queries_per_call)
+        self.assertEqual(2.0, timing_stats.p50_ms)
+        self.assertEqual(4.0, timing_stats.p99_ms)
+        self.assertLessEqual(timing_stats.p50_ms, timing_stats.p95_ms)
+
+
+class TestDjCbvAggregator(SimpleTestCase):
+    """
+    Tests for the `DjCbvAggregator` class.
+    """
+
+    def setUp(self):
+        self.aggregator = DjCbvAggregator()
+
+    def test_add_aggregates_per_view_and_method(self):
+        """
+        Test that request timings and queries add up per view and per method.
+        """
+
+        # Arrange
+        metadata = make_metadata(
+            DjCbvLog(indent=0, name="View.dispatch", wall_ns=300, self_wall_ns=100),
+            DjCbvLog(
+                indent=1,
+                name="ListView.get",
+                wall_ns=200,
+                self_wall_ns=200,
+                queries=DjCbvQueryStats(count=2),
+            ),
+            view_path="books.ListView",
+            unattributed_queries=DjCbvQueryStats(count=1),
+        )
+
+        # Act
+        self.aggregator.add(metadata)
+        self.aggregator.add(metadata)
+
+        # Assert
+        view_stats = self.aggregator.views["books.ListView"]
+        self.assertEqual(2, view_stats.count)
+        self.assertEqual(600, view_stats.wall_ns)
+        self.assertEqual(6, view_stats.queries)
+
+        method_stats = self.aggregator.methods[("books.ListView", "ListView.get")]
+        self.assertEqual(2, method_stats.count)
+        self.assertEqual(400, method_stats.self_wall_ns)
+        self.assertEqual(4, method_stats.queries)
+
+    def test_get_methods_ranks_slowest_first(self):
+        """
+        Test that methods are ranked by self time by default, or by another stat.
+        """
+
+        # Arrange
+        self.aggregator.add(
+            make_metadata(
+                DjCbvLog(indent=0, name="View.dispatch", wall_ns=3_000, self_wall_ns=1_000),
+                DjCbvLog(indent=1, name="ListView.get", wall_ns=2_000, self_wall_ns=2_000),
+                view_path="books.ListView",
+            )
+        )
+
+        # Act
+        by_self = self.aggregator.get_methods()
+        by_total = self.aggregator.get_methods("total_ms", limit=1)
+
+        # Assert
+        self.assertEqual(
+            [("books.ListView", "ListView.get"), ("books.ListView", "View.dispatch")],
+            [key for key, _ in by_self],
+        )
+        self.assertEqual([("books.ListView", "View.dispatch")], [key for key, _ in by_total])
+
+    def test_get_views_ranks_slowest_first(self):
+        """
+        Test that views are ranked by p95 time by default.
+        """
+
+        # Arrange
+        self.aggregator.add(make_metadata(DjCbvLog(indent=0, wall_ns=1_000), view_path="fast"))
+        self.aggregator.add(make_metadata(DjCbvLog(indent=0, wall_ns=9_000), view_path="slow"))
+
+        # Act
+        views = self.aggregator.get_views()
+
+        # Assert
+        self.assertEqual(["slow", "fast"], [view_path for view_path, _ in views])
+
+    def test_get_methods_with_unknown_ordering(self):
+        """
+        Test that ranking by an unknown stat is an error.
+        """
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.aggregator.get_methods("name")
+
+    def test_clear(self):
+        """
+        Test that clearing drops the stats of every view and method.
+        """
+
+        # Arrange
+        self.aggregator.add(make_metadata(DjCbvLog(indent=0, name="View.setup"), view_path="view"))
+
+        # Act
+        self.aggregator.clear()
+
+        # Assert
+        self.assertEqual([], self.aggregator.get_views())
+        self.assertEqual([], self.aggregator.get_methods())
+
+
+@override_settings(DEBUG=True)
+class TestStatsDashboard(TestCase):
+    """
+    Client end-to-end tests for aggregating traced requests and the stats dashboard.
+    """
+
+    def setUp(self):
+        stats.aggregator.clear()
+
+    def test_traced_requests_are_aggregated(self):
+        """
+        Test that the middleware adds the timings of traced requests to the aggregator.
+        """
+
+        # Arrange
+        client = Client()
+
+        # Act
+        client.get("/number_cbv/3")
+        client.get("/number_cbv/4")
+
+        # Assert
+        self.assertEqual(2, stats.aggregator.views["tests.views.NumberView"].count)
+        self.assertEqual(
+            2, stats.aggregator.methods[("tests.views.NumberView", "View.setup")].count
+        )
+
+    @override_settings(CBV_INSPECT_CONFIG={"AGGREGATE_STATS": False})
+    def test_traced_requests_are_not_aggregated_when_disabled(self):
+        """
+        Test that nothing is aggregated with the `AGGREGATE_STATS` config off.
+        """
+
+        # Act
+        Client().get("/number_cbv/3")
+
+        # Assert
+        self.assertEqual({}, stats.aggregator.views)
+
+    def test_dashboard_ranks_methods(self):
+        """
+        Test that the dashboard shows views and methods ranked by the chosen stat.
+        """
+
+        # Arrange
+        client = Client()
+        client.get("/number_cbv/3")
+
+        # Act
+        response = client.get("/__cbv_inspect__/", {"order_by": "p95_ms"})
+
+        # Assert
+        content = response.content.decode(response.charset)
+        self.assertEqual(200, response.status_code)
+        self.assertIn("1 traced request ", content)
+        self.assertIn("<strong>p95_ms</strong>", content)
+        self.assertIn("tests.views.NumberView", content)
+        self.assertIn("<code>NumberView.get_context_data</code>", content)
+
+    @override_settings(CBV_INSPECT_CONFIG={"DASHBOARD_METHODS": 1})
+    def test_dashboard_limits_methods(self):
+        """
+        Test that the dashboard shows `DASHBOARD_METHODS` methods, and ignores unknown orderings.
+        """
+
+        # Arrange
+        client = Client()
+        client.get("/number_cbv/3")
+
+        # Act
+        response = client.get("/__cbv_inspect__/", {"order_by": "unknown"})
+
+        # Assert
+        self.assertEqual(1, len(response.context["methods"]))
+        self.assertEqual("self_ms", response.context["order_by"])
+
+    def test_dashboard_without_traced_requests(self):
+        """
+        Test that the dashboard says so when there are no traced requests.
+        """
+
+        # Act
+        response = Client().get("/__cbv_inspect__/")
+
+        # Assert
+        self.assertContains(response, "No traced requests yet", count=2)
+
+    def test_dashboard_hidden_without_toolbar(self):
+        """
+        Test that the dashboard returns a 404 to requests that wouldn't show the toolbar.
+        """
+
+        # Act
+        with self.settings(DEBUG=False):
+            response = Client().get("/__cbv_inspect__/")
+
+        # Assert
+        self.assertEqual(404, response.status_code)
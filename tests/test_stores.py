@@ -0,0 +1,425 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from cbv_inspect.stores import (
+    DjCbvCacheTraceStore,
+    DjCbvFileTraceStore,
+    DjCbvMemoryTraceStore,
+    DjCbvSqliteTraceStore,
+    DjCbvTraceStore,
+    get_store,
+)
+from cbv_inspect.utils import DjCbvLog
+
+from .test_helpers import make_metadata
+
+
+def make_timed_metadata(wall_ns, **kwargs):
+    metadata = make_metadata(**kwargs)
+    metadata.logs[1] = DjCbvLog(order=1, indent=0, wall_ns=wall_ns)
+    metadata.logs[2] = DjCbvLog(order=2, indent=1, wall_ns=wall_ns - 1)
+
+    return metadata
+
+
+class StoreQueryTests:
+    """
+    Tests for the `query` method, shared by stores.
+    """
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        super().setUp()
+        self.store = self.make_store()
+        self.a = make_timed_metadata(30, url_name="books:list", started_at=100)
+        self.b = make_timed_metadata(10, url_name="books:list", started_at=200)
+        self.c = make_timed_metadata(
+            20,
+            url_name="books:detail",
+            view_path="books.views.BookDetailView",
+            method="POST",
+            started_at=300,
+        )
+        self.d = make_timed_metadata(40, url_name="books:list", method="POST", started_at=400)
+
+        for metadata in (self.a, self.b, self.c, self.d):
+            self.store.save(metadata)
+
+    def query(self, **kwargs):
+        return [metadata.request_id for metadata in self.store.query(**kwargs)]
+
+    def ids(self, *traces):
+        return [metadata.request_id for metadata in traces]
+
+    def test_query_defaults_to_most_recent_first(self):
+        """
+        Test that traces are returned most recent first by default.
+        """
+
+        # Act/Assert
+        self.assertEqual(self.ids(self.d, self.c, self.b, self.a), self.query())
+
+    def test_query_by_url_name_sorted_by_total_time(self):
+        """
+        Test that traces are filtered by URL name, slowest first, and limited.
+        """
+
+        # Act
+        request_ids = self.query(url_name="books:list", order_by="-total_wall_ns", limit=2)
+
+        # Assert
+        self.assertEqual(self.ids(self.d, self.a), request_ids)
+
+    def test_query_by_method_and_view_path(self):
+        """
+        Test that traces are filtered by HTTP method and by view path.
+        """
+
+        # Act/Assert
+        self.assertEqual(self.ids(self.c, self.d), self.query(method="POST", order_by="started_at"))
+        self.assertEqual(self.ids(self.c), self.query(view_path="books.views.BookDetailView"))
+
+    def test_query_by_time_range(self):
+        """
+        Test that traces are filtered by start time, from `since` up to `until`.
+        """
+
+        # Act/Assert
+        self.assertEqual(self.ids(self.c, self.b), self.query(since=200, until=400))
+
+    def test_query_without_limit(self):
+        """
+        Test that all matching traces are returned without a limit.
+        """
+
+        # Act/Assert
+        self.assertEqual(4, len(self.query(limit=None)))
+
+    def test_query_with_invalid_ordering(self):
+        """
+        Test that ordering by a field that isn't indexed is an error.
+        """
+
+        # Act/Assert
+        with self.assertRaises(ValueError):
+            self.store.query(order_by="-path")
+
+
+class TestDjCbvTraceStore(SimpleTestCase):
+    """
+    Tests for the `DjCbvTraceStore` base class.
+    """
+
+    def test_methods_must_be_implemented(self):
+        """
+        Test that stores must implement saving, getting and listing traces.
+        """
+
+        # Arrange
+        store = DjCbvTraceStore()
+
+        # Act/Assert
+        with self.assertRaises(NotImplementedError):
+            store.save(make_metadata())
+
+        with self.assertRaises(NotImplementedError):
+            store.get("id")
+
+        with self.assertRaises(NotImplementedError):
+            store.list()
+
+
+class TestDjCbvMemoryTraceStore(SimpleTestCase):
+    """
+    Tests for the `DjCbvMemoryTraceStore` class.
+    """
+
+    def test_store_keeps_most_recent_traces(self):
+        """
+        Test that traces are listed most recent first, and the oldest are dropped.
+        """
+
+        # Arrange
+        store = DjCbvMemoryTraceStore(max_traces=2)
+        first, second, third = make_metadata(), make_metadata(), make_metadata()
+
+        # Act
+        for metadata in (first, second, third):
+            store.save(metadata)
+
+        # Assert
+        self.assertEqual([third, second], store.list())
+        self.assertIs(second, store.get(second.request_id))
+        self.assertIsNone(store.get(first.request_id))
+
+
+class TestDjCbvMemoryTraceStoreQuery(StoreQueryTests, SimpleTestCase):
+    def make_store(self):
+        return DjCbvMemoryTraceStore()
+
+
+class TestDjCbvCacheTraceStore(SimpleTestCase):
+    """
+    Tests for the `DjCbvCacheTraceStore` class.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_store_keeps_most_recent_traces(self):
+        """
+        Test that traces are stored in the cache, and listed most recent first.
+        """
+
+        # Arrange
+        store = DjCbvCacheTraceStore(max_traces=2)
+        first, second, third = make_metadata(), make_metadata(), make_metadata()
+
+        # Act
+        for metadata in (first, second, third):
+            store.save(metadata)
+
+        # Assert
+        self.assertEqual(
+            [third.request_id, second.request_id], [trace.request_id for trace in store.list()]
+        )
+        self.assertEqual(first.request_id, store.get(first.request_id).request_id)
+        self.assertEqual(first.path, store.get(first.request_id).path)
+
+    def test_list_skips_expired_traces(self):
+        """
+        Test that traces that expired from the cache are left out.
+        """
+
+        # Arrange
+        store = DjCbvCacheTraceStore()
+        first, second = make_metadata(), make_metadata()
+        store.save(first)
+        store.save(second)
+
+        # Act
+        cache.delete(store.key_prefix + first.request_id)
+
+        # Assert
+        self.assertEqual([second.request_id], [trace.request_id for trace in store.list()])
+        self.assertIsNone(store.get(first.request_id))
+
+
+class TestDjCbvFileTraceStore(SimpleTestCase):
+    """
+    Tests for the `DjCbvFileTraceStore` class.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_store_keeps_most_recent_traces(self):
+        """
+        Test that traces are written to files, listed most recent first,
+        and the oldest files removed.
+        """
+
+        # Arrange
+        store = DjCbvFileTraceStore(self.directory, max_traces=2)
+        first, second, third = make_metadata(), make_metadata(), make_metadata()
+
+        # Act
+        for metadata in (first, second, third):
+            store.save(metadata)
+            time.sleep(0.01)  # distinct modification times
+
+        # Assert
+        self.assertEqual(
+            [third.request_id, second.request_id], [trace.request_id for trace in store.list()]
+        )
+        self.assertEqual(second.path, store.get(second.request_id).path)
+        self.assertIsNone(store.get(first.request_id))
+        self.assertEqual(2, len(os.listdir(self.directory)))
+
+    def test_get_stays_in_directory(self):
+        """
+        Test that request IDs can't point outside the store's directory.
+        """
+
+        # Arrange
+        store = DjCbvFileTraceStore(self.directory)
+
+        # Act
+        path = store.get_path("../../etc/passwd")
+
+        # Assert
+        self.assertEqual(os.path.join(self.directory, "passwd.json"), path)
+
+    def test_save_ignores_files_removed_concurrently(self):
+        """
+        Test that an old file removed by another process while pruning is ignored.
+        """
+
+        # Arrange
+        store = DjCbvFileTraceStore(self.directory, max_traces=0)
+        gone = os.path.join(self.directory, "gone.json")
+
+        # Act
+        store.get_paths = lambda: [gone]
+        store.save(make_metadata())
+
+        # Assert
+        self.assertEqual(1, len(os.listdir(self.directory)))
+
+    def test_traces_are_stored_as_json(self):
+        """
+        Test that traces are written as JSON and loaded back with their logs.
+        """
+
+        # Arrange
+        store = DjCbvFileTraceStore(self.directory)
+        metadata = make_timed_metadata(10, url_name="books:list")
+
+        # Act
+        store.save(metadata)
+
+        # Assert
+        with open(store.get_path(metadata.request_id), encoding="utf-8") as file:
+            self.assertEqual(metadata.to_dict(), json.load(file))
+
+        trace = store.get(metadata.request_id)
+        self.assertEqual("books:list", trace.url_name)
+        self.assertEqual(10, trace.total_wall_ns)
+
+    def test_directory_is_created_private(self):
+        """
+        Test that the directory is created readable by the user running the app only.
+        """
+
+        # Arrange
+        directory = os.path.join(self.directory, "traces")
+
+        # Act
+        DjCbvFileTraceStore(directory)
+
+        # Assert
+        self.assertEqual(0o700, stat.S_IMODE(os.stat(directory).st_mode))
+
+    def test_directory_owned_by_another_user(self):
+        """
+        Test that a directory owned by another user, i.e. planted in a shared
+        temp directory, is refused.
+        """
+
+        # Act/Assert
+        with mock.patch("os.getuid", return_value=os.getuid() + 1):
+            with self.assertRaises(PermissionError):
+                DjCbvFileTraceStore(self.directory)
+
+
+class TestDjCbvSqliteTraceStore(SimpleTestCase):
+    """
+    Tests for the `DjCbvSqliteTraceStore` class.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "traces.sqlite3")
+
+    def test_store_keeps_most_recent_traces(self):
+        """
+        Test that traces are listed most recent first, and the oldest are deleted.
+        """
+
+        # Arrange
+        store = DjCbvSqliteTraceStore(self.path, max_traces=2)
+        first, second, third = make_metadata(), make_metadata(), make_metadata()
+
+        # Act
+        for metadata in (first, second, third):
+            store.save(metadata)
+
+        # Assert
+        self.assertEqual(
+            [third.request_id, second.request_id], [trace.request_id for trace in store.list()]
+        )
+        self.assertEqual(second.path, store.get(second.request_id).path)
+        self.assertIsNone(store.get(first.request_id))
+
+    def test_traces_are_shared_between_stores_and_threads(self):
+        """
+        Test that traces saved by a store in another thread are read from the database.
+        """
+
+        # Arrange
+        metadata = make_timed_metadata(10, url_name="books:list")
+
+        # Act
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(DjCbvSqliteTraceStore(self.path).save, metadata).result()
+
+        # Assert
+        trace = DjCbvSqliteTraceStore(self.path).get(metadata.request_id)
+        self.assertEqual("books:list", trace.url_name)
+        self.assertEqual(10, trace.total_wall_ns)
+
+    def test_traces_are_stored_as_json(self):
+        """
+        Test that traces are stored as JSON rather than pickled.
+        """
+
+        # Arrange
+        store = DjCbvSqliteTraceStore(self.path)
+        metadata = make_timed_metadata(10)
+
+        # Act
+        store.save(metadata)
+
+        # Assert
+        (data,) = store.connection.execute("SELECT data FROM traces").fetchone()
+        self.assertEqual(metadata.to_dict(), json.loads(data))
+
+
+class TestDjCbvSqliteTraceStoreQuery(StoreQueryTests, SimpleTestCase):
+    def make_store(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        return DjCbvSqliteTraceStore(os.path.join(directory, "traces.sqlite3"))
+
+
+class TestGetStore(SimpleTestCase):
+    """
+    Tests for the `get_store` function.
+    """
+
+    def test_get_store_default(self):
+        """
+        Test that the in-memory store is the default, and is cached.
+        """
+
+        # Act
+        store = get_store()
+
+        # Assert
+        self.assertIsInstance(store, DjCbvMemoryTraceStore)
+        self.assertIs(store, get_store())
+
+    @override_settings(CBV_INSPECT_CONFIG={"TRACE_STORE_OPTIONS": {"max_traces": 5}})
+    def test_get_store_with_options(self):
+        """
+        Test that the store is created with the `TRACE_STORE_OPTIONS` config.
+        """
+
+        # Act/Assert
+        self.assertEqual(5, get_store().max_traces)
@@ -1,33 +1,44 @@
 import inspect
 import unittest
-from collections import namedtuple
+from collections import Counter, namedtuple
 from unittest.mock import MagicMock, Mock, create_autospec, patch
 
 from django import get_version
-from django.test import RequestFactory, TestCase
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import override_settings
 from django.views.generic import TemplateView
 
 from cbv_inspect.mixins import DjCbvInspectMixin
 from cbv_inspect.utils import (
     DjCbvClassOrMethodInfo,
+    DjCbvDeferredValue,
     DjCbvException,
     DjCbvLog,
+    DjCbvSerializationBudget,
+    capture_params,
     class_has_method,
     collect_parent_classes,
+    format_truncation_notes,
     get_bases,
     get_callable_source,
     get_ccbv_link,
     get_mro,
+    get_mro_index,
     get_path,
     get_request,
+    get_resolver_match,
     get_signature,
-    get_sourcecode,
     get_super_calls,
     is_cbv_view,
     mask_queryset,
     mask_request,
+    parse_super_calls,
+    resolve_super_class,
+    serialize_logs,
     serialize_params,
     set_log_parents,
+    set_log_timings,
+    snapshot,
 )
 
 from . import models, test_helpers, views
@@ -69,6 +80,46 @@ class TestIsViewCbv(unittest.TestCase):
         self.assertFalse(from_cbv)
 
 
+class TestGetResolverMatch(unittest.TestCase):
+    """
+    Tests for the `get_resolver_match` util function.
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get("/simple_cbv_render")
+
+    @patch("cbv_inspect.utils.resolve")
+    def test_get_resolver_match_reuses_django_resolver_match(self, mock_resolve):
+        """
+        Test that the `ResolverMatch` set by Django on the request is reused.
+        """
+
+        # Arrange
+        self.request.resolver_match = Mock()
+
+        # Act
+        match = get_resolver_match(self.request)
+
+        # Assert
+        self.assertEqual(self.request.resolver_match, match)
+        mock_resolve.assert_not_called()
+
+    @patch("cbv_inspect.utils.resolve")
+    def test_get_resolver_match_resolves_path_once(self, mock_resolve):
+        """
+        Test that the path is resolved once and the result is cached on the request.
+        """
+
+        # Act
+        first_match = get_resolver_match(self.request)
+        second_match = get_resolver_match(self.request)
+
+        # Assert
+        self.assertEqual(mock_resolve.return_value, first_match)
+        self.assertEqual(first_match, second_match)
+        mock_resolve.assert_called_once_with("/simple_cbv_render")
+
+
 class TestCollectParentClasses(unittest.TestCase):
     """
     Tests for the `collect_parent_classes` util function.
@@ -289,6 +340,215 @@ class TestSerializeParams(unittest.TestCase):
         mock_mask_queryset.assert_called_once()
 
 
+@override_settings(CBV_INSPECT_CONFIG={"MAX_VALUE_LENGTH": 10})
+class TestSerializeParamsLimits(SimpleTestCase):
+    """
+    Tests for the per value and per request length limits of `serialize_params`.
+    """
+
+    def setUp(self):
+        self.notes = Counter()
+
+    def test_serialize_params_cuts_off_value_at_max_value_length(self):
+        """
+        Test that a serialized value is cut off at `MAX_VALUE_LENGTH`.
+        """
+
+        # Act
+        serialized = serialize_params(list(range(10)), notes=self.notes)
+
+        # Assert
+        self.assertEqual("[0, 1, 2, ...", serialized)
+        self.assertEqual(Counter({"MAX_VALUE_LENGTH": 20}), self.notes)
+
+    def test_serialize_params_cuts_off_values_at_request_budget(self):
+        """
+        Test that values are cut off at what is left of the request budget,
+        and aren't serialized at all once the budget is used up.
+        """
+
+        # Arrange
+        budget = DjCbvSerializationBudget(remaining=8)
+
+        # Act
+        first = serialize_params("abc", budget, self.notes)
+        second = serialize_params("abcdef", budget, self.notes)
+        third = serialize_params("abc", budget, self.notes)
+
+        # Assert
+        self.assertEqual("'abc'", first)
+        self.assertEqual("'ab...", second)
+        self.assertEqual("...", third)
+        self.assertEqual(0, budget.remaining)
+        self.assertEqual(Counter({"MAX_REQUEST_LENGTH": 6}), self.notes)
+
+    def test_format_truncation_notes(self):
+        """
+        Test that each limit that cut something off gets a readable note.
+        """
+
+        # Arrange
+        self.notes.update({"MAX_VALUE_LENGTH": 20, "MAX_ITEMS": 0})
+
+        # Act
+        notes = format_truncation_notes(self.notes)
+
+        # Assert
+        self.assertEqual(["20 characters over 10 per value cut off"], notes)
+
+    def test_log_collects_truncation_notes(self):
+        """
+        Test that a log collects the truncation notes of its arguments and return value.
+        """
+
+        # Arrange
+        log = DjCbvLog(
+            args=DjCbvDeferredValue((list(range(10)),)),
+            kwargs=DjCbvDeferredValue({}),
+            return_value="untracked",
+        )
+
+        # Act
+        notes = log.truncation_notes
+
+        # Assert
+        self.assertEqual(["args: 23 characters over 10 per value cut off"], notes)
+
+
+class TestDjCbvDeferredValue(unittest.TestCase):
+    """
+    Tests for the `DjCbvDeferredValue` class.
+    """
+
+    @patch("cbv_inspect.utils.serialize_params", return_value="{'name': 'Foo'}")
+    def test_deferred_value_serializes_once_on_first_use(self, mock_serialize_params):
+        """
+        Test that the value is serialized when first converted to a string,
+        and the reference to the value is dropped after that.
+        """
+
+        # Arrange
+        deferred = DjCbvDeferredValue({"name": "Foo"})
+        mock_serialize_params.assert_not_called()
+
+        # Act
+        first = str(deferred)
+        second = str(deferred)
+
+        # Assert
+        self.assertEqual("{'name': 'Foo'}", first)
+        self.assertEqual(first, second)
+        mock_serialize_params.assert_called_once()
+        self.assertEqual({"name": "Foo"}, mock_serialize_params.call_args[0][0])
+        self.assertIsNone(deferred._value)
+
+    def test_deferred_value_compares_as_string(self):
+        """
+        Test that a deferred value is equal to its serialized string.
+        """
+
+        # Arrange
+        deferred = DjCbvDeferredValue((1, 2))
+
+        # Act/Assert
+        self.assertEqual("(1, 2)", deferred)
+        self.assertEqual(DjCbvDeferredValue((1, 2)), deferred)
+        self.assertNotEqual((1, 2), deferred)
+        self.assertEqual("<DjCbvDeferredValue: (1, 2)>", repr(deferred))
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Tests for the `snapshot` util function.
+    """
+
+    def test_snapshot_copies_builtin_containers_up_to_depth(self):
+        """
+        Test that builtin containers are copied up to the given depth,
+        and everything deeper is kept as a reference.
+        """
+
+        # Arrange
+        inner = [1, 2]
+        context = {"items": inner}
+        args = (context,)
+
+        # Act
+        copied = snapshot(args, 2)
+
+        # Assert
+        self.assertEqual(args, copied)
+        self.assertIsNot(context, copied[0])
+        self.assertIs(inner, copied[0]["items"])
+        self.assertIs(args, snapshot(args, 0))
+
+    def test_snapshot_keeps_other_objects(self):
+        """
+        Test that objects that aren't builtin containers (including subclasses) are not copied.
+        """
+
+        # Arrange
+        Point = namedtuple("Point", "x y")
+        point = Point(1, 2)
+        obj = object()
+
+        # Act/Assert
+        self.assertIs(point, snapshot(point, 2))
+        self.assertIs(obj, snapshot(obj, 2))
+
+
+class TestCaptureParams(SimpleTestCase):
+    """
+    Tests for the `capture_params` util function.
+    """
+
+    def setUp(self):
+        self.context = {"title": "Foo"}
+
+    @override_settings(CBV_INSPECT_CONFIG={"SERIALIZE_MODE": "eager"})
+    def test_capture_params_eager_mode_serializes_right_away(self):
+        """
+        Test that eager mode serializes the value right away.
+        """
+
+        # Act
+        captured = capture_params(self.context)
+        self.context["content"] = "Bar"
+
+        # Assert
+        self.assertIsNone(captured._value)
+        self.assertEqual("{'title': 'Foo'}", captured)
+
+    def test_capture_params_snapshot_mode_defers_a_copy(self):
+        """
+        Test that snapshot mode (the default) serializes a copy of the value later,
+        so changes made after the call don't show up.
+        """
+
+        # Act
+        captured = capture_params(self.context)
+        self.context["content"] = "Bar"
+
+        # Assert
+        self.assertIsInstance(captured, DjCbvDeferredValue)
+        self.assertEqual("{'title': 'Foo'}", captured)
+
+    @override_settings(CBV_INSPECT_CONFIG={"SERIALIZE_MODE": "reference"})
+    def test_capture_params_reference_mode_defers_the_value(self):
+        """
+        Test that reference mode serializes the value itself later,
+        so changes made after the call show up.
+        """
+
+        # Act
+        captured = capture_params(self.context)
+        self.context["content"] = "Bar"
+
+        # Assert
+        self.assertIsInstance(captured, DjCbvDeferredValue)
+        self.assertEqual("{'content': 'Bar', 'title': 'Foo'}", captured)
+
+
 class TestMaskRequest(unittest.TestCase):
     """
     Tests for the `mask_request` util function.
@@ -308,6 +568,7 @@ class TestMaskRequest(unittest.TestCase):
         args = [
             SubTestArgs(passed=str(self.factory.get("")), expected=expected),
             SubTestArgs(passed=str(self.factory.get("/foo")), expected=expected),
+            SubTestArgs(passed=str(AsyncRequestFactory().get("/foo")), expected=expected),
             SubTestArgs(passed=str((1, 2)), expected="(1, 2)"),
             SubTestArgs(passed=" ", expected=" "),
             SubTestArgs(passed="", expected=""),
@@ -515,35 +776,113 @@ class TestClassHasMethod(unittest.TestCase):
         self.assertFalse(class_has_method(test_helpers.Foo, "uppercase_color"))
 
 
-class TestGetSourcecode(unittest.TestCase):
+class TestParseSuperCalls(unittest.TestCase):
     """
-    Tests for the `get_sourcecode` util function.
+    Tests for the `parse_super_calls` util function.
     """
 
-    def test_get_sourcecode_strips_docstring(self):
+    def test_parse_super_calls_ignores_strings_and_comments(self):
         """
-        Test that docstring and comments are removed.
+        Test that super calls in docstrings, strings and comments are ignored,
+        and that a super call spanning multiple lines is found.
         """
 
         # Act
-        sourcecode = get_sourcecode(test_helpers.sample_func)
+        calls = parse_super_calls(test_helpers.ModernFoo.greet)
 
         # Assert
-        self.assertFalse("Sample docstring" in sourcecode)
-        self.assertFalse("comment" in sourcecode)
-        self.assertFalse("#" in sourcecode)
+        self.assertEqual((("greet", "Foo"),), calls)
 
-    def test_get_sourcecode_for_func_witout_docstring_or_comments(self):
+    def test_parse_super_calls_ignores_nested_classes(self):
         """
-        Test with function that has no docstring or comments.
+        Test that super calls of a class nested in the function are ignored.
         """
 
         # Act
-        sourcecode = get_sourcecode(test_helpers.sample_func2)
+        calls = parse_super_calls(test_helpers.ModernFoo.customize_greet)
 
         # Assert
-        self.assertFalse("#" in sourcecode)
-        self.assertEqual(sourcecode, inspect.getsource(test_helpers.sample_func2))
+        self.assertEqual((("customize_greet", None),), calls)
+
+    def test_parse_super_calls_is_cached_per_code_object(self):
+        """
+        Test that a function's source is only parsed once.
+        """
+
+        # Arrange
+        func = test_helpers.ModernFoo.skip_mixin_greet
+
+        # Act
+        with patch("cbv_inspect.utils.inspect.getsource", wraps=inspect.getsource) as mock_source:
+            first = parse_super_calls(func)
+            second = parse_super_calls(func)
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertLessEqual(mock_source.call_count, 1)
+
+    def test_parse_super_calls_without_source(self):
+        """
+        Test that functions without source have no super calls.
+        """
+
+        # Arrange
+        func = eval("lambda: super().greet()")
+
+        # Act/Assert
+        self.assertEqual((), parse_super_calls(func))
+
+
+class TestResolveSuperClass(unittest.TestCase):
+    """
+    Tests for the `resolve_super_class` util function.
+    """
+
+    def test_resolve_super_class_for_zero_argument_super(self):
+        """
+        Test that `super()` resolves to the class that defines the function.
+        """
+
+        # Act/Assert
+        self.assertIs(
+            test_helpers.FuturisticFoo,
+            resolve_super_class(test_helpers.FuturisticFoo.customize_greet, None),
+        )
+        self.assertIsNone(resolve_super_class(test_helpers.Foo.goodbye, None))
+
+    def test_resolve_super_class_for_two_argument_super(self):
+        """
+        Test that the class passed to `super(cls, self)` is looked up in the function's globals.
+        """
+
+        # Arrange
+        func = test_helpers.ModernFoo.greet
+
+        # Act/Assert
+        self.assertIs(test_helpers.Foo, resolve_super_class(func, "Foo"))
+        self.assertIs(DjCbvInspectMixin, resolve_super_class(func, "mixins.DjCbvInspectMixin"))
+        self.assertIsNone(resolve_super_class(func, "mixins.Missing"))
+        self.assertIsNone(resolve_super_class(func, "len"))
+
+
+class TestGetMroIndex(unittest.TestCase):
+    """
+    Tests for the `get_mro_index` util function.
+    """
+
+    def test_get_mro_index_skips_djcbvinspectmixin(self):
+        """
+        Test that MRO positions are indexed per class, without `DjCbvInspectMixin`.
+        """
+
+        # Act
+        mro, index = get_mro_index(test_helpers.DjFoo)
+
+        # Assert
+        self.assertNotIn(DjCbvInspectMixin, mro)
+        self.assertEqual(test_helpers.FuturisticFoo, mro[index[test_helpers.FuturisticFoo]])
+        self.assertEqual(len(mro), len(index))
+        self.assertIs(index, get_mro_index(test_helpers.DjFoo)[1])
 
 
 class TestGetSuperCalls(unittest.TestCase):
@@ -651,6 +990,84 @@ class TestGetSuperCalls(unittest.TestCase):
         self.assertEqual(expected_super_calls[1], super_calls[1])
 
 
+class TestGetSuperCallsWithAst(unittest.TestCase):
+    """
+    Tests for the `get_super_calls` util function with super calls only an ast finds.
+    """
+
+    def test_two_argument_super_call_resolves_after_given_class(self):
+        """
+        Test that `super(cls, self)` resolves to the method after `cls` in the MRO.
+        """
+
+        # Arrange
+        instance = test_helpers.ModernFoo()
+
+        # Act
+        super_calls = get_super_calls(instance.greet)
+
+        # Assert
+        self.assertEqual(1, len(super_calls))
+        self.assertEqual(test_helpers.AncientFoo.greet.__qualname__, super_calls[0].name)
+
+    def test_super_call_resolves_against_view_class(self):
+        """
+        Test that super calls resolve against the given view class.
+        """
+
+        # Arrange
+        instance = test_helpers.ModernFoo()
+
+        # Act
+        super_calls = get_super_calls(instance.customize_greet, test_helpers.ModernFoo)
+
+        # Assert
+        self.assertEqual(1, len(super_calls))
+        self.assertEqual(
+            test_helpers.FuturisticFoo.customize_greet.__qualname__, super_calls[0].name
+        )
+
+    def test_super_call_in_classmethod(self):
+        """
+        Test that super calls in a classmethod resolve against the class it's bound to.
+        """
+
+        # Act
+        super_calls = get_super_calls(test_helpers.ModernFoo.get_cls_color)
+
+        # Assert
+        self.assertEqual(test_helpers.Foo.get_cls_color.__qualname__, super_calls[0].name)
+
+    def test_super_call_with_dynamic_class(self):
+        """
+        Test that a super call with a class that isn't a name doesn't resolve.
+        """
+
+        # Arrange
+        instance = test_helpers.ModernFoo()
+
+        # Act
+        super_calls = get_super_calls(instance.dynamic_greet)
+
+        # Assert
+        self.assertEqual((("greet", ""),), parse_super_calls(test_helpers.ModernFoo.dynamic_greet))
+        self.assertEqual([{}], super_calls)
+
+    def test_super_call_with_class_not_in_mro(self):
+        """
+        Test that a super call starting after a class that isn't in the MRO doesn't resolve.
+        """
+
+        # Arrange
+        instance = test_helpers.ModernFoo()
+
+        # Act
+        super_calls = get_super_calls(instance.skip_mixin_greet)
+
+        # Assert
+        self.assertEqual([{}], super_calls)
+
+
 class TestGetRequest(unittest.TestCase):
     """
     Tests for the `get_request` util function.
@@ -828,3 +1245,83 @@ class TestSetLogParents(unittest.TestCase):
         self.assertFalse(current_log.is_parent)
         self.assertFalse(log_3.is_parent)
         self.assertEqual(current_log.parent_list, ["cbvInspect_1_0"])
+
+
+class TestSetLogTimings(unittest.TestCase):
+    """
+    Tests for the `set_log_timings` util function.
+    """
+
+    def setUp(self):
+        self.logs = {
+            1: DjCbvLog(order=1, indent=0, wall_ns=100, cpu_ns=80),
+            2: DjCbvLog(order=2, indent=1, wall_ns=60, cpu_ns=50),
+            3: DjCbvLog(order=3, indent=2, wall_ns=50, cpu_ns=45),
+            4: DjCbvLog(order=4, indent=1, wall_ns=30, cpu_ns=None),
+            5: DjCbvLog(order=5, indent=0, wall_ns=1, cpu_ns=1),
+        }
+
+    def test_set_log_timings_subtracts_direct_children(self):
+        """
+        Test that self time is the time of a log minus the time of its direct children.
+        """
+
+        # Act
+        set_log_timings(self.logs, hot_count=0)
+
+        # Assert
+        self.assertEqual([10, 10, 50, 30, 1], [log.self_wall_ns for log in self.logs.values()])
+        self.assertEqual([30, 5, 45, None, 1], [log.self_cpu_ns for log in self.logs.values()])
+        self.assertEqual(0.00001, self.logs[2].self_wall_ms)
+        self.assertEqual(0.000005, self.logs[2].self_cpu_ms)
+        self.assertIsNone(self.logs[4].cpu_ms)
+
+    def test_set_log_timings_marks_hottest_logs(self):
+        """
+        Test that the logs with the most self time are marked hot.
+        """
+
+        # Act
+        set_log_timings(self.logs, hot_count=2)
+
+        # Assert
+        self.assertEqual([3, 4], [log.order for log in self.logs.values() if log.is_hot])
+
+    def test_set_log_timings_never_goes_negative(self):
+        """
+        Test that self time is never negative, i.e. from clock resolution.
+        """
+
+        # Arrange
+        self.logs[1].wall_ns = 10
+        self.logs[1].cpu_ns = 10
+
+        # Act
+        set_log_timings(self.logs, hot_count=5)
+
+        # Assert
+        self.assertEqual(0, self.logs[1].self_wall_ns)
+        self.assertEqual(0, self.logs[1].self_cpu_ns)
+        self.assertFalse(self.logs[1].is_hot)
+
+
+class TestSerializeLogs(unittest.TestCase):
+    """
+    Tests for the `serialize_logs` util function.
+    """
+
+    def test_serialize_logs_drops_values(self):
+        """
+        Test that deferred values are serialized and their values dropped.
+        """
+
+        # Arrange
+        value = DjCbvDeferredValue({"a": 1})
+        logs = {1: DjCbvLog(order=1, args=(), kwargs=value, return_value="done")}
+
+        # Act
+        serialize_logs(logs)
+
+        # Assert
+        self.assertIsNone(value._value)
+        self.assertEqual("{'a': 1}", value)
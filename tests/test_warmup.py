@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from django.urls import get_resolver
+
+from cbv_inspect import instrumentation
+from cbv_inspect.plans import plan_cache
+from cbv_inspect.warmup import iter_view_functions, run_configured_warm_up, warm_up
+
+from . import views
+
+
+class TestWarmUp(SimpleTestCase):
+    """
+    Tests for the `warm_up` function.
+    """
+
+    def setUp(self):
+        plan_cache.clear()
+
+    def test_iter_view_functions_includes_nested_resolvers(self):
+        """
+        Test that view functions of included URLconfs (the admin) are yielded too.
+        """
+
+        # Act
+        view_funcs = list(iter_view_functions(get_resolver()))
+
+        # Assert
+        self.assertIn(views.fbv_render, view_funcs)
+        self.assertTrue(any(func.__module__.startswith("django.contrib") for func in view_funcs))
+
+    def test_warm_up_builds_plans_for_every_cbv(self):
+        """
+        Test that view and method plans, and instrumented views are built for every CBV.
+        """
+
+        # Act
+        count = warm_up()
+
+        # Assert
+        view_plan = plan_cache.get(views.NumberView)
+        self.assertGreater(count, 0)
+        self.assertIn("get_square", view_plan.methods)
+        self.assertIn("get_context_data", view_plan.methods)
+        self.assertEqual("(self, number)", view_plan.methods["get_square"].signature)
+        self.assertIsNotNone(plan_cache.get(views.RenderHtmlView))
+        self.assertIsNone(plan_cache.get(views.fbv_render))
+
+    @patch("cbv_inspect.warmup.warm_up_view")
+    def test_warm_up_skips_views_that_fail(self, mock_warm_up_view):
+        """
+        Test that a view that fails to warm up is logged and skipped.
+        """
+
+        # Arrange
+        mock_warm_up_view.side_effect = [ValueError("Oh no!")] + [None] * 100
+
+        # Act
+        with self.assertLogs("cbv_inspect.warmup", "WARNING") as logs:
+            count = warm_up()
+
+        # Assert
+        self.assertEqual(mock_warm_up_view.call_count - 1, count)
+        self.assertIn("Could not warm up view", logs.output[0])
+
+    def test_warm_up_makes_first_request_use_cached_instrumented_class(self):
+        """
+        Test that the instrumented class of a warmed up CBV is already cached.
+        """
+
+        # Arrange
+        view_func = get_resolver().resolve("/simple_cbv_render").func
+
+        # Act
+        warm_up()
+
+        # Assert
+        self.assertIn(view_func.view_class, instrumentation._instrumented_classes)
+
+
+class TestRunConfiguredWarmUp(SimpleTestCase):
+    """
+    Tests for the `run_configured_warm_up` function.
+    """
+
+    @patch("cbv_inspect.warmup.warm_up")
+    def test_warm_up_is_opt_in(self, mock_warm_up):
+        """
+        Test that nothing runs by default.
+        """
+
+        # Act
+        thread = run_configured_warm_up()
+
+        # Assert
+        self.assertIsNone(thread)
+        mock_warm_up.assert_not_called()
+
+    @override_settings(CBV_INSPECT_CONFIG={"WARMUP": True, "WARMUP_BACKGROUND": False})
+    @patch("cbv_inspect.warmup.warm_up")
+    def test_warm_up_runs_in_foreground(self, mock_warm_up):
+        """
+        Test that the warm up runs right away when not in the background.
+        """
+
+        # Act
+        thread = run_configured_warm_up()
+
+        # Assert
+        self.assertIsNone(thread)
+        mock_warm_up.assert_called_once_with()
+
+    @override_settings(CBV_INSPECT_CONFIG={"WARMUP": True})
+    @patch("cbv_inspect.warmup.warm_up")
+    def test_warm_up_runs_in_background_thread(self, mock_warm_up):
+        """
+        Test that the warm up runs in a daemon thread by default.
+        """
+
+        # Act
+        thread = run_configured_warm_up()
+        thread.join()
+
+        # Assert
+        self.assertTrue(thread.daemon)
+        mock_warm_up.assert_called_once_with()
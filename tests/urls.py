@@ -1,13 +1,28 @@
 from django.contrib import admin
-from django.urls import path
+from django.contrib.auth.decorators import login_required
+from django.urls import include, path
 
 from . import views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("simple_cbv_render", views.RenderHtmlView.as_view()),
+    path("__cbv_inspect__/", include("cbv_inspect.urls")),
+    path("simple_cbv_render", views.RenderHtmlView.as_view(), name="render_html_view"),
     path("djcbv_exclude_mixin", views.ExcludedByMixin.as_view()),
     path("djcbv_exclude_dec", views.ExcludedByDecorator.as_view()),
     path("simple_fbv_render", views.fbv_render),
     path("hello_cbv", views.HelloTest.as_view()),
+    path("login_required_cbv", login_required(views.RenderHtmlView.as_view())),
+    path("number_cbv/<int:number>", views.NumberView.as_view()),
+    path("async_number_cbv/<int:number>", views.AsyncNumberView.as_view()),
+    path("large_context_cbv", views.LargeContextView.as_view()),
+    path("book_list_cbv", views.BookListView.as_view()),
+    path("book_names_cbv", views.BookNamesView.as_view()),
+    path("allocating_cbv", views.AllocatingView.as_view()),
+    path("slow_cbv", views.SlowView.as_view()),
+    path("streaming_cbv", views.StreamingView.as_view()),
+    path("gzipped_cbv", views.GzippedView.as_view()),
+    path("gzipped_streaming_cbv", views.GzippedStreamingView.as_view()),
+    path("raise_exception_cbv", views.RaiseExceptionView.as_view()),
+    path("no_response_cbv", views.NoResponseView.as_view()),
 ]
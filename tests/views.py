@@ -1,10 +1,15 @@
-from django.http import HttpResponse
+import time
+
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
-from django.views.generic import TemplateView, View
+from django.views.decorators.gzip import gzip_page
+from django.views.generic import ListView, TemplateView, View
 
 from cbv_inspect.decorators import djcbv_exclude
-from cbv_inspect.mixins import DjCbvExcludeMixin
+from cbv_inspect.mixins import DjCbvExcludeMixin, DjCbvTraceMemoryMixin
+
+from . import models
 
 
 class RenderHtmlView(TemplateView):
@@ -55,3 +60,124 @@ def fbv_render(request):
 class HelloTest(View):
     def get(self, request, *args, **kwargs):
         return HttpResponse("hello from a CBV View!")
+
+
+class NumberView(TemplateView):
+    template_name = "base.html"
+
+    def get_square(self, number):
+        return number * number
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["title"] = "Number View"
+        context["content"] = self.get_square(kwargs["number"])
+        return context
+
+
+class AsyncNumberView(NumberView):
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        return self.render_to_response(context)
+
+
+class LargeContextView(TemplateView):
+    template_name = "base.html"
+
+    def get_rows(self):
+        return [{"id": i, "name": f"Row {i}" * 10} for i in range(1_000)]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["title"] = "Large Context View"
+        context["rows"] = self.get_rows()
+        return context
+
+
+class BookListView(ListView):
+    model = models.Book
+    ordering = ["pk"]
+    paginate_by = 2
+    template_name = "base.html"
+
+
+class BookNamesView(TemplateView):
+    template_name = "base.html"
+
+    def get_book_name(self, pk):
+        return models.Book.objects.get(pk=pk).name
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["names"] = [self.get_book_name(book.pk) for book in models.Book.objects.all()]
+        return context
+
+
+class AllocatingView(DjCbvTraceMemoryMixin, TemplateView):
+    template_name = "base.html"
+
+    def get_rows(self):
+        scratch = [str(i) * 10 for i in range(20_000)]  # noqa: F841 (freed on return)
+        return [str(i) for i in range(10_000)]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["rows"] = self.get_rows()
+        return context
+
+
+class SlowView(TemplateView):
+    template_name = "base.html"
+
+    def wait(self):
+        time.sleep(0.02)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        self.wait()
+        return context
+
+
+class StreamingView(View):
+    def get_rows(self):
+        return [f"<p>Row {i}</p>" for i in range(100)]
+
+    def get(self, request, *args, **kwargs):
+        # the closing body tag is split across chunks
+        chunks = ["<html><head></head><body>", *self.get_rows(), "</bo", "DY>", "</html>"]
+        return StreamingHttpResponse(chunks)
+
+
+@method_decorator(gzip_page, name="dispatch")
+class GzippedView(TemplateView):
+    template_name = "base.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # long enough to be compressed
+        context["title"] = "Gzipped View " * 100
+        return context
+
+
+@method_decorator(gzip_page, name="dispatch")
+class GzippedStreamingView(StreamingView):
+    pass
+
+
+class AsyncRaiseExceptionView(View):
+    async def get(self, request, *args, **kwargs):
+        raise ValueError("Oh no!")
+
+
+class RaiseExceptionView(TemplateView):
+    template_name = "base.html"
+
+    def get_context_data(self, **kwargs):
+        raise ValueError("Oh no!")
+
+
+class NoResponseView(View):
+    calls = 0
+
+    def get(self, request, *args, **kwargs):
+        NoResponseView.calls += 1